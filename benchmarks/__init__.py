@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: benchmarks
+    :synopsis: Performance benchmarks, run them with
+        ``python -m benchmarks.run``
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: times document build, serialization (to_bin, to_dict,
+JSON export), i18n unpacking/loading (legacy and escaped formats) and 7 bit
+int codecs on test documents and on synthetic documents scaled up from
+them, for every record model backend. Throughput (MB/s, records/s), peak
+memory and memory per record operation result retains (document for build)
+are reported, results could be saved as JSON and compared with the ones of
+another run::
+
+    python -m benchmarks.run -o before.json
+    python -m benchmarks.run -o after.json -c before.json
+"""
+import os
+import sys
+import argparse
+import datetime
+import gc
+import glob
+import io
+import json
+import platform
+import random
+import subprocess
+import timeit
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT_DIR)
+from benchmarks.synthetic import scale_document
+from udlg.builder import BinaryFormatterFileBuilder, UDLGBuilder, BACKENDS
+from udlg.export import write_json
+from udlg.utils import (
+    decode_7bit_ints, encode_7bit_ints, read_7bit_encoded_int_from_stream
+)
+from udlg.utils.reader import BinaryReader
+
+DOCUMENTS_DIR = os.path.join(ROOT_DIR, 'tests', 'documents')
+DEFAULT_SCALED = os.path.join(DOCUMENTS_DIR, 'Lucas1.udlg')
+DEFAULT_SCALES = [10, 100, 1000]
+OPERATIONS = ['build', 'to_bin', 'to_dict', 'export', 'unpack_i18n',
+              'load_i18n', 'write_i18n', 'read_i18n']
+#: 7 bit codecs benchmark values amount
+CODEC_VALUES = 100000
+MEGABYTE = float(1 << 20)
+#: operation taking longer is timed once and skipped on larger scales
+DEFAULT_TIME_LIMIT = 5.0
+
+
+def get_builder(path):
+    if path.endswith('.udlg'):
+        return UDLGBuilder
+    return BinaryFormatterFileBuilder
+
+
+def get_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            stderr=subprocess.DEVNULL
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_memory(function):
+    """
+    :rtype: tuple[int, int] | None
+    :return: memory function result retains and peak memory function
+        allocates (bytes), None if it could not be traced (PyPy)
+    """
+    if platform.python_implementation() != 'CPython':
+        return None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        #: result is kept alive till its memory is taken
+        results = [function()]
+        retained, peak = tracemalloc.get_traced_memory()
+        del results[:]
+    finally:
+        tracemalloc.stop()
+    return retained, peak
+
+
+def get_time(function, opts):
+    """
+    :rtype: float
+    :return: the best time of a single call, seconds
+    """
+    #: calls per timing are adjusted so timing takes ~0.1s
+    elapsed = timeit.timeit(function, number=1)
+    if elapsed > opts.time_limit:
+        return elapsed
+    number = max(1, int(0.1 / max(elapsed, 1e-9)))
+    timings = timeit.repeat(function, number=number, repeat=opts.repeat)
+    return min(timings) / number
+
+
+def to_bin(document):
+    #: serialized records could be cached (i18n is loaded), cache is
+    #: dropped so every call serializes all the records
+    data = getattr(document, 'data', document)
+    mark_dirty = getattr(data, 'mark_dirty', None)
+    if mark_dirty is not None:
+        mark_dirty()
+    return document.to_bin()
+
+
+def export(document):
+    with open(os.devnull, 'w') as stream:
+        write_json(document, stream)
+
+
+def write_i18n(document):
+    with open(os.devnull, 'wb') as stream:
+        document.unpack_i18n(stream)
+
+
+def get_operations(data, builder, backend):
+    """
+    :rtype: tuple[dict[str, callable], int]
+    :return: operation name: function, records count, i18n operations are
+        given for UDLG documents only
+    """
+    document = builder.build(data, backend=backend)
+    block = escaped = None
+    if builder is UDLGBuilder:
+        block = document.unpack_i18n()
+        escaped = bytearray()
+        document.unpack_i18n(escaped)
+
+    operations = {
+        'build': lambda: builder.build(data, backend=backend),
+        'to_bin': lambda: to_bin(document),
+        'to_dict': document.to_dict,
+        'export': lambda: export(document),
+    }
+    if block is not None:
+        operations['unpack_i18n'] = document.unpack_i18n
+        operations['load_i18n'] = lambda: document.load_i18n(block)
+        #: escaped i18n format, written and read chunk by chunk
+        operations['write_i18n'] = lambda: write_i18n(document)
+        operations['read_i18n'] = lambda: document.load_i18n(
+            io.BytesIO(escaped)
+        )
+    return operations, len(document.records)
+
+
+def measure(name, scale, data, builder, opts, slow=None):
+    """
+    :param set slow: (backend, operation) set of operations exceeded time
+        limit on smaller scale, they're skipped and the ones exceeded it
+        now are added, optional
+    :rtype: list[dict]
+    :return: results of every operation and backend
+    """
+    slow = set() if slow is None else slow
+    results = []
+    for backend in opts.backends:
+        try:
+            operations, records = get_operations(data, builder, backend)
+        except Exception as err:
+            #: document is not supported by backend
+            print("%-28s %-8s skipped: %r" % ('%s x%i' % (name, scale),
+                                              backend, err))
+            continue
+        for operation in opts.operations:
+            function = operations.get(operation)
+            if function is None:
+                continue
+            if (backend, operation) in slow:
+                print("%-28s %-8s %-16s skipped: time limit exceeded on "
+                      "smaller scale" % ('%s x%i' % (name, scale), backend,
+                                         operation))
+                continue
+            try:
+                elapsed = get_time(function, opts)
+            except Exception as err:
+                print("%-28s %-8s %-16s failed: %r" % (
+                    '%s x%i' % (name, scale), backend, operation, err
+                ))
+                continue
+            result = {
+                'document': name, 'scale': scale, 'backend': backend,
+                'operation': operation, 'size': len(data),
+                'records': records, 'time': elapsed,
+                'mb_per_s': len(data) / MEGABYTE / elapsed,
+                'records_per_s': records / elapsed,
+                'peak_memory': None, 'memory_per_record': None
+            }
+            if elapsed > opts.time_limit:
+                slow.add((backend, operation))
+            elif opts.memory:
+                memory = get_memory(function)
+                if memory is not None:
+                    retained, result['peak_memory'] = memory
+                    result['memory_per_record'] = retained / float(records)
+            print_result(result)
+            results.append(result)
+    return results
+
+
+def measure_codecs(opts):
+    """
+    :rtype: list[dict]
+    :return: 7 bit int codecs results
+    """
+    generator = random.Random(0)
+    #: 1 to 5 bytes long encoded values
+    values = [
+        generator.randrange(1 << (7 * generator.randrange(1, 6)))
+        for _ in range(CODEC_VALUES)
+    ]
+    encoded = bytearray()
+    encode_7bit_ints(values, encoded)
+    encoded = bytes(encoded)
+
+    def read_stream():
+        reader = BinaryReader(encoded)
+        for _ in range(CODEC_VALUES):
+            read_7bit_encoded_int_from_stream(reader)
+
+    operations = [
+        ('encode_7bit_ints', lambda: encode_7bit_ints(values, bytearray())),
+        ('decode_7bit_ints',
+         lambda: decode_7bit_ints(encoded, CODEC_VALUES)),
+        ('read_7bit_int', read_stream),
+    ]
+    results = []
+    for operation, function in operations:
+        elapsed = get_time(function, opts)
+        result = {
+            'document': '7bit codecs', 'scale': 1, 'backend': None,
+            'operation': operation, 'size': len(encoded),
+            'records': CODEC_VALUES, 'time': elapsed,
+            'mb_per_s': len(encoded) / MEGABYTE / elapsed,
+            'records_per_s': CODEC_VALUES / elapsed,
+            'peak_memory': None, 'memory_per_record': None
+        }
+        print_result(result)
+        results.append(result)
+    return results
+
+
+def print_result(result):
+    memory = result['peak_memory']
+    per_record = result['memory_per_record']
+    print("%-28s %-8s %-16s %10.3f %10.2f %12.0f %10s %10s" % (
+        '%s x%i' % (result['document'], result['scale']),
+        result['backend'] or '-', result['operation'],
+        result['time'] * 1000.0, result['mb_per_s'],
+        result['records_per_s'],
+        '%.1f' % (memory / 1024.0) if memory is not None else 'n/a',
+        '%.1f' % per_record if per_record is not None else 'n/a'
+    ))
+
+
+def get_key(result):
+    return (result['document'], result['scale'], result['backend'],
+            result['operation'])
+
+
+def compare(results, path):
+    """
+    print time ratio of results to results saved in file
+    """
+    with open(path, 'r') as stream:
+        previous = dict(
+            (get_key(result), result)
+            for result in json.load(stream)['results']
+        )
+    print("\ncompared to %s (time ratio, < 1 is faster)" % path)
+    for result in results:
+        old = previous.get(get_key(result))
+        if old is None:
+            continue
+        print("%-28s %-8s %-16s %8.2f" % (
+            '%s x%i' % (result['document'], result['scale']),
+            result['backend'] or '-', result['operation'],
+            result['time'] / old['time']
+        ))
+
+
+def main(opts):
+    print("%s %s" % (platform.python_implementation(),
+                     platform.python_version()))
+    print("%-28s %-8s %-16s %10s %10s %12s %10s %10s" % (
+        'document', 'backend', 'operation', 'time, ms', 'MB/s',
+        'records/s', 'peak, KB', 'B/record'
+    ))
+    results = []
+    for path in opts.sources:
+        with open(path, 'rb') as stream:
+            data = stream.read()
+        results.extend(measure(os.path.basename(path), 1, data,
+                               get_builder(path), opts))
+    for path in opts.scaled:
+        with open(path, 'rb') as stream:
+            data = stream.read()
+        builder = get_builder(path)
+        slow = set()
+        for scale in sorted(opts.scales):
+            scaled = bytes(scale_document(data, scale, builder=builder))
+            results.extend(measure(os.path.basename(path), scale, scaled,
+                                   builder, opts, slow=slow))
+    if opts.codecs:
+        results.extend(measure_codecs(opts))
+
+    if opts.output:
+        report = {
+            'python': '%s %s' % (platform.python_implementation(),
+                                 platform.python_version()),
+            'platform': platform.platform(),
+            'revision': get_revision(),
+            'date': datetime.datetime.now().isoformat(),
+            'results': results
+        }
+        with open(opts.output, 'w') as stream:
+            json.dump(report, stream, indent=1)
+    if opts.compare:
+        compare(results, opts.compare)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--source', dest='sources', action='append',
+                        metavar='file.udlg', help='document to measure, '
+                        'could be given many times, test documents by '
+                        'default')
+    parser.add_argument('-S', '--scaled', dest='scaled', action='append',
+                        metavar='file.udlg', help='document scaled up to '
+                        'synthetic ones, could be given many times, '
+                        'Lucas1.udlg by default')
+    parser.add_argument('-x', '--scale', dest='scales', action='append',
+                        type=int, metavar='N', help='scale factor, could be '
+                        'given many times, 10, 100 and 1000 by default')
+    parser.add_argument('-b', '--backend', dest='backends', action='append',
+                        choices=BACKENDS, help='backend, all by default')
+    parser.add_argument('-O', '--operation', dest='operations',
+                        action='append', choices=OPERATIONS,
+                        help='operation, all by default')
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int,
+                        default=3, help='timings, the best one is taken')
+    parser.add_argument('-t', '--time-limit', dest='time_limit',
+                        type=float, default=DEFAULT_TIME_LIMIT,
+                        metavar='seconds', help='operation taking longer is '
+                        'timed once, neither its memory is measured nor it '
+                        'runs on larger scales')
+    parser.add_argument('-M', '--no-memory', dest='memory',
+                        action='store_false', help='do not measure peak '
+                        'memory and memory per record (it takes one more '
+                        'call of every operation)')
+    parser.add_argument('-C', '--no-codecs', dest='codecs',
+                        action='store_false', help='do not measure 7 bit '
+                        'int codecs')
+    parser.add_argument('-o', '--output', dest='output', metavar='file.json',
+                        help='file to save results to')
+    parser.add_argument('-c', '--compare', dest='compare',
+                        metavar='file.json', help='results file to compare '
+                        'with')
+    arguments = parser.parse_args()
+    arguments.sources = arguments.sources or sorted(
+        glob.glob(os.path.join(DOCUMENTS_DIR, '*.udlg')) +
+        glob.glob(os.path.join(DOCUMENTS_DIR, '*.dat'))
+    )
+    arguments.scaled = arguments.scaled or [DEFAULT_SCALED]
+    arguments.scales = arguments.scales or DEFAULT_SCALES
+    arguments.backends = arguments.backends or list(BACKENDS)
+    arguments.operations = arguments.operations or OPERATIONS
+    main(arguments)
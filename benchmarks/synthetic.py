@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: benchmarks.synthetic
+    :synopsis: Synthetic documents, generated from scratch or fixtures
+        scaled up by repeating their records
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import random
+from struct import Struct
+
+from udlg import enums
+from udlg.builder import BACKEND_COMPACT, UDLGBuilder
+from udlg.structure import compact
+from udlg.structure.constants import INT32_STRUCT
+from udlg.structure.records import BINARY_ARRAY_STRUCT, CLASS_WITH_ID_STRUCT
+from udlg.structure.structure import HEADER_STRUCT
+from udlg.utils import encode_7bit_int
+from udlg.utils.i18n import format_i18n_items
+
+#: UDLG signature prefix, the rest of signature differs from file to file
+SIGNATURE_PREFIX = bytes.fromhex('f9538b831f363243baae0d17865d0854')
+#: record_type, object_id
+RECORD_ID_STRUCT = Struct('<Bi')
+#: record_type, count
+NULL_MULTIPLE_256_STRUCT = Struct('<BB')
+#: record_type, object_id, length, primitive type
+ARRAY_SINGLE_PRIMITIVE_STRUCT = Struct('<BiIB')
+WORDS = (
+    'the', 'wasteland', 'station', 'rathound', 'caves', 'trade', 'guard',
+    'oligarch', 'junk', 'bullets', 'what', 'do', 'you', 'want', 'go',
+    'away', 'yes', 'no', 'maybe', 'later', 'context.npc', '::I::',
+    'чёрт', 'станция', 'пойду', 'отсюда', 'да', 'нет',
+)
+
+#: record attributes holding object ids (or references to them)
+ID_FIELDS = ('object_id', 'metadata_id', 'id_ref')
+#: record attributes holding structures with object ids
+ID_HOLDERS = ('class_info', 'array_info')
+
+
+def _shift_id(value, delta):
+    #: ids keep their sign, 0 means no object
+    if value > 0:
+        return value + delta
+    if value < 0:
+        return value - delta
+    return value
+
+
+def shift_ids(entry, delta):
+    """
+    shift object ids of record entry and its member records in place
+
+    :param udlg.structure.compact.RecordStructure entry: record entry
+    :param int delta: value ids are shifted by
+    :rtype: None
+    :return: None
+    """
+    for field_name in ID_FIELDS:
+        value = getattr(entry, field_name, None)
+        if value is not None:
+            setattr(entry, field_name, _shift_id(value, delta))
+    for field_name in ID_HOLDERS:
+        holder = getattr(entry, field_name, None)
+        if holder is not None:
+            holder.object_id = _shift_id(holder.object_id, delta)
+    for member in getattr(entry, 'members', ()):
+        if isinstance(member, compact.RecordStructure):
+            shift_ids(member, delta)
+
+
+def _iter_ids(entry):
+    for field_name in ID_FIELDS:
+        value = getattr(entry, field_name, None)
+        if value is not None:
+            yield value
+    for field_name in ID_HOLDERS:
+        holder = getattr(entry, field_name, None)
+        if holder is not None:
+            yield holder.object_id
+    for member in getattr(entry, 'members', ()):
+        if isinstance(member, compact.RecordStructure):
+            for value in _iter_ids(member):
+                yield value
+
+
+def scale_document(data, factor, builder=UDLGBuilder):
+    """
+    scale document up, its records (but MessageEnd one) are repeated
+    ``factor`` times, object ids of every copy are shifted so they stay
+    unique. BinaryLibrary records are kept in the first copy only, the
+    other ones refer to them.
+
+    :param bytes data: document data
+    :param int factor: amount of records copies
+    :param type builder: document builder,
+        :class:`udlg.builder.UDLGBuilder` or
+        :class:`udlg.builder.BinaryFormatterFileBuilder`
+    :rtype: bytearray
+    :return: scaled document data
+    """
+    document = builder.build(data, backend=BACKEND_COMPACT)
+    structure = getattr(document, 'data', document)
+    records = [record.entry for record in structure.records]
+    message_end = records.pop()
+    library = enums.RecordTypeEnum.BinaryLibrary
+    stride = max(
+        abs(value) for entry in records for value in _iter_ids(entry)
+    ) + 1
+
+    output = bytearray()
+    write = output.extend
+    if structure is not document:
+        document.header._write_bin(write)
+    structure.header._write_bin(write)
+    for entry in records:
+        entry._write_bin(write)
+    copies = [entry for entry in records if entry.record_type != library]
+    for _ in range(factor - 1):
+        for entry in copies:
+            shift_ids(entry, stride)
+            entry._write_bin(write)
+    message_end._write_bin(write)
+    return output
+
+
+def _write_string(value, write):
+    data = bytearray()
+    encode_7bit_int(len(value), data)
+    data += value
+    write(data)
+
+
+def _get_text(generator):
+    """
+    :rtype: bytes
+    :return: random text, 1 to ~400 bytes long, so some strings have two
+        byte length prefix
+    """
+    words = [
+        generator.choice(WORDS) for _ in range(generator.randrange(1, 60))
+    ]
+    return ' '.join(words).encode('utf-8')
+
+
+def generate_document(classes=10, instances=40, strings=150, references=10,
+                      arrays=2, primitive_arrays=2, array_length=16,
+                      seed=0):
+    """
+    generate UDLG document with given amount of records of every type
+
+    Class records (``ClassWithMembersAndTypes`` ones define classes, the
+    ``ClassWithId`` ones refer to them one by one) have Int32 member and
+    string members, the strings (``BinaryObjectString``) and references to
+    them (``MemberReference``) are spread among string members in random
+    order, string members left are nulls. ``BinaryArray`` records are
+    arrays of class instances with null elements, ``ArraySinglePrimitive``
+    ones are Int32 arrays.
+
+    :param int classes: ClassWithMembersAndTypes records amount
+    :param int instances: ClassWithId records amount
+    :param int strings: BinaryObjectString records amount
+    :param int references: MemberReference records amount
+    :param int arrays: BinaryArray records amount
+    :param int primitive_arrays: ArraySinglePrimitive records amount
+    :param int array_length: arrays length
+    :param int seed: random seed, the same arguments give the same
+        document
+    :rtype: tuple[bytearray, bytes]
+    :return: document data and its i18n block
+    :raises ValueError:
+        - if ClassWithId records are requested with no classes defined
+        - if strings or references are requested with no class records
+        - if references are requested with no strings to refer to
+    """
+    if instances and not classes:
+        raise ValueError("ClassWithId records need class definitions")
+    if (strings or references) and not (classes + instances):
+        raise ValueError("Strings need class records to be members of")
+    if references and not strings:
+        raise ValueError("MemberReference records need strings to refer to")
+    RecordType = enums.RecordTypeEnum
+    BinaryType = enums.BinaryTypeEnum
+    int32 = enums.PrimitiveTypeEnum.Int32
+    generator = random.Random(seed)
+
+    #: string members of every class record
+    class_records = classes + instances
+    size = -(-(strings + references) // class_records) if class_records else 0
+    slots = [RecordType.BinaryObjectString] * strings + (
+        [RecordType.MemberReference] * references
+    )
+    generator.shuffle(slots)
+    if references:
+        #: the first string goes before references, so there's a string
+        #: to refer to
+        first = slots.index(RecordType.BinaryObjectString)
+        slots[0], slots[first] = slots[first], slots[0]
+    slots.reverse()
+
+    output = bytearray(SIGNATURE_PREFIX)
+    output += bytes(generator.randrange(256) for _ in range(8))
+    write = output.extend
+    object_ids = iter(range(1, 1 << 31))
+    library_id = next(object_ids)
+    #: the first class record is root one
+    write(HEADER_STRUCT.pack(RecordType.SerializedStreamHeader,
+                             library_id + 1, -1, 1, 0))
+    write(RECORD_ID_STRUCT.pack(RecordType.BinaryLibrary, library_id))
+    _write_string(b'Synthetic', write)
+
+    i18n = []
+    string_ids = []
+    definitions = []
+
+    def write_members(index, members):
+        write(INT32_STRUCT.pack(generator.randrange(-1 << 31, 1 << 31)))
+        for member_index in range(1, members + 1):
+            kind = slots.pop() if slots else RecordType.ObjectNull
+            if kind == RecordType.BinaryObjectString:
+                string_ids.append(next(object_ids))
+                value = _get_text(generator)
+                write(RECORD_ID_STRUCT.pack(kind, string_ids[-1]))
+                _write_string(value, write)
+                i18n.append((index, member_index, value))
+            elif kind == RecordType.MemberReference:
+                write(RECORD_ID_STRUCT.pack(kind,
+                                            generator.choice(string_ids)))
+            else:
+                write(bytes((kind, )))
+
+    #: record index, BinaryLibrary is the first one
+    index = 1
+    for class_index in range(classes):
+        object_id = next(object_ids)
+        definitions.append(object_id)
+        name = ('C%i' % class_index).encode('ascii')
+        write(RECORD_ID_STRUCT.pack(RecordType.ClassWithMembersAndTypes,
+                                    object_id))
+        _write_string(name, write)
+        write(INT32_STRUCT.pack(size + 1))
+        _write_string(name + b':Id', write)
+        for member_index in range(size):
+            _write_string(name + b':S%i' % member_index, write)
+        write(bytes((BinaryType.Primitive, ) + (BinaryType.String, ) * size))
+        write(bytes((int32, )))
+        write(INT32_STRUCT.pack(library_id))
+        write_members(index, size)
+        index += 1
+    for instance_index in range(instances):
+        write(bytes((RecordType.ClassWithId, )))
+        write(CLASS_WITH_ID_STRUCT.pack(
+            next(object_ids), definitions[instance_index % classes]
+        ))
+        write_members(index, size)
+        index += 1
+    for _ in range(arrays):
+        write(bytes((RecordType.BinaryArray, )))
+        write(BINARY_ARRAY_STRUCT.pack(
+            next(object_ids), enums.BinaryArrayTypeEnum.Single, 1
+        ))
+        write(INT32_STRUCT.pack(array_length))
+        write(bytes((BinaryType.Class, )))
+        _write_string(b'C0', write)
+        write(INT32_STRUCT.pack(library_id))
+        #: array elements are records following array one
+        if array_length > 255:
+            write(RECORD_ID_STRUCT.pack(RecordType.ObjectNullMultiple,
+                                        array_length))
+        elif array_length:
+            write(NULL_MULTIPLE_256_STRUCT.pack(
+                RecordType.ObjectNullMultiple256, array_length
+            ))
+    for _ in range(primitive_arrays):
+        write(ARRAY_SINGLE_PRIMITIVE_STRUCT.pack(
+            RecordType.ArraySinglePrimitive, next(object_ids), array_length,
+            int32
+        ))
+        write(Struct('<%ii' % array_length).pack(*(
+            generator.randrange(-1 << 31, 1 << 31)
+            for _ in range(array_length)
+        )))
+    write(bytes((RecordType.MessageEnd, )))
+    return output, format_i18n_items(i18n)
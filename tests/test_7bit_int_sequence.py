@@ -9,7 +9,8 @@
 import io
 import allure
 from udlg.utils import (
-    read_7bit_encoded_int, read_7bit_encoded_int_from_stream, write_7bit_int)
+    read_7bit_encoded_int, read_7bit_encoded_int_from_stream, write_7bit_int,
+    decode_7bit_int, decode_7bit_ints, encode_7bit_int, encode_7bit_ints)
 from unittest import TestCase
 
 
@@ -48,3 +49,23 @@ class StringLengthTest(TestCase):
                 })
         if errors:
             raise AssertionError(errors)
+
+    def test_decode_7bit_int(self):
+        for key, src in self.map.items():
+            self.assertEqual(decode_7bit_int(b'\xff' + src, offset=1),
+                             (int(key), len(src) + 1))
+
+    def test_encode_7bit_int(self):
+        for key, src in self.map.items():
+            out = bytearray(b'\xff')
+            self.assertEqual(encode_7bit_int(int(key), out), len(src))
+            self.assertEqual(out, b'\xff' + src)
+        self.assertRaises(ValueError, encode_7bit_int, -1, bytearray())
+
+    def test_batch(self):
+        values = [10, 390, 0, 2 ** 32 - 1]
+        out = bytearray()
+        size = encode_7bit_ints(values, out)
+        self.assertEqual(size, len(out))
+        self.assertEqual(decode_7bit_ints(out, len(values)),
+                         (values, len(out)))
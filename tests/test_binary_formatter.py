@@ -6,10 +6,16 @@
 .. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 .. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 """
+from struct import pack
+
 import allure
 from udlg import enums
-from udlg.builder import BinaryFormatterFileBuilder
+from udlg.builder import BinaryFormatterFileBuilder, BACKENDS
 from udlg.structure import records
+from udlg.structure.compact import ARRAY_INFO_STRUCT
+from udlg.structure.records import BINARY_ARRAY_STRUCT
+from udlg.structure.constants import UINT32_STRUCT
+from udlg.structure.structure import HEADER_STRUCT
 from unittest import TestCase
 
 #: todo make test check if stream is open as binary one
@@ -271,3 +277,85 @@ class BinaryFormatterFileTest(TestCase):
             self.assertIsInstance(
                 instance.records[instance.count - 1].entry, records.MessageEnd
             )
+
+    @allure.story('double')
+    def test_double_array_view(self):
+        instance = BinaryFormatterFileBuilder.build(
+            stream=self.double_array_file
+        )
+        entry = instance.records[0].entry
+        with allure.step('check view'):
+            view = entry.get_member_view()
+            self.assertEqual(view.format, 'd')
+            self.assertEqual(len(view), entry.array_info.length)
+            self.assertEqual(view.tolist(), entry.get_member_list())
+
+    @allure.story('member view')
+    def test_member_view_write(self):
+        instance = BinaryFormatterFileBuilder.build(
+            stream=self.uint32_array_file
+        )
+        entry = instance.records[0].entry
+        members = entry.get_member_list()
+        with allure.step('member list is a copy'):
+            members[0] = 0
+            self.assertNotEqual(entry.get_member_list(), members)
+        with allure.step('view changes are visible'):
+            entry.get_member_view()[0] = 12345
+            self.assertEqual(entry.get_member_list()[0], 12345)
+            self.assertIn(UINT32_STRUCT.pack(12345), instance.to_bin())
+
+    @allure.story('char')
+    def test_char_array(self):
+        data = (
+            HEADER_STRUCT.pack(0, 1, -1, 1, 0) +
+            ARRAY_INFO_STRUCT.pack(enums.RecordTypeEnum.ArraySinglePrimitive,
+                                   1, 3) +
+            bytes((enums.PrimitiveTypeEnum.Char, )) + b'abc' +
+            bytes((enums.RecordTypeEnum.MessageEnd, ))
+        )
+        instance = BinaryFormatterFileBuilder.build(data)
+        self.assertEqual(instance.records[0].entry.get_member_list(), b'abc')
+        self.assertEqual(instance.to_bin(), data)
+
+
+@allure.feature('Binary Formatter')
+class BackendParityTest(TestCase):
+    def setUp(self):
+        self.data = (
+            HEADER_STRUCT.pack(0, 1, -1, 1, 0) +
+            bytes((enums.RecordTypeEnum.BinaryArray, )) +
+            BINARY_ARRAY_STRUCT.pack(
+                1, enums.BinaryArrayTypeEnum.RectangularOffset, 2
+            ) +
+            pack('<2I', 1, 1) + pack('<2i', -1, 3) +
+            bytes((enums.BinaryTypeEnum.SystemClass, 13)) +
+            b'System.Object' +
+            bytes((enums.RecordTypeEnum.ObjectNull, )) +
+            ARRAY_INFO_STRUCT.pack(enums.RecordTypeEnum.ArraySinglePrimitive,
+                                   2, 3) +
+            bytes((enums.PrimitiveTypeEnum.Char, )) + b'abc' +
+            bytes((enums.RecordTypeEnum.MessageEnd, ))
+        )
+
+    @allure.story('backends')
+    def test_to_dict(self):
+        documents = dict(
+            (backend, BinaryFormatterFileBuilder.build(self.data,
+                                                       backend=backend))
+            for backend in BACKENDS
+        )
+        expected = [record.to_dict() for record in documents['ctypes'].records]
+        with allure.step('check'):
+            self.assertEqual(expected[0]['entry']['lower_bounds'], [-1, 3])
+            self.assertEqual(expected[2]['entry']['members'], b'abc')
+        for backend, document in documents.items():
+            with allure.step('compare %s backend' % backend):
+                self.assertEqual(
+                    [record.to_dict() for record in document.records],
+                    expected
+                )
+                self.assertEqual(
+                    document.records[2].entry.get_member_list(), b'abc'
+                )
+                self.assertEqual(bytes(document.to_bin()), self.data)
@@ -7,10 +7,19 @@
 .. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 """
 import io
+import mmap
+import tempfile
+from struct import pack
+from unittest.mock import patch
+
 import allure
 from udlg import enums
 from udlg.structure import records
-from udlg.builder import BinaryFormatterFileBuilder, UDLGBuilder
+from udlg.structure.layout import ClassLayout
+from udlg.structure.records import BINARY_ARRAY_STRUCT
+from udlg.structure.structure import HEADER_STRUCT
+from udlg.builder import BinaryFormatterFileBuilder, UDLGBuilder, BACKENDS
+from udlg.utils.writer import BufferWriter
 from unittest import TestCase
 
 
@@ -87,3 +96,124 @@ class BinaryFormatterFileTest(TestCase):
                 len(instance.to_bin()),
                 self.class_with_id2_file.tell()
             )
+
+    @allure.story('to bin')
+    def test_binary_array_lower_bounds(self):
+        arrays = (
+            (enums.BinaryArrayTypeEnum.SingleOffset, (2, ), (5, )),
+            (enums.BinaryArrayTypeEnum.RectangularOffset, (1, 2), (3, 4)),
+        )
+        for binary_type, lengths, lower_bounds in arrays:
+            rank = len(lengths)
+            data = (
+                HEADER_STRUCT.pack(0, 1, -1, 1, 0) +
+                bytes((enums.RecordTypeEnum.BinaryArray, )) +
+                BINARY_ARRAY_STRUCT.pack(1, binary_type, rank) +
+                pack('<%iI' % rank, *lengths) +
+                pack('<%ii' % rank, *lower_bounds) +
+                bytes((enums.BinaryTypeEnum.SystemClass, 13)) +
+                b'System.Object' +
+                bytes((enums.RecordTypeEnum.ObjectNull, ) * 2) +
+                bytes((enums.RecordTypeEnum.MessageEnd, ))
+            )
+            for backend in BACKENDS:
+                step = '%s, %s backend' % (binary_type.name, backend)
+                with allure.step(step):
+                    instance = BinaryFormatterFileBuilder.build(
+                        data, backend=backend
+                    )
+                    entry = instance.records[0].entry
+                    self.assertEqual(entry.to_dict()['lower_bounds'],
+                                     list(lower_bounds))
+                    self.assertEqual(bytes(instance.to_bin()), data)
+
+
+@allure.feature('Binary Writer')
+class WriteToTest(TestCase):
+    def setUp(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            self.data = stream.read()
+        self.instance = UDLGBuilder.build(self.data)
+
+    @allure.story('write to')
+    def test_write_to_stream(self):
+        stream = io.BytesIO()
+        with allure.step('write'):
+            self.instance.write_to(stream)
+        with allure.step('check'):
+            self.assertEqual(stream.getvalue(), self.data)
+
+    @allure.story('write to')
+    def test_write_to_not_cached(self):
+        with open('tests/documents/Lucas1.txt', 'rb') as stream:
+            self.instance.load_i18n(stream, cache=True)
+        bin_cache = self.instance.data.state.bin_cache
+        stream = io.BytesIO()
+        with allure.step('records are not cached'):
+            self.instance.write_to(stream)
+            self.assertEqual(len(bin_cache), 0)
+        with allure.step('check'):
+            self.assertEqual(stream.getvalue(), self.instance.to_bin())
+            self.assertEqual(len(bin_cache), len(self.instance.records))
+
+    @allure.story('write to')
+    def test_write_to_preallocated(self):
+        with allure.step('preallocated bytearray'):
+            buffer = bytearray(len(self.data))
+            writer = BufferWriter(buffer)
+            self.instance.write_to(writer)
+            self.assertEqual(writer.tell(), len(self.data))
+            self.assertEqual(buffer, self.data)
+        with allure.step('mmap'):
+            with tempfile.TemporaryFile() as stream:
+                stream.truncate(len(self.data))
+                with mmap.mmap(stream.fileno(), len(self.data)) as buffer:
+                    self.instance.write_to(buffer)
+                stream.seek(0)
+                self.assertEqual(stream.read(), self.data)
+        with allure.step('overflow'):
+            writer = BufferWriter(bytearray(len(self.data) - 1))
+            self.assertRaises(ValueError, self.instance.write_to, writer)
+
+
+@allure.feature('Binary Writer')
+class EncodePlanTest(TestCase):
+    @allure.story('encode plan')
+    def test_plan_cached(self):
+        with allure.step('plan'):
+            plan = records.ClassWithId.get_encode_plan()
+            self.assertIs(records.ClassWithId.get_encode_plan(), plan)
+
+    @allure.story('encode plan')
+    def test_primitive_arrays_round_trip(self):
+        names = ('bool_array', 'double_array', 'float_array', 'int_array',
+                 'uint32_array', 'uint64_array', 'ushort_array')
+        for name in names:
+            with allure.step(name):
+                with open('tests/documents/%s.dat' % name, 'rb') as stream:
+                    data = stream.read()
+                instance = BinaryFormatterFileBuilder.build(data)
+                self.assertEqual(bytes(instance.to_bin()), data)
+
+    @allure.story('encode plan')
+    def test_members_layout_kept(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            data = stream.read()
+        instance = UDLGBuilder.build(data)
+        records_ptr = instance.data.records_ptr
+        class_types = (enums.RecordTypeEnum.ClassWithId,
+                       enums.RecordTypeEnum.ClassWithMembersAndTypes)
+        with allure.step('layout'):
+            entries = [
+                records_ptr[index].entry
+                for index in range(instance.data.count)
+                if records_ptr[index].record_type in class_types
+            ]
+            self.assertTrue(entries)
+            for entry in entries:
+                self.assertIsInstance(entry.layout, ClassLayout)
+                self.assertNotIn('layout', entry.to_dict())
+        with allure.step('write'):
+            with patch.object(ClassLayout, 'from_entries') as from_entries:
+                self.assertEqual(bytes(instance.to_bin()), data)
+            self.assertEqual(from_entries.call_count, 0)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: tests.test_cache
+    :synopsis: Unit tests for persistent parse cache
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import os
+import tempfile
+from hashlib import sha256
+
+import allure
+from udlg.builder import UDLGBuilder
+from udlg.cache import ParseCache, Snapshot
+from unittest import TestCase
+
+
+@allure.feature('Parse cache')
+class ParseCacheTest(TestCase):
+    def setUp(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            self.data = stream.read()
+        with open('tests/documents/Lucas1.txt', 'rb') as stream:
+            self.block = stream.read()
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_snapshot(self):
+        UDLGBuilder.build(self.data, lazy=True, cache=self.cache)
+        return self.cache.load(self.data, offset=24)
+
+    @allure.story('snapshot')
+    def test_snapshot(self):
+        snapshot = self.get_snapshot()
+        with allure.step('check'):
+            self.assertIsNotNone(snapshot)
+            self.assertEqual(len(snapshot.types), 96)
+            self.assertEqual(len(list(snapshot.iter_slots())), 155)
+        with allure.step('binary round trip'):
+            loaded = Snapshot.from_bin(snapshot.to_bin())
+            self.assertEqual(loaded.offset, snapshot.offset)
+            self.assertEqual(loaded.offsets, snapshot.offsets)
+            self.assertEqual(loaded.types, snapshot.types)
+            self.assertEqual(loaded.definitions, snapshot.definitions)
+            self.assertEqual(loaded.slots, snapshot.slots)
+        with allure.step('broken'):
+            self.assertRaises(ValueError, Snapshot.from_bin, b'UDLGSNAP')
+            self.assertRaises(ValueError, Snapshot.from_bin,
+                              snapshot.to_bin()[:-1])
+
+    @allure.story('load')
+    def test_load(self):
+        with allure.step('miss'):
+            self.assertIsNone(self.cache.load(self.data, offset=24))
+            self.assertIsNotNone(self.get_snapshot())
+            self.assertIsNone(self.cache.load(self.data[:-1], offset=24))
+        with allure.step('other library version'):
+            cache = ParseCache(self.directory.name)
+            cache.version = '0.0.0.test'
+            self.assertIsNone(cache.load(self.data, offset=24))
+        with allure.step('corrupted'):
+            path = self.cache.get_path(self.cache.get_key(self.data))
+            with open(path, 'wb') as stream:
+                stream.write(b'corrupted')
+            self.assertIsNone(self.cache.load(self.data, offset=24))
+            self.assertFalse(os.path.exists(path))
+
+    @allure.story('load')
+    def test_key(self):
+        with allure.step('check'):
+            key = self.cache.get_key(self.data)
+            self.assertEqual(key, '%s-%s' % (sha256(self.data).hexdigest(),
+                                             self.cache.version))
+
+    @allure.story('evict')
+    def test_evict(self):
+        snapshot = self.get_snapshot()
+        size = len(snapshot.to_bin())
+        cache = ParseCache(self.directory.name, max_size=size * 2)
+        for index in range(3):
+            cache.store(self.data + bytes(index + 1), snapshot)
+        with allure.step('check'):
+            self.assertLessEqual(cache.get_size(), size * 2)
+            self.assertIsNone(cache.load(self.data, offset=24))
+            self.assertIsNotNone(cache.load(self.data + bytes(3), offset=24))
+        with allure.step('clear'):
+            cache.clear()
+            self.assertEqual(cache.get_size(), 0)
+
+    @allure.story('build')
+    def test_build(self):
+        expected = UDLGBuilder.build(self.data).data.to_dict()
+        for _ in range(2):
+            instance = UDLGBuilder.build(self.data, lazy=True,
+                                         keep_source=True, cache=self.cache)
+            self.assertEqual(instance.data.to_dict(), expected)
+            self.assertEqual(instance.to_bin(), self.data)
+        self.assertRaises(ValueError, UDLGBuilder.build, self.data,
+                          cache=self.cache)
+
+    @allure.story('i18n')
+    def test_i18n(self):
+        expected = UDLGBuilder.extract_i18n(self.data)
+        document = UDLGBuilder.build(self.data)
+        document.load_i18n(self.block)
+        for _ in range(2):
+            with allure.step('extract'):
+                self.assertEqual(
+                    UDLGBuilder.extract_i18n(self.data, cache=self.cache),
+                    expected
+                )
+            with allure.step('apply'):
+                sink = bytearray()
+                UDLGBuilder.apply_i18n(self.data, self.block, sink,
+                                       cache=self.cache)
+                self.assertEqual(bytes(sink), document.to_bin())
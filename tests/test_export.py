@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: tests.test_export
+    :synopsis: Unit tests for streaming JSON export
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import io
+import json
+
+import allure
+from udlg.builder import BinaryFormatterFileBuilder, UDLGBuilder, BACKENDS
+from udlg.export import ENCODER, FORMAT_NDJSON, write_json
+from unittest import TestCase
+
+
+def export(document, format='json'):
+    stream = io.StringIO()
+    count = write_json(document, stream, format=format)
+    return stream.getvalue(), count
+
+
+@allure.feature('Export')
+class ExportTest(TestCase):
+    def setUp(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            self.data = stream.read()
+
+    @allure.story('json')
+    def test_json(self):
+        for backend in BACKENDS:
+            with allure.step('%s backend' % backend):
+                document = UDLGBuilder.build(self.data, backend=backend)
+                output, count = export(document)
+                self.assertEqual(count, 96)
+                #: the same output whole document tree gives
+                self.assertEqual(output, ENCODER.encode(document.to_dict()))
+                data = json.loads(output)
+                self.assertEqual(data['data']['count'], 96)
+                self.assertEqual(
+                    data['header']['signature'].encode(
+                        'utf-8', 'surrogateescape'
+                    ),
+                    self.data[:24]
+                )
+                name = data['data']['records'][1]['entry']['class_info'][
+                    'name'
+                ]
+                self.assertEqual(name, {'size': 2, 'value': 'DM'})
+
+    @allure.story('ndjson')
+    def test_ndjson(self):
+        document = UDLGBuilder.build(self.data)
+        output, count = export(document, format=FORMAT_NDJSON)
+        lines = output.splitlines()
+        self.assertEqual(len(lines), count + 1)
+        headers = json.loads(lines[0])
+        self.assertEqual(headers['data']['header']['root_id'], 1)
+        self.assertNotIn('records', headers['data'])
+        records = json.loads(export(document)[0])['data']['records']
+        self.assertEqual([json.loads(line) for line in lines[1:]], records)
+
+    @allure.story('lazy')
+    def test_lazy(self):
+        document = UDLGBuilder.build(self.data, lazy=True)
+        output, count = export(document)
+        with allure.step('records are not cached'):
+            records = document.data.records
+            self.assertFalse(any(
+                records.is_decoded(index) for index in range(count)
+            ))
+        with allure.step('output'):
+            expected = UDLGBuilder.build(self.data)
+            self.assertEqual(output, export(expected)[0])
+
+    @allure.story('binary formatter')
+    def test_binary_formatter(self):
+        for name in ('int_array', 'string_array', 'class_with_id'):
+            with allure.step(name):
+                with open('tests/documents/%s.dat' % name, 'rb') as stream:
+                    data = stream.read()
+                outputs = [
+                    export(BinaryFormatterFileBuilder.build(
+                        data, backend=backend
+                    ))[0] for backend in BACKENDS
+                ]
+                self.assertEqual(outputs[0], outputs[1])
+                self.assertIn('records', json.loads(outputs[0]))
+
+    @allure.story('wrong format')
+    def test_wrong_format(self):
+        document = UDLGBuilder.build(self.data)
+        with self.assertRaises(ValueError):
+            export(document, format='xml')
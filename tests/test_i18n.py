@@ -8,10 +8,15 @@
 """
 from __future__ import unicode_literals
 
+import io
 import sys
 import allure
 from unittest import TestCase
-from udlg.utils.i18n import get_i18n_items
+from udlg.builder import UDLGBuilder, BACKENDS
+from udlg.utils.i18n import (
+    CHUNK_SIZE, ESCAPED_HEADER, escape_i18n, get_i18n_items,
+    iter_i18n_items, unescape_i18n, write_i18n_items
+)
 
 
 @allure.feature('i18n')
@@ -30,3 +35,84 @@ class I18nTest(TestCase):
         self.assertEqual(len(items), 4)
         self.assertEqual(set(items), {1, 5, 6, 91})
         self.assertEqual(items[91][3], "Тут немного юникода")
+
+    @allure.story('legacy')
+    def test_legacy(self):
+        block = (
+            "junk line\n"
+            "1,0=>'Don't stop'\n"
+            "now'\n"
+            "\n"
+            "1,2=>''\r\n"
+            "2,1=>'ammo\\bolt'"
+        ).encode('utf-8')
+        for chunk_size in (1, 3, CHUNK_SIZE):
+            with allure.step('chunk size %i' % chunk_size):
+                self.assertEqual(
+                    list(iter_i18n_items(io.BytesIO(block), chunk_size)),
+                    [(1, 0, b"Don't stop'\nnow"), (1, 2, b""),
+                     (2, 1, b"ammo\\bolt")]
+                )
+        with allure.step('unterminated'):
+            with self.assertRaises(ValueError):
+                list(iter_i18n_items(b"1,0=>'text\n2,0=>'text'"))
+
+    @allure.story('escaped')
+    def test_escaped(self):
+        items = [
+            (1, 0, "Don't stop'\nnow\r\n".encode('utf-8')),
+            (1, 2, b""),
+            (2, 1, b"ammo\\bolt\\n"),
+            (91, 3, "Тут немного юникода".encode('utf-8')),
+        ]
+        with allure.step('escape'):
+            for _, _, content in items:
+                escaped = escape_i18n(content)
+                self.assertNotIn(b"\n", escaped)
+                self.assertEqual(unescape_i18n(escaped), content)
+        with allure.step('write'):
+            stream = io.BytesIO()
+            self.assertEqual(write_i18n_items(items, stream, chunk_size=8),
+                             len(items))
+            block = stream.getvalue()
+            self.assertTrue(block.startswith(ESCAPED_HEADER + b"\n"))
+            self.assertEqual(len(block.splitlines()), len(items) + 1)
+        with allure.step('read'):
+            for chunk_size in (1, 5, CHUNK_SIZE):
+                self.assertEqual(
+                    list(iter_i18n_items(io.BytesIO(block), chunk_size)),
+                    items
+                )
+            self.assertEqual(get_i18n_items(block)[91][3],
+                             "Тут немного юникода")
+        with allure.step('malformed'):
+            for line in (b"1,0=>'text", b"1,0=>'te\\xt'", b"text"):
+                with self.assertRaises(ValueError):
+                    list(iter_i18n_items(ESCAPED_HEADER + b"\n" + line))
+
+    @allure.story('document')
+    def test_document(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            data = stream.read()
+        with open('tests/documents/Lucas1.txt', 'rb') as stream:
+            legacy = stream.read()
+        for backend in BACKENDS:
+            with allure.step('%s backend' % backend):
+                document = UDLGBuilder.build(data, backend=backend)
+                document.load_i18n(legacy)
+                expected = document.to_bin()
+                stream = io.BytesIO()
+                count = document.unpack_i18n(stream)
+                self.assertEqual(count, len(list(document.iter_strings())))
+                sink = bytearray()
+                UDLGBuilder.extract_i18n(expected, sink=sink)
+                self.assertEqual(sink, stream.getvalue())
+
+                document = UDLGBuilder.build(data, backend=backend)
+                stream.seek(0)
+                document.load_i18n(stream)
+                self.assertEqual(document.to_bin(), expected)
+                stream.seek(0)
+                sink = bytearray()
+                UDLGBuilder.apply_i18n(data, stream, sink)
+                self.assertEqual(sink, expected)
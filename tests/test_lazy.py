@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: tests.test_lazy
+    :synopsis: Unit tests for lazy documents
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import allure
+from udlg import enums
+from udlg.builder import BinaryFormatterFileBuilder, UDLGBuilder
+from udlg.structure import records
+from unittest import TestCase
+
+
+@allure.feature('Lazy')
+class LazyDocumentTest(TestCase):
+    def setUp(self):
+        self.lucas = open('tests/documents/Lucas1.udlg', 'rb')
+        self.lucas_i18n = open('tests/documents/Lucas1.txt', 'rb')
+        self.class_with_id_file = open('tests/documents/class_with_id.dat',
+                                       'rb')
+
+    def tearDown(self):
+        self.lucas.close()
+        self.lucas_i18n.close()
+        self.class_with_id_file.close()
+
+    @allure.story('index')
+    def test_index(self):
+        instance = UDLGBuilder.build(self.lucas, lazy=True)
+        record_list = instance.data.records
+        with allure.step('nothing decoded'):
+            self.assertEqual(instance.data.count, 96)
+            self.assertEqual(len(record_list), 96)
+            self.assertFalse(any(record_list.is_decoded(i)
+                                 for i in range(96)))
+            self.assertEqual(record_list.get_record_type(95),
+                             enums.RecordTypeEnum.MessageEnd)
+        with allure.step('decode on access'):
+            self.assertIsInstance(record_list[-1].entry, records.MessageEnd)
+            self.assertTrue(record_list.is_decoded(95))
+            self.assertIs(record_list[95], record_list[-1])
+            self.assertFalse(record_list.is_decoded(94))
+
+    @allure.story('class with id')
+    def test_class_with_id(self):
+        instance = BinaryFormatterFileBuilder.build(self.class_with_id_file,
+                                                    lazy=True)
+        entry = instance.records[15].entry
+        with allure.step('class reference is decoded on demand'):
+            self.assertIsInstance(entry, records.ClassWithId)
+            self.assertEqual(entry.get_member_list()[1:], [1340, True])
+            self.assertEqual(entry.get_member_list()[0], b"bla-bla-fier")
+
+    @allure.story('class definitions')
+    def test_class_definitions(self):
+        instance = UDLGBuilder.build(self.lucas, lazy=True)
+        record_list = instance.data.records
+        classes = record_list.object_id_map.classes
+        entry = record_list[41].entry
+        with allure.step('definition is decoded for class with id'):
+            self.assertIsInstance(entry, records.ClassWithId)
+            definition = classes[entry.metadata_id]
+            self.assertIs(entry.class_reference, definition.record)
+            self.assertEqual(definition.record.class_info.object_id,
+                             entry.metadata_id)
+        with allure.step('definition'):
+            self.assertEqual(len(definition.names),
+                             definition.layout.members_count)
+            self.assertEqual(len(entry.get_member_list()),
+                             definition.layout.members_count)
+            self.assertIs(
+                definition.layout,
+                record_list.object_id_map.layouts[entry.metadata_id]
+            )
+
+    @allure.story('consistency')
+    def test_same_as_eager(self):
+        data = self.lucas.read()
+        instance = UDLGBuilder.build(data, lazy=True)
+        eager = UDLGBuilder.build(data)
+        with allure.step('to bin'):
+            self.assertEqual(instance.to_bin(), data)
+        with allure.step('unpack i18n'):
+            self.assertEqual(instance.unpack_i18n(), eager.unpack_i18n())
+        with allure.step('load i18n'):
+            block = self.lucas_i18n.read()
+            instance.load_i18n(block)
+            eager.load_i18n(block)
+            self.assertEqual(instance.to_bin(), eager.to_bin())
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: tests.test_profile
+    :synopsis: Unit tests for decoding profile
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import allure
+from udlg.builder import UDLGBuilder, BACKENDS
+from udlg.enums import RecordTypeEnum
+from udlg.profile import Profile
+from udlg.structure.structure import HEADER_STRUCT, SIGNATURE_SIZE
+from unittest import TestCase
+
+
+def get_counts(counters):
+    return dict(
+        (record_type, (counter.count, counter.size))
+        for record_type, counter in counters.items()
+    )
+
+
+@allure.feature('Profile')
+class ProfileTest(TestCase):
+    def setUp(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            self.data = stream.read()
+
+    @allure.story('build')
+    def test_build(self):
+        profiles = []
+        for backend in BACKENDS:
+            with allure.step('%s backend' % backend):
+                self.assertIsNone(
+                    UDLGBuilder.build(self.data, backend=backend).profile
+                )
+                profile = UDLGBuilder.build(self.data, backend=backend,
+                                            profile=True).profile
+                records = profile.records
+                self.assertEqual(records[RecordTypeEnum.ClassWithId].count,
+                                 40)
+                self.assertEqual(
+                    profile.members[RecordTypeEnum.BinaryObjectString].count,
+                    155
+                )
+                #: top level records take the whole document but header
+                self.assertEqual(
+                    sum(counter.size for counter in records.values()),
+                    len(self.data) - SIGNATURE_SIZE - HEADER_STRUCT.size
+                )
+                self.assertEqual(profile.member_type_info.count, 57)
+                self.assertGreater(profile.strings.time, 0)
+                profiles.append(profile)
+        with allure.step('backends'):
+            ctypes_profile, compact_profile = profiles
+            self.assertEqual(get_counts(ctypes_profile.records),
+                             get_counts(compact_profile.records))
+            self.assertEqual(get_counts(ctypes_profile.members),
+                             get_counts(compact_profile.members))
+
+    @allure.story('lazy')
+    def test_lazy(self):
+        instance = UDLGBuilder.build(self.data, lazy=True, profile=True)
+        profile = instance.profile
+        self.assertEqual(profile.records, {})
+        instance.records[41]
+        self.assertEqual(get_counts(profile.records),
+                         {RecordTypeEnum.ClassWithId: (1, 89)})
+
+    @allure.story('report')
+    def test_report(self):
+        profile = UDLGBuilder.build(self.data, profile=True).profile
+        total = Profile()
+        total.update(profile)
+        total.update(profile)
+        with allure.step('update'):
+            self.assertEqual(
+                total.records[RecordTypeEnum.ClassWithId].count, 80
+            )
+            self.assertEqual(total.strings.count, profile.strings.count * 2)
+        with allure.step('report'):
+            self.assertEqual(
+                total.to_dict()['records']['ClassWithId']['count'], 80
+            )
+            report = total.format()
+            self.assertIn('ClassWithMembersAndTypes', report)
+            self.assertIn('member BinaryObjectString', report)
+            self.assertIn('MemberTypeInfo', report)
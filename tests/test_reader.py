@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: tests.test_reader
+    :synopsis: Unit tests for buffered cursor reader
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import io
+import allure
+from struct import Struct
+from udlg.builder import UDLGBuilder
+from udlg.utils.reader import BinaryReader, open_reader
+from unittest import TestCase
+
+
+@allure.feature('Reader')
+class BinaryReaderTest(TestCase):
+    def setUp(self):
+        self.lucas = open('tests/documents/Lucas1.udlg', 'rb')
+
+    def tearDown(self):
+        self.lucas.close()
+
+    @allure.story('bytes')
+    def test_bytes_reader(self):
+        reader = BinaryReader(b'\x01\x02\x00\x00\x00\x86\x03abc')
+        with allure.step('read'):
+            self.assertEqual(reader.peek_byte(), 1)
+            self.assertEqual(reader.read_byte(), 1)
+            self.assertEqual(reader.unpack(Struct('<i')), (2, ))
+            self.assertEqual(reader.read_7bit_int(), 390)
+            self.assertEqual(reader.read(3), b'abc')
+            self.assertEqual(reader.tell(), reader.size)
+
+    @allure.story('mmap')
+    def test_file_reader(self):
+        self.lucas.seek(24)
+        with open_reader(self.lucas) as reader:
+            with allure.step('offset follows stream position'):
+                self.assertEqual(reader.tell(), 24)
+                reader.skip(17)
+        with allure.step('stream position synced back'):
+            self.assertEqual(self.lucas.tell(), 41)
+
+    @allure.story('mmap')
+    def test_build_sources(self):
+        data = self.lucas.read()
+        self.lucas.seek(0)
+        with allure.step('build from different sources'):
+            from_file = UDLGBuilder.build(self.lucas)
+            from_stream = UDLGBuilder.build(io.BytesIO(data))
+            from_bytes = UDLGBuilder.build(data)
+        with allure.step('check'):
+            self.assertEqual(self.lucas.tell(), len(data))
+            self.assertEqual(from_file.to_bin(), data)
+            self.assertEqual(from_stream.to_bin(), data)
+            self.assertEqual(from_bytes.to_bin(), data)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: tests.test_registry
+    :synopsis: Unit tests for record type registry
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import allure
+from udlg import enums
+from udlg.builder import (
+    BinaryFormatterFileBuilder, UDLGBuilder, BACKENDS, BACKEND_COMPACT
+)
+from udlg.structure import compact, records
+from udlg.structure.constants import INT32_STRUCT
+from udlg.structure.registry import RecordRegistry
+from unittest import TestCase
+
+RecordType = enums.RecordTypeEnum
+
+
+class MethodCall(compact.RecordStructure):
+    """
+    BinaryMethodCall with no context and no inline arguments
+    """
+    __slots__ = ('record_type', 'flags', 'method_name', 'type_name')
+    _fields_ = __slots__
+
+    def _initiate(self, stream, object_id_map):
+        self.record_type = stream.read_byte()
+        self.flags, = stream.unpack(INT32_STRUCT)
+        #: string values are prefixed with primitive type (String)
+        stream.read_byte()
+        self.method_name = compact.read_string(stream)
+        stream.read_byte()
+        self.type_name = compact.read_string(stream)
+
+    def _write_bin(self, write):
+        string = bytes((enums.PrimitiveTypeEnum.String, ))
+        write(bytes((self.record_type, )))
+        write(INT32_STRUCT.pack(self.flags))
+        write(string)
+        self.method_name._write_bin(write)
+        write(string)
+        self.type_name._write_bin(write)
+
+
+class ArraySingleObject(compact.ArraySingleString):
+    __slots__ = ()
+
+
+class ObjectNull(records.ObjectNull):
+    decoded = 0
+
+    def _initiate(self, stream):
+        ObjectNull.decoded += 1
+        super(ObjectNull, self)._initiate(stream)
+
+
+@allure.feature('Record type registry')
+class RecordRegistryTest(TestCase):
+    def setUp(self):
+        with open('tests/documents/sample.dat', 'rb') as stream:
+            self.sample = stream.read()
+
+    def register(self, registry, record_type, record_class):
+        self.addCleanup(registry.register, record_type,
+                        registry.get(record_type))
+        registry.register(record_type, record_class)
+
+    @allure.story('registry')
+    def test_registry(self):
+        registry = RecordRegistry({RecordType.ObjectNull: ObjectNull})
+        with allure.step('lookup'):
+            self.assertIs(registry[RecordType.ObjectNull], ObjectNull)
+            self.assertIn(RecordType.ObjectNull, registry)
+            self.assertNotIn(RecordType.MethodCall, registry)
+            self.assertIsNone(registry.get(RecordType.MethodCall))
+            with self.assertRaises(NotImplementedError):
+                registry[RecordType.MethodCall]
+        with allure.step('register'):
+            decorator = registry.register(RecordType.MethodCall)
+            self.assertIs(decorator(MethodCall), MethodCall)
+            self.assertIs(registry[RecordType.MethodCall], MethodCall)
+            with self.assertRaises(ValueError):
+                registry.register(256, MethodCall)
+        with allure.step('unregister'):
+            self.assertIs(registry.unregister(RecordType.MethodCall),
+                          MethodCall)
+            self.assertIsNone(registry.unregister(RecordType.MethodCall))
+
+    @allure.story('not supported')
+    def test_not_supported(self):
+        for backend in BACKENDS:
+            with allure.step('%s backend' % backend):
+                with self.assertRaises(NotImplementedError):
+                    BinaryFormatterFileBuilder.build(self.sample,
+                                                     backend=backend)
+
+    @allure.story('register')
+    def test_register(self):
+        self.register(compact.RecordTypeSet, RecordType.MethodCall,
+                      MethodCall)
+        self.register(compact.RecordTypeSet, RecordType.ArraySingleObject,
+                      ArraySingleObject)
+        document = BinaryFormatterFileBuilder.build(self.sample,
+                                                    backend=BACKEND_COMPACT)
+        entry = document.records[0].entry
+        self.assertIsInstance(entry, MethodCall)
+        self.assertEqual(entry.method_name.value, b'SendAddress')
+        self.assertIsInstance(document.records[1].entry, ArraySingleObject)
+        self.assertEqual(document.records[-1].record_type,
+                         RecordType.MessageEnd)
+        self.assertEqual(document.to_bin(), self.sample)
+
+    @allure.story('override')
+    def test_override(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            data = stream.read()
+        self.register(records.RecordTypeSet, RecordType.ObjectNull,
+                      ObjectNull)
+        ObjectNull.decoded = 0
+        document = UDLGBuilder.build(data)
+        self.assertGreater(ObjectNull.decoded, 0)
+        self.assertEqual(document.to_bin(), data)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: tests.test_search
+    :synopsis: Unit tests for binary sequence search
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import io
+import allure
+from udlg.utils import search, search_all, iter_search
+from unittest import TestCase
+
+
+@allure.feature('Search')
+class SearchTest(TestCase):
+    def setUp(self):
+        self.data = b'abcab' + b'\x00' * 10 + b'aab' + b'\x00' * 3 + b'ab'
+        self.offsets = [0, 3, 16, 21]
+        self.lucas = open('tests/documents/Lucas1.udlg', 'rb')
+
+    def tearDown(self):
+        self.lucas.close()
+
+    @allure.story('buffer')
+    def test_search_buffer(self):
+        with allure.step('search all'):
+            self.assertEqual(search_all(b'ab', self.data), self.offsets)
+            self.assertEqual(search_all('ab', self.data, stream_offset=1),
+                             self.offsets[1:])
+        with allure.step('search'):
+            self.assertEqual(search(b'ab', self.data, stream_offset=4), 16)
+            self.assertRaises(IndexError, search, b'abc', self.data, 1)
+
+    @allure.story('stream')
+    def test_search_stream(self):
+        stream = io.BytesIO(self.data)
+        stream.seek(7)
+        with allure.step('entries crossing chunk bounds'):
+            for chunk_size in (1, 2, 3, 5, 64):
+                offsets = list(
+                    iter_search(b'ab', stream, chunk_size=chunk_size)
+                )
+                self.assertEqual(offsets, self.offsets)
+        with allure.step('non overlapping entries'):
+            self.assertEqual(
+                list(iter_search(b'aa', io.BytesIO(b'aaaaa'), chunk_size=2)),
+                [0, 2]
+            )
+        with allure.step('stream position is restored'):
+            self.assertEqual(stream.tell(), 7)
+
+    @allure.story('mmap')
+    def test_search_file(self):
+        data = self.lucas.read()
+        self.lucas.seek(0)
+        offsets = search_all(b'Merchant', self.lucas)
+        self.assertTrue(offsets)
+        self.assertEqual(offsets, search_all(b'Merchant', io.BytesIO(data)))
+        self.assertEqual(self.lucas.tell(), 0)
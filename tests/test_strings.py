@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: tests.test_strings
+    :synopsis: Unit tests for columnar string table
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import allure
+from udlg.builder import UDLGBuilder
+from udlg.structure.strings import StringTable
+from unittest import TestCase
+
+
+@allure.feature('String table')
+class StringTableTest(TestCase):
+    def setUp(self):
+        self.values = [b'ab', b'', b'cab', b'xa', b'ab', b'aab']
+        self.table = StringTable(self.values)
+
+    @allure.story('table')
+    def test_table(self):
+        table = self.table
+        with allure.step('check'):
+            self.assertEqual(len(table), len(self.values))
+            self.assertEqual(list(table), self.values)
+            self.assertEqual(table[2], b'cab')
+            self.assertEqual(bytes(table.get_view(2)), b'cab')
+            self.assertEqual(table.to_bin(2), b'\x03cab')
+        with allure.step('set'):
+            table.set(0, b'longer ab')
+            table.set(2, b'c')
+            self.assertEqual(table[0], b'longer ab')
+            self.assertEqual(table[2], b'c')
+            self.assertEqual(table.waste, 4)
+        with allure.step('pack'):
+            table.pack()
+            self.assertEqual(table.waste, 0)
+            self.assertEqual(len(table.buffer), sum(map(len, table)))
+            self.assertEqual(table[0], b'longer ab')
+
+    @allure.story('find')
+    def test_find(self):
+        table = self.table
+        with allure.step('find'):
+            self.assertEqual(list(table.find(b'ab')), [0, 2, 4, 5])
+            #: b'xa' + b'ab' entry crosses strings bound
+            self.assertEqual(list(table.find(b'aa')), [5])
+            self.assertEqual(list(table.find(b'ba')), [])
+            self.assertRaises(ValueError, list, table.find(b''))
+        with allure.step('find changed'):
+            table.set(3, b'xxab')
+            self.assertEqual(list(table.find(b'ab')), [0, 2, 3, 4, 5])
+
+    @allure.story('dedupe')
+    def test_dedupe(self):
+        unique, mapping = self.table.dedupe()
+        self.assertEqual(list(unique), [b'ab', b'', b'cab', b'xa', b'aab'])
+        self.assertEqual(list(mapping), [0, 1, 2, 3, 0, 4])
+
+    @allure.story('document')
+    def test_document_strings(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            instance = UDLGBuilder.build(stream, backend='compact')
+        strings = instance.strings
+        with allure.step('check'):
+            self.assertEqual(len(strings), 155)
+            member = instance.records[30].members[3]
+            self.assertEqual(member.value.value, strings[member.index])
+        with allure.step('set'):
+            member.set('new value')
+            self.assertEqual(strings[member.index], b'new value')
+            self.assertIn(member.index, list(strings.find(b'new value')))
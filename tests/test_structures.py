@@ -168,3 +168,65 @@ class OnFreeStringTest(TestCase):
         with allure.step('check after method set'):
             self.assertEqual(self.p_structure.entry.contents.name,
                              'юникот'.encode('utf-8'))
+
+
+@allure.feature('Structures')
+class DecodePlanTest(TestCase):
+    def test_decode_plan(self):
+        from udlg.structure import records
+        with allure.step('scalar fields are fused'):
+            plan = records.ObjectNullMultiple.get_decode_plan()
+            self.assertEqual(len(plan), 1)
+            structure, names = plan[0]
+            self.assertEqual(names, ('record_type', 'count'))
+            self.assertEqual(structure.size, 5)
+        with allure.step('nested structures are dispatched directly'):
+            plan = records.BinaryLibrary.get_decode_plan()
+            self.assertEqual([names for _, names in plan],
+                             [('record_type', 'library_id'),
+                              ('library_name', records.LengthPrefixedString)])
+        with allure.step('plan is cached on class'):
+            self.assertIs(records.BinaryLibrary.get_decode_plan(), plan)
+
+
+@allure.feature('Structures')
+class ClassLayoutTest(TestCase):
+    @allure.story('layout')
+    def test_class_layout(self):
+        from struct import pack
+        from udlg.structure.layout import ClassLayout, ObjectIdMap
+        from udlg.structure.records import ClassWithId
+        from udlg.utils.reader import BinaryReader
+        Primitive = enums.PrimitiveTypeEnum
+        with allure.step('build layout'):
+            layout = ClassLayout(
+                [0, 0, 2, 0],
+                [Primitive.Int32, Primitive.Boolean, None, Primitive.Double]
+            )
+            run_type, size, slots = layout.segments[0]
+            self.assertEqual(size, 5)
+            self.assertEqual(len(slots), 2)
+            self.assertEqual(layout.segments[1], (None, 2, None))
+        with allure.step('decode members'):
+            class_info = type('ClassInfo', (object, ), {
+                'object_id': 7, 'members_count': 4
+            })
+            class_reference = type('ClassReference', (object, ), {
+                'class_info': class_info
+            })
+            object_id_map = ObjectIdMap()
+            object_id_map.layouts[7] = layout
+            record = ClassWithId()
+            record._object_id_map = object_id_map
+            reader = BinaryReader(
+                pack('<i?', 5, True) + b'\x0a' + pack('<d', 1.5)
+            )
+            record._initiate_members(reader, class_reference=class_reference)
+            self.assertEqual(reader.tell(), reader.size)
+        with allure.step('check'):
+            members = record.get_member_list(class_info=class_info)
+            self.assertEqual(members[0], 5)
+            self.assertIs(members[1], True)
+            self.assertEqual(members[2].record_type,
+                             enums.RecordTypeEnum.ObjectNull)
+            self.assertEqual(members[3], 1.5)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: tests.test_synthetic
+    :synopsis: Unit tests for synthetic documents
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+from collections import Counter
+
+import allure
+from benchmarks.synthetic import generate_document, scale_document
+from udlg.builder import UDLGBuilder, BACKENDS
+from udlg.structure import compact
+from unittest import TestCase
+
+
+def count_records(document):
+    """
+    :rtype: collections.Counter
+    :return: record class name: amount, members included
+    """
+    counter = Counter()
+    for record in document.records:
+        counter[record.entry.__class__.__name__] += 1
+        for member in record.members:
+            if isinstance(member, compact.RecordStructure):
+                counter[member.__class__.__name__] += 1
+    return counter
+
+
+@allure.feature('Synthetic documents')
+class SyntheticDocumentTest(TestCase):
+    @allure.story('generate')
+    def test_generate(self):
+        data, i18n = generate_document(
+            classes=3, instances=50, strings=400, references=30, arrays=2,
+            primitive_arrays=3, array_length=300, seed=1
+        )
+        data = bytes(data)
+        for backend in BACKENDS:
+            with allure.step('round trip, %s backend' % backend):
+                instance = UDLGBuilder.build(data, backend=backend)
+                self.assertEqual(instance.to_bin(), data)
+                self.assertEqual(instance.unpack_i18n(), i18n)
+        with allure.step('records'):
+            counter = count_records(
+                UDLGBuilder.build(data, backend='compact')
+            )
+            self.assertEqual(counter['ClassWithMembersAndTypes'], 3)
+            self.assertEqual(counter['ClassWithId'], 50)
+            self.assertEqual(counter['BinaryObjectString'], 400)
+            self.assertEqual(counter['MemberReference'], 30)
+            self.assertEqual(counter['BinaryArray'], 2)
+            self.assertEqual(counter['ArraySinglePrimitive'], 3)
+        with allure.step('reproducible'):
+            self.assertEqual(
+                generate_document(classes=3, instances=50, strings=400,
+                                  references=30, arrays=2,
+                                  primitive_arrays=3, array_length=300,
+                                  seed=1)[0],
+                data
+            )
+
+    @allure.story('generate')
+    def test_generate_wrong_counts(self):
+        self.assertRaises(ValueError, generate_document, classes=0)
+        self.assertRaises(ValueError, generate_document, classes=0,
+                          instances=0)
+        self.assertRaises(ValueError, generate_document, strings=0)
+
+    @allure.story('scale')
+    def test_scale(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            data = stream.read()
+        self.assertEqual(scale_document(data, 1), data)
+        scaled = bytes(scale_document(data, 3))
+        instance = UDLGBuilder.build(scaled)
+        #: BinaryLibrary records are not repeated
+        self.assertEqual(len(instance.records), 96 + 2 * 93)
+        self.assertEqual(instance.to_bin(), scaled)
+        self.assertEqual(len(list(UDLGBuilder.iter_strings(scaled))),
+                         155 * 3)
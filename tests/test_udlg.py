@@ -8,11 +8,17 @@
 """
 import io
 import sys
+from concurrent.futures import ProcessPoolExecutor
 import allure
 from udlg import enums
-from udlg.builder import UDLGBuilder
-from udlg.structure import records
+from udlg.builder import (
+    BinaryFormatterFileBuilder, UDLGBuilder, BACKENDS, BACKEND_COMPACT
+)
+from udlg.structure import compact, records, Record
+from udlg.structure.layout import ClassLayout
+from udlg.structure.structure import SerializationHeader, UDLGFile
 from unittest import TestCase
+from unittest.mock import patch
 
 
 @allure.feature('UDLG')
@@ -152,3 +158,309 @@ class PointersTest(TestCase):
             u'::Fuck:: Что за чёрт? Пойду я отсюда. '
             u'go-go-go.'.encode('utf-8')
         )
+
+
+@allure.feature('UDLG')
+class IterRecordsTest(TestCase):
+    def setUp(self):
+        self.lucas = open('tests/documents/Lucas1.udlg', 'rb')
+
+    def tearDown(self):
+        self.lucas.close()
+
+    @allure.story('iter records')
+    def test_iter_records(self):
+        instance = UDLGBuilder.build(self.lucas.read())
+        self.lucas.seek(0)
+        with allure.step('stream records'):
+            header = SerializationHeader()
+            streamed = list(UDLGBuilder.iter_records(self.lucas,
+                                                     header=header))
+        with allure.step('check'):
+            self.assertEqual(header.root_id, instance.data.header.root_id)
+            self.assertEqual(len(streamed), instance.data.count)
+            self.assertIsInstance(streamed[-1].entry, records.MessageEnd)
+            for record, origin in zip(streamed, instance.records):
+                self.assertEqual(record.record_type, origin.record_type)
+                self.assertEqual(record.to_bin(), origin.to_bin())
+
+
+@allure.feature('UDLG')
+class ExtractI18nTest(TestCase):
+    def setUp(self):
+        self.lucas = open('tests/documents/Lucas1.udlg', 'rb')
+        self.cc_dog_in_motion = open('tests/documents/cc_dogInMotion.udlg',
+                                     'rb')
+
+    def tearDown(self):
+        self.lucas.close()
+        self.cc_dog_in_motion.close()
+
+    @allure.story('i18n')
+    def test_extract_i18n(self):
+        for stream in (self.lucas, self.cc_dog_in_motion):
+            data = stream.read()
+            with allure.step('compare with full build'):
+                self.assertEqual(UDLGBuilder.extract_i18n(data),
+                                 UDLGBuilder.build(data).unpack_i18n())
+
+    @allure.story('i18n')
+    def test_iter_strings(self):
+        strings = list(UDLGBuilder.iter_strings(self.lucas))
+        with allure.step('check'):
+            self.assertEqual(len(strings), 155)
+            self.assertEqual(strings[0], (1, 0, b'Merchant1'))
+            self.assertEqual(self.lucas.tell(), 18599)
+
+
+@allure.feature('UDLG')
+class BuildManyTest(TestCase):
+    def setUp(self):
+        self.paths = ['tests/documents/Lucas1.udlg',
+                      'tests/documents/cc_dogInMotion.udlg',
+                      'tests/documents/missing.udlg']
+
+    @allure.story('build_many')
+    def test_build_many(self):
+        for workers in (1, 2):
+            with allure.step('build with %i worker(s)' % workers):
+                results = dict(
+                    (result.path, result)
+                    for result in UDLGBuilder.build_many(self.paths,
+                                                         workers=workers)
+                )
+            with allure.step('check'):
+                self.assertEqual(sorted(results), sorted(self.paths))
+                lucas = results[self.paths[0]]
+                self.assertIsNone(lucas.error)
+                with open(self.paths[0], 'rb') as stream:
+                    self.assertEqual(lucas.result.to_bin(), stream.read())
+                missing = results[self.paths[2]]
+                self.assertIsNone(missing.result)
+                self.assertIsInstance(missing.error, EnvironmentError)
+
+    @allure.story('build_many')
+    def test_build_many_lazy(self):
+        results = UDLGBuilder.build_many(self.paths[:2], workers=2,
+                                         lazy=True)
+        for path, result, error in results:
+            with allure.step('check %s' % path):
+                self.assertIsNone(error)
+                self.assertTrue(result.data.lazy)
+                self.assertFalse(result.data.records.is_decoded(0))
+                with open(path, 'rb') as stream:
+                    self.assertEqual(result.to_bin(), stream.read())
+
+    @allure.story('build_many')
+    def test_build_many_pool(self):
+        for backend in BACKENDS:
+            with allure.step('build %s documents' % backend):
+                with patch('udlg.builder.ProcessPoolExecutor',
+                           wraps=ProcessPoolExecutor) as executor:
+                    results = list(UDLGBuilder.build_many(
+                        self.paths[:2], workers=2, backend=backend
+                    ))
+                executor.assert_called_once_with(max_workers=2)
+            for path, result, error in results:
+                with allure.step('check %s' % path):
+                    self.assertIsNone(error)
+                    if backend == BACKEND_COMPACT:
+                        self.assertIsInstance(result, compact.UDLGFile)
+                    else:
+                        self.assertTrue(result.data.lazy)
+                    with open(path, 'rb') as stream:
+                        self.assertEqual(result.to_bin(), stream.read())
+
+    @allure.story('build_many')
+    def test_build_many_handler(self):
+        results = UDLGBuilder.build_many(self.paths[:2], workers=2,
+                                         handler=UDLGFile.unpack_i18n,
+                                         max_pending=1)
+        for path, result, error in results:
+            with allure.step('check %s' % path):
+                self.assertIsNone(error)
+                with open(path, 'rb') as stream:
+                    self.assertEqual(result,
+                                     UDLGBuilder.extract_i18n(stream))
+
+
+@allure.feature('UDLG')
+class DirtyTrackingTest(TestCase):
+    def setUp(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            self.data = stream.read()
+
+    @allure.story('to_bin')
+    def test_dirty_records(self):
+        block = b"30,3=>'Bye.'\n30,7=>'Nope.'"
+        instance = UDLGBuilder.build(self.data)
+        with allure.step('cache is disabled by default'):
+            self.assertEqual(instance.to_bin(), self.data)
+            self.assertIsNone(instance.data.get_state().bin_cache)
+        with allure.step('cache records'):
+            instance.data.enable_bin_cache()
+            self.assertEqual(instance.to_bin(), self.data)
+            bin_cache = instance.data.state.bin_cache
+            self.assertEqual(len(bin_cache), len(instance.records))
+        with allure.step('load i18n'):
+            instance.load_i18n(block, cache=True)
+            self.assertIs(instance.data.state.bin_cache, bin_cache)
+            self.assertTrue(instance.records[30].members[3].value.dirty)
+            self.assertFalse(instance.records[31].members[1].value.dirty)
+        with allure.step('only dirty record is encoded'):
+            with patch.object(Record, 'to_bin', autospec=True,
+                              side_effect=Record.to_bin) as to_bin:
+                data = instance.to_bin()
+            self.assertEqual(to_bin.call_count, 1)
+        with allure.step('nothing is encoded once more'):
+            with patch.object(Record, 'to_bin', autospec=True,
+                              side_effect=Record.to_bin) as to_bin:
+                self.assertEqual(instance.to_bin(), data)
+            self.assertEqual(to_bin.call_count, 0)
+        with allure.step('compare with full encoding'):
+            expected = UDLGBuilder.build(self.data)
+            expected.load_i18n(block)
+            expected_data = (expected.header.to_bin() +
+                             expected.data.header.to_bin())
+            for record in expected.records:
+                expected_data.extend(record.to_bin())
+            self.assertEqual(data, expected_data)
+
+    @allure.story('to_bin')
+    def test_load_i18n_not_cached(self):
+        instance = UDLGBuilder.build(self.data)
+        with allure.step('load i18n'):
+            instance.load_i18n(b"30,3=>'Bye.'")
+            data = instance.to_bin()
+        with allure.step('cache is left disabled'):
+            self.assertIsNone(instance.data.get_state().bin_cache)
+            self.assertIn(b'Bye.', data)
+
+    @allure.story('to_bin')
+    def test_not_cached(self):
+        with open('tests/documents/uint32_array.dat', 'rb') as stream:
+            instance = BinaryFormatterFileBuilder.build(stream)
+        data = instance.to_bin()
+        instance.records[0].entry.get_member_view()[0] = 12345
+        with allure.step('changes are written'):
+            self.assertNotEqual(instance.to_bin(), data)
+        with allure.step('cached records should be marked dirty'):
+            instance.enable_bin_cache()
+            data = instance.to_bin()
+            instance.records[0].entry.get_member_view()[0] = 54321
+            self.assertEqual(instance.to_bin(), data)
+            instance.mark_dirty(0)
+            self.assertNotEqual(instance.to_bin(), data)
+        with allure.step('disable'):
+            instance.enable_bin_cache(False)
+            self.assertIsNone(instance.state.bin_cache)
+
+
+@allure.feature('UDLG')
+class SpliceWriterTest(TestCase):
+    def setUp(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            self.data = stream.read()
+        with open('tests/documents/Lucas1.txt', 'rb') as stream:
+            self.block = stream.read()
+
+    @allure.story('to_bin')
+    def test_splice(self):
+        for lazy in (False, True):
+            with allure.step('build (lazy: %s)' % lazy):
+                instance = UDLGBuilder.build(self.data, lazy=lazy,
+                                             keep_source=True)
+                self.assertEqual(instance.to_bin(splice=True), self.data)
+            with allure.step('load i18n'):
+                instance.load_i18n(self.block)
+                expected = UDLGBuilder.build(self.data)
+                expected.load_i18n(self.block)
+            with allure.step('compare with encoded document'):
+                self.assertEqual(instance.to_bin(splice=True),
+                                 expected.to_bin())
+
+    @allure.story('to_bin')
+    def test_splice_changes(self):
+        for backend in BACKENDS:
+            with allure.step('%s backend' % backend):
+                instance = UDLGBuilder.build(self.data, backend=backend,
+                                             keep_source=True)
+                state = (instance.data if backend == BACKEND_COMPACT
+                         else instance.data.get_state())
+                writer = state.splice_writer
+                records = instance.records
+                string = records[30].members[3].value
+                original = string.value
+                self.assertEqual(list(writer.iter_changes(records)), [])
+                self.assertFalse(string.dirty)
+                records[30].members[3].set(b'Bye.')
+                self.assertTrue(string.dirty)
+                changes = list(writer.iter_changes(records))
+                self.assertEqual(len(changes), 1)
+                self.assertEqual(bytes(changes[0][2]), b'\x04Bye.')
+                records[30].members[3].set(original)
+                self.assertEqual(list(writer.iter_changes(records)), [])
+
+    @allure.story('to_bin')
+    def test_splice_no_source(self):
+        instance = UDLGBuilder.build(self.data)
+        self.assertRaises(ValueError, instance.to_bin, splice=True)
+
+    @allure.story('to_bin')
+    def test_splice_from_file(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            instance = UDLGBuilder.build(stream, keep_source=True)
+        instance.load_i18n(self.block)
+        expected = UDLGBuilder.build(self.data)
+        expected.load_i18n(self.block)
+        self.assertEqual(instance.to_bin(splice=True), expected.to_bin())
+
+
+@allure.feature('UDLG')
+class CompactBackendTest(TestCase):
+    def setUp(self):
+        with open('tests/documents/Lucas1.udlg', 'rb') as stream:
+            self.data = stream.read()
+        with open('tests/documents/Lucas1.txt', 'rb') as stream:
+            self.block = stream.read()
+
+    @allure.story('compact')
+    def test_build(self):
+        instance = UDLGBuilder.build(self.data, backend='compact')
+        expected = UDLGBuilder.build(self.data)
+        with allure.step('check records'):
+            self.assertEqual(len(instance.records), expected.data.count)
+            self.assertEqual(instance.data.to_dict(),
+                             expected.data.to_dict())
+        with allure.step('to bin'):
+            self.assertEqual(instance.to_bin(), self.data)
+        with allure.step('i18n'):
+            self.assertEqual(instance.unpack_i18n(), expected.unpack_i18n())
+
+    @allure.story('compact')
+    def test_no_ctypes_layout(self):
+        with allure.step('build'):
+            with patch.object(ClassLayout, 'get_layout') as get_layout:
+                instance = UDLGBuilder.build(self.data, backend='compact')
+            self.assertEqual(get_layout.call_count, 0)
+        with allure.step('to bin'):
+            self.assertEqual(instance.to_bin(), self.data)
+
+    @allure.story('compact')
+    def test_load_i18n(self):
+        instance = UDLGBuilder.build(self.data, backend='compact',
+                                     keep_source=True)
+        expected = UDLGBuilder.build(self.data)
+        with allure.step('load i18n'):
+            instance.load_i18n(self.block)
+            expected.load_i18n(self.block)
+        with allure.step('compare'):
+            self.assertEqual(instance.to_bin(), expected.to_bin())
+            self.assertEqual(instance.to_bin(splice=True), expected.to_bin())
+
+    @allure.story('compact')
+    def test_wrong_backend(self):
+        self.assertRaises(ValueError, UDLGBuilder.build, self.data,
+                          backend='compact', lazy=True)
+        self.assertRaises(ValueError, UDLGBuilder.build, self.data,
+                          backend='unknown')
@@ -10,6 +10,9 @@ ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
 
 sys.path.insert(0, ROOT_DIR)
 from udlg.builder import UDLGBuilder
+from udlg.cache import DEFAULT_DIRECTORY, ParseCache
+from udlg.profile import Profile
+from udlg.utils.i18n import CHUNK_SIZE
 
 import logging
 logger = logging.getLogger(__file__)
@@ -28,19 +31,34 @@ def apply(entry, cache, opts):
             os.makedirs(store_entry_path)
 
         try:
-            i18n_block = open(i18n_path, 'rb').read()
+            i18n_file = open(i18n_path, 'rb')
         except OSError:
             logger.error("Can not access i18n file: %s, skipping",
                          i18n_path)
             return
-        i18n_cache_digest = md5(i18n_block).hexdigest()
-        if cache.get(i18n_path, '') != i18n_cache_digest:
-            print("Processing: %s" % entry.path)
-            u = UDLGBuilder.build(stream)
-            u.load_i18n(i18n_block)
-            open(store_path, 'wb').write(u.to_bin())
-        else:
-            print("Skipping `%s`, already processed" % entry.path)
+        with i18n_file:
+            digest = md5()
+            for chunk in iter(lambda: i18n_file.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+            i18n_cache_digest = digest.hexdigest()
+            if cache.get(i18n_path, '') != i18n_cache_digest:
+                print("Processing: %s" % entry.path)
+                #: i18n file is read chunk by chunk while it's applied
+                i18n_file.seek(0)
+                with open(store_path, 'wb') as output:
+                    if opts.profile is not None:
+                        #: document is built to be profiled
+                        u = UDLGBuilder.build(stream, profile=True)
+                        u.load_i18n(i18n_file)
+                        u.write_to(output)
+                        opts.profile.update(u.profile)
+                    else:
+                        #: strings are spliced into original data, document
+                        #: is not built
+                        UDLGBuilder.apply_i18n(stream, i18n_file, output,
+                                               cache=opts.parse_cache)
+            else:
+                print("Skipping `%s`, already processed" % entry.path)
         cache[i18n_path] = i18n_cache_digest
 
 
@@ -70,7 +88,22 @@ if __name__ == '__main__':
     parser.add_argument('-S', '--skip-processed', dest='skip_processed',
                         help='do not process files already had been processed',
                         action='store_true', required=False, default=False)
+    parser.add_argument('-P', '--parse-cache', dest='parse_cache',
+                        nargs='?', const=DEFAULT_DIRECTORY, default=None,
+                        metavar='dir', help='keep records index snapshots in '
+                        'parse cache directory, so unchanged files are not '
+                        'scanned again (%s by default)' % DEFAULT_DIRECTORY)
+    parser.add_argument('-p', '--profile', dest='profile',
+                        action='store_true', help='collect decoding profile '
+                        '(records count, bytes and time per record type) and '
+                        'print it at the end, documents are built '
+                        'instead of strings splicing')
     arguments = parser.parse_args()
+    arguments.profile = Profile() if arguments.profile else None
+    arguments.parse_cache = (
+        ParseCache(arguments.parse_cache)
+        if arguments.parse_cache is not None else None
+    )
 
     i18n_cache_path = os.path.join(arguments.i18n_dir, 'cache.json')
     if os.path.exists(i18n_cache_path):
@@ -78,4 +111,6 @@ if __name__ == '__main__':
     else:
         i18n_cache = {}
     process(arguments, i18n_cache)
+    if arguments.profile is not None:
+        print(arguments.profile.format())
     open(i18n_cache_path, 'w').write(json.dumps(i18n_cache))
@@ -5,14 +5,15 @@ import json
 import sys
 import os
 import argparse
-from contextlib import closing
-from collections import defaultdict
+import tempfile
 
 ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
 
 sys.path.insert(0, ROOT_DIR)
 from udlg import enums
 from udlg.builder import UDLGBuilder
+from udlg.cache import DEFAULT_DIRECTORY, ParseCache, get_digest
+from udlg.profile import Profile
 
 import logging
 logger = logging.getLogger(__file__)
@@ -22,41 +23,120 @@ PROCESSING_MESSAGE_FAIL = 'file processing: %s - FAIL'
 PROCESSING_MESSAGE_FOUND_IN_CACHE = 'file processing: %s - FOUND IN CACHE'
 
 
-def inspect(entry, health, opts):
-    with closing(open(entry.path, 'rb')) as stream:
-        if opts.use_health_cache and entry.path in health:
-            #: skip for caching
-            logger.info(PROCESSING_MESSAGE_FOUND_IN_CACHE % entry.path)
-            return
-
-        try:
-            doc = UDLGBuilder.build(stream)
-            assert (
-                doc.records[-1].record_type == enums.RecordTypeEnum.MessageEnd
-            )
-            logger.info(PROCESSING_MESSAGE_OK % entry.path)
-            health[entry.path] = True
-        except Exception as err:
-            logger.info(PROCESSING_MESSAGE_FAIL % entry.path)
-            health[entry.path] = False
-
-
-def process(opts, path=None):
-    path = path or opts.directory
-    if opts.use_health_cache and os.path.exists(opts.output):
-        health = json.loads(open(opts.output, 'r').read())
-    else:
-        health = defaultdict(list)
-    recursive = opts.recursive
+def walk(path, recursive):
+    """
+    walk directory tree once, directories are scanned one after another
+    (no recursion)
+
+    :param str path: root directory
+    :param bool recursive: walk subdirectories
+    :rtype: collections.Iterable[os.DirEntry]
+    :return: udlg files entries iterator
+    """
+    directories = [path]
+    while directories:
+        for entry in os.scandir(directories.pop()):
+            if entry.is_dir():
+                if recursive:
+                    directories.append(entry.path)
+            elif entry.name.endswith('.udlg'):
+                yield entry
+
+
+def load_manifest(opts):
+    """
+    :rtype: dict
+    :return: health manifest, ``{path: {'size': int, 'mtime': int,
+        'hash': str, 'ok': bool}}``
+    """
+    if not (opts.use_health_cache and os.path.exists(opts.output)):
+        return {}
+    with open(opts.output, 'r') as stream:
+        manifest = json.load(stream)
+    #: entries of old (path: status) format are checked again
+    return dict(
+        (path, entry) for path, entry in manifest.items()
+        if isinstance(entry, dict)
+    )
+
+
+def store_manifest(manifest, opts):
+    """
+    write manifest to temporary file and rename it, so output is never
+    left half written
+    """
+    directory = os.path.dirname(os.path.abspath(opts.output))
+    descriptor, path = tempfile.mkstemp(dir=directory, prefix='.',
+                                        suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'w') as stream:
+            json.dump(manifest, stream, indent=1, sort_keys=True)
+        os.replace(path, opts.output)
+    except BaseException:
+        os.remove(path)
+        raise
+
 
-    for entry in os.scandir(path):
-        if recursive and entry.is_dir():
-            process(opts, path=entry.path)
+def check(data, opts):
+    try:
+        if opts.profile is not None:
+            #: every record is decoded to be profiled
+            doc = UDLGBuilder.build(data, profile=True)
+            opts.profile.update(doc.profile)
         else:
-            if not entry.name.endswith('.udlg'):
-                continue
-            inspect(entry, health, opts)
-    open(opts.output, 'w').write(json.dumps(health))
+            #: records are only walked through (indexed), not decoded
+            doc = UDLGBuilder.build(data, lazy=True, cache=opts.parse_cache)
+        return doc.records[-1].record_type == enums.RecordTypeEnum.MessageEnd
+    except Exception:
+        return False
+
+
+def inspect(entry, cached, opts):
+    """
+    :param os.DirEntry entry: file entry
+    :param dict cached: manifest entry of previous run or None
+    :rtype: dict
+    :return: manifest entry
+    """
+    stat = entry.stat()
+    if (cached and cached['size'] == stat.st_size and
+            cached['mtime'] == stat.st_mtime_ns):
+        #: unchanged, file is not even read
+        logger.info(PROCESSING_MESSAGE_FOUND_IN_CACHE % entry.path)
+        return cached
+
+    with open(entry.path, 'rb') as stream:
+        data = stream.read()
+    digest = get_digest(data)
+    if cached and cached['hash'] == digest:
+        #: touched, but not changed
+        logger.info(PROCESSING_MESSAGE_FOUND_IN_CACHE % entry.path)
+        ok = cached['ok']
+    else:
+        ok = check(data, opts)
+        logger.info(
+            (PROCESSING_MESSAGE_OK if ok else PROCESSING_MESSAGE_FAIL) %
+            entry.path
+        )
+    return {
+        'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': digest,
+        'ok': ok
+    }
+
+
+def process(opts):
+    cached = load_manifest(opts)
+    manifest = {}
+    processed = 0
+    for entry in walk(opts.directory, opts.recursive):
+        result = inspect(entry, cached.get(entry.path), opts)
+        if result is not cached.get(entry.path):
+            processed += 1
+            if opts.checkpoint and processed % opts.checkpoint == 0:
+                #: checked files are kept if run is interrupted
+                store_manifest(dict(cached, **manifest), opts)
+        manifest[entry.path] = result
+    store_manifest(manifest, opts)
 
 
 if __name__ == '__main__':
@@ -74,11 +154,34 @@ if __name__ == '__main__':
     parser.add_argument('-c', '--health-cache', dest='use_health_cache',
                         action='store_true',
                         help='uses health cache (same file as output) to '
-                             'prevent data from processing twice')
+                             'prevent data from processing twice, files '
+                             'with other size or modification time are '
+                             'hashed and checked again if content differs')
+    parser.add_argument('-C', '--checkpoint', dest='checkpoint', type=int,
+                        default=500, metavar='N',
+                        help='store health data every N checked files, '
+                             '0 to store it at the end only')
+    parser.add_argument('-P', '--parse-cache', dest='parse_cache',
+                        nargs='?', const=DEFAULT_DIRECTORY, default=None,
+                        metavar='dir', help='keep records index snapshots in '
+                        'parse cache directory, so unchanged files are not '
+                        'scanned again (%s by default)' % DEFAULT_DIRECTORY)
+    parser.add_argument('-p', '--profile', dest='profile',
+                        action='store_true', help='collect decoding profile '
+                        '(records count, bytes and time per record type) and '
+                        'print it at the end, records are decoded instead of '
+                        'being indexed only')
     parser.add_argument('-v', '--verbose', dest='verbose',
                         action='store_true',
                         help='verbose output')
     arguments = parser.parse_args()
     if arguments.verbose:
         logging.basicConfig(level=logging.INFO)
+    arguments.parse_cache = (
+        ParseCache(arguments.parse_cache)
+        if arguments.parse_cache is not None else None
+    )
+    arguments.profile = Profile() if arguments.profile else None
     process(arguments)
+    if arguments.profile is not None:
+        print(arguments.profile.format())
@@ -8,6 +8,8 @@ ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
 
 sys.path.insert(0, ROOT_DIR)
 from udlg.builder import UDLGBuilder
+from udlg.cache import DEFAULT_DIRECTORY, ParseCache
+from udlg.profile import Profile
 
 
 def unpack(entry, opts):
@@ -23,8 +25,22 @@ def unpack(entry, opts):
         store_path = os.path.join(i18n_path, file_name)
         if not(opts.skip_processed and os.path.exists(store_path)):
             print("Processing: %s" % entry.path)
-            u = UDLGBuilder.build(stream)
-            open(store_path, 'wb').write(u.unpack_i18n())
+            #: legacy i18n block is built in memory, escaped i18n entries
+            #: are written chunk by chunk
+            sink = None if opts.legacy else open(store_path, 'wb')
+            if opts.profile is not None:
+                #: document is built to be profiled
+                document = UDLGBuilder.build(stream, profile=True)
+                opts.profile.update(document.profile)
+                block = document.unpack_i18n(sink)
+            else:
+                block = UDLGBuilder.extract_i18n(stream,
+                                                 cache=opts.parse_cache,
+                                                 sink=sink)
+            if sink is None:
+                open(store_path, 'wb').write(block)
+            else:
+                sink.close()
         else:
             print("Skipping: %s" % entry.path)
 
@@ -51,5 +67,25 @@ if __name__ == '__main__':
     parser.add_argument('-S', '--skip-processed', dest='skip_processed',
                         help='do not process files already had been processed',
                         action='store_true', required=False, default=False)
+    parser.add_argument('-L', '--legacy', dest='legacy',
+                        action='store_true', help='store i18n strings in '
+                        'legacy format (as is, without escaping)')
+    parser.add_argument('-P', '--parse-cache', dest='parse_cache',
+                        nargs='?', const=DEFAULT_DIRECTORY, default=None,
+                        metavar='dir', help='keep records index snapshots in '
+                        'parse cache directory, so unchanged files are not '
+                        'scanned again (%s by default)' % DEFAULT_DIRECTORY)
+    parser.add_argument('-p', '--profile', dest='profile',
+                        action='store_true', help='collect decoding profile '
+                        '(records count, bytes and time per record type) and '
+                        'print it at the end, documents are built '
+                        'instead of strings extraction')
     arguments = parser.parse_args()
+    arguments.profile = Profile() if arguments.profile else None
+    arguments.parse_cache = (
+        ParseCache(arguments.parse_cache)
+        if arguments.parse_cache is not None else None
+    )
     process(arguments)
+    if arguments.profile is not None:
+        print(arguments.profile.format())
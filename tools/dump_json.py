@@ -1,5 +1,4 @@
 #!/usr/bin/env python3.5
-import json
 import sys
 import os
 import argparse
@@ -8,7 +7,27 @@ from contextlib import closing
 ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
 
 sys.path.insert(0, ROOT_DIR)
-from udlg.builder import UDLGBuilder
+from udlg.builder import (
+    UDLGBuilder, BACKENDS, BACKEND_COMPACT, BACKEND_CTYPES
+)
+from udlg.cache import DEFAULT_DIRECTORY, ParseCache
+from udlg.export import FORMATS, FORMAT_JSON, write_json
+from udlg.profile import Profile
+
+
+def store(document, store_path, opts):
+    """
+    write document records one by one to temporary file and rename it, so
+    output is never left half written
+    """
+    path = store_path + '.tmp'
+    try:
+        with open(path, 'w') as stream:
+            write_json(document, stream, format=opts.format)
+        os.replace(path, store_path)
+    except BaseException:
+        os.remove(path)
+        raise
 
 
 def unpack(entry, opts):
@@ -19,12 +38,22 @@ def unpack(entry, opts):
         i18n_path, file_name = store_path.rsplit('/', 1)
         if not os.path.exists(i18n_path):
             os.makedirs(i18n_path)
-        file_name = file_name.replace('.udlg', '.json')
+        file_name = file_name.replace('.udlg', '.' + opts.format)
         store_path = os.path.join(i18n_path, file_name)
         if not(opts.skip_processed and os.path.exists(store_path)):
             print("Processing: %s" % entry.path)
-            u = UDLGBuilder.build(stream)
-            open(store_path, 'w').write(json.dumps(u.to_dict()))
+            profile = opts.profile is not None
+            if opts.backend == BACKEND_CTYPES:
+                #: records are decoded one at a time while they're written
+                u = UDLGBuilder.build(stream, lazy=True,
+                                      cache=opts.parse_cache,
+                                      profile=profile)
+            else:
+                u = UDLGBuilder.build(stream, backend=opts.backend,
+                                      profile=profile)
+            store(u, store_path, opts)
+            if opts.profile is not None:
+                opts.profile.update(u.profile)
         else:
             print("Skipping: %s" % entry.path)
 
@@ -51,5 +80,33 @@ if __name__ == '__main__':
     parser.add_argument('-S', '--skip-processed', dest='skip_processed',
                         help='do not process files already had been processed',
                         action='store_true', required=False, default=False)
+    parser.add_argument('-f', '--format', dest='format', choices=FORMATS,
+                        default=FORMAT_JSON, help='output format, json '
+                        'document or newline delimited json (headers line '
+                        'and one line per record), json by default')
+    parser.add_argument('-b', '--backend', dest='backend', choices=BACKENDS,
+                        default=BACKEND_COMPACT, help='record model backend, '
+                        'compact (lighter and faster, default) or ctypes '
+                        '(records are decoded lazily one at a time)')
+    parser.add_argument('-P', '--parse-cache', dest='parse_cache',
+                        nargs='?', const=DEFAULT_DIRECTORY, default=None,
+                        metavar='dir', help='keep records index snapshots in '
+                        'parse cache directory, so unchanged files are not '
+                        'scanned again (%s by default), ctypes backend '
+                        'only' % DEFAULT_DIRECTORY)
+    parser.add_argument('-p', '--profile', dest='profile',
+                        action='store_true', help='collect decoding profile '
+                        '(records count, bytes and time per record type) and '
+                        'print it at the end')
     arguments = parser.parse_args()
+    if (arguments.parse_cache is not None and
+            arguments.backend != BACKEND_CTYPES):
+        parser.error('parse cache is supported by ctypes backend only')
+    arguments.profile = Profile() if arguments.profile else None
+    arguments.parse_cache = (
+        ParseCache(arguments.parse_cache)
+        if arguments.parse_cache is not None else None
+    )
     process(arguments)
+    if arguments.profile is not None:
+        print(arguments.profile.format())
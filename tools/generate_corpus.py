@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Generates synthetic UDLG documents with matching i18n files, so large
+inputs could be reproduced anywhere without game data.
+"""
+import os
+import sys
+import argparse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT_DIR)
+from benchmarks.synthetic import generate_document
+
+
+def main(opts):
+    if not os.path.exists(opts.output_dir):
+        os.makedirs(opts.output_dir)
+    for index in range(opts.number):
+        data, i18n = generate_document(
+            classes=opts.classes, instances=opts.instances,
+            strings=opts.strings, references=opts.references,
+            arrays=opts.arrays, primitive_arrays=opts.primitive_arrays,
+            array_length=opts.array_length, seed=opts.seed + index
+        )
+        path = os.path.join(opts.output_dir, 'synthetic_%04i' % index)
+        with open(path + '.udlg', 'wb') as output:
+            output.write(data)
+        with open(path + '.txt', 'wb') as output:
+            output.write(i18n)
+        print("Generated: %s.udlg (%i bytes)" % (path, len(data)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', dest='output_dir',
+                        metavar='dir', help='output directory', default='.')
+    parser.add_argument('-n', '--number', dest='number', type=int,
+                        default=1, help='documents amount')
+    parser.add_argument('-s', '--seed', dest='seed', type=int, default=0,
+                        help='random seed of the first document, the next '
+                        'ones get the following seeds')
+    parser.add_argument('--classes', dest='classes', type=int, default=10,
+                        help='ClassWithMembersAndTypes records amount')
+    parser.add_argument('--instances', dest='instances', type=int,
+                        default=40, help='ClassWithId records amount')
+    parser.add_argument('--strings', dest='strings', type=int, default=150,
+                        help='BinaryObjectString records amount')
+    parser.add_argument('--references', dest='references', type=int,
+                        default=10, help='MemberReference records amount')
+    parser.add_argument('--arrays', dest='arrays', type=int, default=2,
+                        help='BinaryArray records amount')
+    parser.add_argument('--primitive-arrays', dest='primitive_arrays',
+                        type=int, default=2,
+                        help='ArraySinglePrimitive records amount')
+    parser.add_argument('--array-length', dest='array_length', type=int,
+                        default=16, help='arrays length')
+    arguments = parser.parse_args()
+    main(arguments)
@@ -7,54 +7,583 @@
 .. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 """
 import io
+import mmap
+import os
+from array import array
+from collections import namedtuple
+from concurrent.futures import (
+    ProcessPoolExecutor, FIRST_COMPLETED, wait
+)
+
 from . import structure
+from .cache import Snapshot
 from .enums import RecordTypeEnum
-from .structure import Record, UDLGFile
+from .profile import Profile
+from .structure import Record, UDLGFile, compact
+from .structure.layout import ObjectIdMap
+from .structure.lazy import LazyObjectIdMap, LazyRecordList
+from .structure.scanner import RecordScanner
+from .structure.splice import SpliceWriter
+from .structure.structure import DocumentState, SerializationHeader
+from .utils.i18n import (
+    format_i18n_items, iter_i18n_items, write_i18n_items
+)
+from .utils.reader import open_reader
+from .utils.writer import get_writer
+
+
+class ClassObjectIdMap(ObjectIdMap):
+    """
+    Object id map which keeps class definitions only, other entries
+    (strings, arrays) are never looked up by id, so they are not retained
+    while records are streamed
+    """
+    CLASS_RECORD_TYPES = frozenset((
+        RecordTypeEnum.SystemClassWithMembers,
+        RecordTypeEnum.ClassWithMembers,
+        RecordTypeEnum.SystemClassWithMembersAndTypes,
+        RecordTypeEnum.ClassWithMembersAndTypes,
+    ))
+
+    def __setitem__(self, object_id, value):
+        record_type, _ = value
+        if record_type in self.CLASS_RECORD_TYPES:
+            super(ClassObjectIdMap, self).__setitem__(object_id, value)
+
+    def update(self, *args, **kwargs):
+        for object_id, value in dict(*args, **kwargs).items():
+            self[object_id] = value
+
+
+#: record model backends, ctypes structures (default) or compact python
+#: objects (see :mod:`udlg.structure.compact`)
+BACKEND_CTYPES = 'ctypes'
+BACKEND_COMPACT = 'compact'
+BACKENDS = (BACKEND_CTYPES, BACKEND_COMPACT)
+
+#: build_many result: file path, document (or handler result), error
+BuildResult = namedtuple('BuildResult', ('path', 'result', 'error'))
+
+
+def _get_file_key(stream):
+    """
+    :param stream: file object
+    :rtype: tuple[int, int]
+    :return: file size and modification time (ns)
+    """
+    stat = os.fstat(stream.fileno())
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _build_file(builder, path, handler, lazy, backend=BACKEND_CTYPES):
+    """
+    build document from file (worker side of ``build_many``)
+
+    :param type builder: builder class
+    :param str path: file path
+    :param callable | None handler: document handler
+    :param bool lazy: lazy mode
+    :param str backend: record model backend
+    :rtype: object
+    :return: handler result, document (compact backend) or
+        ((file size, modification time), records index) for lazy mode,
+        file is mapped by parent and lazy document is built without
+        scanning it again
+    """
+    with open(path, 'rb') as stream:
+        if handler is not None:
+            return handler(builder.build(stream, lazy=lazy,
+                                         backend=backend))
+        if lazy:
+            return _get_file_key(stream), builder.scan(stream)
+        return builder.build(stream, backend=backend)
+
+
+class SnapshotSource(object):
+    """
+    Parse cache stand-in which gives records index was made already (by
+    ``build_many`` worker for example), so document is not scanned again
+    """
+    __slots__ = ('snapshot', )
+
+    def __init__(self, snapshot):
+        """
+        :param udlg.cache.Snapshot snapshot: records index
+        """
+        self.snapshot = snapshot
+
+    def load(self, data, offset=0):
+        snapshot = self.snapshot
+        return snapshot if snapshot.offset == offset else None
+
+    def store(self, data, snapshot):
+        pass
 
 
 class BinaryFormatterFileBuilder(object):
     @classmethod
-    def build(cls, stream):
+    def build(cls, stream, lazy=False, keep_source=False,
+              backend=BACKEND_CTYPES, cache=None, profile=False):
         """
         build .net binary data structure record from serialized stream
 
-        :param stream: stream object
-        :rtype: structure.
+        :param stream: stream object (file, in memory stream), binary data
+            or :class:`udlg.utils.reader.BinaryReader` instance
+        :param bool lazy: lazy mode, only records offsets and types are
+            indexed, each record is decoded on first access
+            (``document.records[i]``). Source data is kept (mapped) while
+            document is alive
+        :param bool keep_source: keep source data, so document could be
+            written in splice mode (``document.to_bin(splice=True)``)
+        :param str backend: record model backend, ``ctypes`` (default) or
+            ``compact`` (plain python objects, lighter and faster to build,
+            lazy mode is not supported)
+        :param udlg.cache.ParseCache cache: parse cache, records index is
+            taken from it instead of scanning records (lazy mode only)
+        :param bool profile: collect decoding profile (records count,
+            bytes and time per record type), it's available as
+            ``document.profile``, lazy documents collect it on records
+            access
+        :rtype: structure.BinaryDataStructureFile |
+            structure.compact.BinaryDataStructureFile
         :return:
         :raises EnvironmentError:
             - if stream was opened not in binary mode
+        :raises ValueError:
+            - if backend is unknown or does not support lazy mode
+            - if cache is given not in lazy mode
+        """
+        cls._check_backend(backend, lazy, cache)
+        cls._check_stream(stream)
+        with open_reader(stream) as reader:
+            previous_profile = reader.profile
+            if profile:
+                reader.profile = Profile()
+            try:
+                document = cls._build(reader, lazy, keep_source, backend,
+                                      cache)
+                if profile and backend == BACKEND_COMPACT:
+                    document.profile = reader.profile
+                elif profile:
+                    document.get_state().profile = reader.profile
+            finally:
+                reader.profile = previous_profile
+        return document
+
+    @classmethod
+    def _build(cls, reader, lazy, keep_source, backend, cache):
+        """
+        :param udlg.utils.reader.BinaryReader reader: reader set up right
+            on serialization header
+        :rtype: structure.BinaryDataStructureFile |
+            structure.compact.BinaryDataStructureFile
+        :return: document
+        """
+        offset = reader.offset
+        if backend == BACKEND_COMPACT:
+            document = compact.BinaryDataStructureFile()
+            document.header._initiate(reader)
+            object_id_map = compact.ObjectIdMap(document.strings)
+            document.records = list(cls._iter_records(
+                reader, object_id_map=object_id_map,
+                record_class=compact.Record
+            ))
+            if keep_source:
+                document.splice_writer = cls._get_splice_writer(
+                    reader, offset
+                )
+            return document
+
+        document = structure.BinaryDataStructureFile()
+        document.header._initiate(reader)
+        if lazy:
+            snapshot = cls._get_snapshot(reader, offset, cache)
+            source = cls._build_index(document, reader, snapshot)
+            if keep_source:
+                document.state.splice_writer = (
+                    snapshot.get_splice_writer(source.buffer)
+                )
+            return document
+
+        #: id: info
+        records = list(cls._iter_records(reader,
+                                         object_id_map=ObjectIdMap()))
+        document.records_ptr = (Record * len(records))(*records)
+        document.count = len(records)
+        if keep_source:
+            document.get_state().splice_writer = cls._get_splice_writer(
+                reader, offset
+            )
+        return document
+
+    @staticmethod
+    def _check_backend(backend, lazy, cache=None):
+        if backend not in BACKENDS:
+            raise ValueError("Unknown backend: `%s`" % backend)
+        if lazy and backend != BACKEND_CTYPES:
+            raise ValueError(
+                "Lazy mode is not supported by `%s` backend" % backend
+            )
+        if cache is not None and not lazy:
+            raise ValueError("Parse cache is used in lazy mode only")
+
+    @staticmethod
+    def _get_snapshot(reader, offset, cache=None):
+        """
+        get records index, it's loaded from cache or records are scanned
+        (and index is stored in cache)
+
+        :param udlg.utils.reader.BinaryReader reader: reader set up right
+            on the first record, it's moved right after the last one
+        :param int offset: serialization header offset
+        :param udlg.cache.ParseCache cache: parse cache, optional
+        :rtype: udlg.cache.Snapshot
+        :return: snapshot
+        """
+        snapshot = None
+        if cache is not None:
+            snapshot = cache.load(reader.buffer, offset=offset)
+        if snapshot is not None:
+            reader.seek(snapshot.offsets[-1])
+            return snapshot
+
+        scanner = RecordScanner(reader)
+        slots = array('Q')
+        offsets, types = scanner.scan(string_slots=slots)
+        snapshot = Snapshot(offset, offsets, types, scanner.definitions,
+                            slots)
+        if cache is not None:
+            cache.store(reader.buffer, snapshot)
+        return snapshot
+
+    @staticmethod
+    def _get_splice_writer(reader, offset):
+        """
+        get splice writer for data reader has walked through
+
+        :param udlg.utils.reader.BinaryReader reader: reader
+        :param int offset: serialization header offset
+        :rtype: SpliceWriter
+        :return: splice writer
+        """
+        buffer = reader.buffer
+        if isinstance(buffer, mmap.mmap):
+            #: mapped memory is released once build is over
+            buffer, offset = buffer[offset:reader.offset], 0
+        return SpliceWriter(buffer, offset=offset)
+
+    @classmethod
+    def build_many(cls, paths, workers=None, handler=None, lazy=False,
+                   max_pending=None, backend=BACKEND_CTYPES):
+        """
+        build documents of many files in parallel (process pool), results
+        are yielded in completion order.
+
+        Handler is called by worker with built document and its result is
+        yielded instead, it should be picklable (module level function) and
+        so should be its result. Without handler:
+
+        - compact documents are built by workers and sent back pickled,
+          note unpickling takes about as long as building, so parent is
+          busy with every document anyway
+        - ctypes documents can not be passed between processes, so workers
+          scan files and send records index (:class:`udlg.cache.Snapshot`)
+          back, parent maps files and builds lazy documents from them
+          without scanning files again. Records are decoded in parent on
+          first access, so eager ctypes documents are given lazy ones, use
+          compact backend to decode records by workers.
+
+        :param collections.Iterable[str] paths: file paths
+        :param int workers: amount of worker processes, cpu count by
+            default, 1 builds files one by one in current process
+        :param callable handler: document handler, optional
+        :param bool lazy: lazy mode
+        :param int max_pending: amount of files being processed at once,
+            twice workers amount by default
+        :param str backend: record model backend
+        :rtype: collections.Iterable[BuildResult]
+        :return: results iterator, errors are reported per file with
+            ``BuildResult.error``
+        """
+        cls._check_backend(backend, lazy)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            for path in paths:
+                try:
+                    result = _build_file(cls, path, handler, lazy, backend)
+                    if handler is None and lazy:
+                        result = cls._build_indexed(path, *result)
+                except Exception as err:
+                    yield BuildResult(path, None, err)
+                else:
+                    yield BuildResult(path, result, None)
+            return
+
+        #: workers send records index back, documents are built by parent
+        indexed = handler is None and backend == BACKEND_CTYPES
+        max_pending = max_pending or workers * 2
+        paths = iter(paths)
+        pending = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                for path in paths:
+                    future = executor.submit(_build_file, cls, path, handler,
+                                             lazy or indexed, backend)
+                    pending[future] = path
+                    if len(pending) >= max_pending:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    try:
+                        result = future.result()
+                        if indexed:
+                            result = cls._build_indexed(path, *result)
+                    except Exception as err:
+                        yield BuildResult(path, None, err)
+                    else:
+                        yield BuildResult(path, result, None)
+
+    @classmethod
+    def _build_indexed(cls, path, file_key, snapshot):
+        """
+        build lazy document from file indexed already
+
+        :param str path: file path
+        :param tuple[int, int] file_key: file size and modification time
+            (ns) at the moment it was indexed
+        :param udlg.cache.Snapshot snapshot: records index
+        :rtype: structure.BinaryDataStructureFile
+        :return: lazy document
         """
+        with open(path, 'rb') as stream:
+            #: file changed since it was indexed is scanned again
+            cache = None
+            if _get_file_key(stream) == file_key:
+                cache = SnapshotSource(snapshot)
+            return cls.build(stream, lazy=True, cache=cache)
+
+    @classmethod
+    def scan(cls, stream):
+        """
+        scan records without decoding them
+
+        :param stream: stream object (file, in memory stream), binary data
+            or :class:`udlg.utils.reader.BinaryReader` instance
+        :rtype: udlg.cache.Snapshot
+        :return: records index
+        """
+        cls._check_stream(stream)
+        with open_reader(stream) as reader:
+            cls._skip_preamble(reader)
+            offset = reader.offset
+            SerializationHeader()._initiate(reader)
+            return cls._get_snapshot(reader, offset)
+
+    @classmethod
+    def iter_records(cls, stream, header=None):
+        """
+        iterate over records of serialized stream one by one, records are
+        not collected anywhere, only class definitions are kept (records
+        with class id reference them)
+
+        :param stream: stream object (file, in memory stream), binary data
+            or :class:`udlg.utils.reader.BinaryReader` instance
+        :param structure.structure.SerializationHeader header: header to
+            initiate, optional
+        :rtype: collections.Iterable[structure.Record]
+        :return: records iterator, the last record is MessageEnd one
+        :raises EnvironmentError:
+            - if stream was opened not in binary mode
+        """
+        cls._check_stream(stream)
+        with open_reader(stream) as reader:
+            header = header if header is not None else SerializationHeader()
+            header._initiate(reader)
+            records = cls._iter_records(reader,
+                                        object_id_map=ClassObjectIdMap())
+            for record in records:
+                yield record
+
+    @classmethod
+    def iter_strings(cls, stream, cache=None):
+        """
+        fast string extraction, walks record stream skipping everything
+        but string members of class records, nothing is decoded into
+        structures
+
+        :param stream: stream object (file, in memory stream), binary data
+            or :class:`udlg.utils.reader.BinaryReader` instance
+        :param udlg.cache.ParseCache cache: parse cache, string spans are
+            taken from it, so records are not walked at all, optional
+        :rtype: collections.Iterable[tuple[int, int, bytes]]
+        :return: (record index, member index, string) iterator, numbering
+            is the same as for ``document.records[i].members[j]``
+        """
+        cls._check_stream(stream)
+        with open_reader(stream) as reader:
+            offset = reader.offset
+            SerializationHeader()._initiate(reader)
+            if cache is None:
+                items = RecordScanner(reader).iter_strings()
+            else:
+                items = cls._get_snapshot(reader, offset, cache).iter_strings(
+                    reader.buffer
+                )
+            for item in items:
+                yield item
+
+    @classmethod
+    def apply_i18n(cls, stream, block, sink, cache=None):
+        """
+        apply i18n strings and write document into sink without document
+        building, original data is written with changed strings spliced
+        in, output is the same as ``load_i18n`` and ``write_to`` of built
+        document give
+
+        :param stream: stream object (file, in memory stream), binary data
+            or :class:`udlg.utils.reader.BinaryReader` instance
+        :param block: i18n block (bytes) or binary file like object, it's
+            read chunk by chunk
+        :param sink: ``bytearray`` (data is appended), file like object,
+            ``mmap.mmap`` or :class:`udlg.utils.writer.BufferWriter`
+        :param udlg.cache.ParseCache cache: parse cache, optional
+        :rtype: None
+        :return: None
+        """
+        cls._check_stream(stream)
+        write = get_writer(sink)
+        with open_reader(stream) as reader:
+            start = reader.offset
+            cls._skip_preamble(reader)
+            offset = reader.offset
+            SerializationHeader()._initiate(reader)
+            writer = cls._get_snapshot(reader, offset, cache).\
+                get_splice_writer(reader.buffer)
+            write(reader.buffer[start:offset])
+            writer.write_changes(
+                writer.iter_i18n_changes(iter_i18n_items(block)), write
+            )
+
+    @staticmethod
+    def _skip_preamble(reader):
+        """
+        skip data preceding serialization header (nothing for plain
+        serialized stream)
+
+        :param udlg.utils.reader.BinaryReader reader: reader
+        :rtype: None
+        :return: None
+        """
+
+    @classmethod
+    def _iter_records(cls, reader, object_id_map, record_class=Record):
+        """
+        decode records up to (including) MessageEnd one
+
+        :param udlg.utils.reader.BinaryReader reader: reader set up right
+            on the first record
+        :param dict object_id_map: object id map
+        :param type record_class: record class (backend)
+        :rtype: collections.Iterable[structure.Record]
+        :return: records iterator
+        """
+        message_end = RecordTypeEnum.MessageEnd
+        while True:
+            record = record_class()
+            if record_class is Record:
+                record._object_id_map = object_id_map
+            record._initiate(stream=reader, object_id_map=object_id_map)
+            yield record
+            if record.record_type == message_end:
+                break
+
+    @staticmethod
+    def _check_stream(stream):
         if isinstance(stream, io.BufferedReader):
             if 'b' not in stream.mode:
                 stream.close()
                 raise EnvironmentError(
                     "You should open stream with `binary` (b) flag"
                 )
-        document = structure.BinaryDataStructureFile()
-        document.header._initiate(stream)
-        records = list()
-        append = records.append
 
-        #: id: info
-        object_id_map = {}
-        count = 0
-        while True:
-            record = Record()
-            record._object_id_map = object_id_map
-            record._initiate(stream=stream, object_id_map=object_id_map)
-            append(record)
-            count += 1
-            if record.record_type == RecordTypeEnum.MessageEnd:
-                break
-        document.records_ptr = (Record * len(records))(*records)
-        document.count = count
-        return document
+    @classmethod
+    def _build_index(cls, document, reader, snapshot):
+        """
+        set up lazy record list for document
+
+        :param structure.BinaryDataStructureFile document: document
+        :param udlg.utils.reader.BinaryReader reader: reader
+        :param udlg.cache.Snapshot snapshot: records index
+        :rtype: udlg.utils.reader.BinaryReader
+        :return: reader lazy records use (it owns source data)
+        """
+        #: lazy records own source data from now on
+        source = reader.fork()
+        object_id_map = LazyObjectIdMap(source, snapshot.definitions)
+        records = LazyRecordList(source, snapshot.offsets, snapshot.types,
+                                 object_id_map)
+        document.count = len(records)
+        document.state = DocumentState(records=records)
+        return source
 
 
 class UDLGBuilder(BinaryFormatterFileBuilder):
     @classmethod
-    def build(cls, stream):
-        document = UDLGFile()
-        document._initiate(stream)
-        document.data = super(UDLGBuilder, cls).build(stream)
+    def build(cls, stream, lazy=False, keep_source=False,
+              backend=BACKEND_CTYPES, cache=None, profile=False):
+        cls._check_backend(backend, lazy, cache)
+        with open_reader(stream) as reader:
+            if backend == BACKEND_COMPACT:
+                document = compact.UDLGFile()
+            else:
+                document = UDLGFile()
+            document._initiate(reader)
+            document.data = super(UDLGBuilder, cls).build(
+                reader, lazy=lazy, keep_source=keep_source, backend=backend,
+                cache=cache, profile=profile
+            )
         return document
+
+    @classmethod
+    def iter_records(cls, stream, header=None):
+        with open_reader(stream) as reader:
+            UDLGFile()._initiate(reader)
+            records = super(UDLGBuilder, cls).iter_records(reader,
+                                                           header=header)
+            for record in records:
+                yield record
+
+    @classmethod
+    def iter_strings(cls, stream, cache=None):
+        with open_reader(stream) as reader:
+            UDLGFile()._initiate(reader)
+            items = super(UDLGBuilder, cls).iter_strings(reader, cache=cache)
+            for item in items:
+                yield item
+
+    @staticmethod
+    def _skip_preamble(reader):
+        UDLGFile()._initiate(reader)
+
+    @classmethod
+    def extract_i18n(cls, stream, cache=None, sink=None):
+        """
+        extract i18n strings without building document, output is the same
+        as :meth:`udlg.structure.UDLGFile.unpack_i18n` gives
+
+        :param stream: stream object (file, in memory stream), binary data
+            or :class:`udlg.utils.reader.BinaryReader` instance
+        :param udlg.cache.ParseCache cache: parse cache, optional
+        :param sink: ``bytearray`` (data is appended) or file like object,
+            escaped i18n strings are written into chunk by chunk, optional
+        :rtype: bytes | int
+        :return: i18n strings with \n sign separated, entries written if
+            sink is given
+        """
+        items = cls.iter_strings(stream, cache=cache)
+        if sink is not None:
+            return write_i18n_items(items, sink)
+        return format_i18n_items(items)
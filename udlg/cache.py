@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.cache
+    :synopsis: Persistent parse cache, records index snapshots stored on
+        disk and keyed by file content hash
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import os
+import sys
+import tempfile
+from array import array
+from hashlib import sha256
+from struct import Struct
+
+from .structure.splice import SpliceWriter
+
+#: snapshot format version, bumped on any layout change
+FORMAT_VERSION = 1
+SNAPSHOT_MAGIC = b'UDLGSNAP'
+#: magic, format version, serialization header offset, records count,
+#: class definitions count, string slots count
+SNAPSHOT_HEADER_STRUCT = Struct('<8sHxxQIII')
+SNAPSHOT_SUFFIX = '.snapshot'
+#: string slot items: record index, member index, string offset, value
+#: offset, end offset
+SLOT_SIZE = 5
+
+DEFAULT_MAX_SIZE = 64 << 20
+DEFAULT_DIRECTORY = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
+    ),
+    'udlg'
+)
+
+
+def get_library_version():
+    from . import __VERSION__
+    return '.'.join(str(part) for part in __VERSION__)
+
+
+def get_digest(data):
+    """
+    get content hash, it's a part of cache key
+
+    :param bytes | mmap.mmap data: data
+    :rtype: str
+    :return: sha256 hex digest
+    """
+    return sha256(data).hexdigest()
+
+
+def _to_bytes(items):
+    """
+    :param array.array items: array
+    :rtype: bytes
+    :return: little endian array data
+    """
+    if sys.byteorder != 'little':
+        items = array(items.typecode, items)
+        items.byteswap()
+    return items.tobytes()
+
+
+def _from_bytes(typecode, data):
+    items = array(typecode)
+    items.frombytes(data)
+    if sys.byteorder != 'little':
+        items.byteswap()
+    return items
+
+
+class Snapshot(object):
+    """
+    Parsed document index: records offsets and types, class definitions
+    offsets and string member spans. Lazy document, string extraction and
+    i18n splicing need nothing else, so document is not scanned again once
+    snapshot is there.
+    """
+    __slots__ = ('offset', 'offsets', 'types', 'definitions', 'slots')
+
+    def __init__(self, offset, offsets, types, definitions, slots):
+        """
+        :param int offset: serialization header offset
+        :param array.array offsets: records offsets, with extra one
+            pointing right after the last record
+        :param bytearray types: records types
+        :param dict definitions: object_id: class definition record offset
+        :param array.array slots: string slots, flat, see
+            :meth:`udlg.structure.scanner.RecordScanner.iter_string_slots`
+        """
+        self.offset = offset
+        self.offsets = offsets
+        self.types = types
+        self.definitions = definitions
+        self.slots = slots
+
+    def __repr__(self):
+        return '<%s at 0x%08x, records: %i, strings: %i>' % (
+            self.__class__.__name__, id(self), len(self.types),
+            len(self.slots) // SLOT_SIZE
+        )
+
+    def iter_slots(self):
+        """
+        :rtype: collections.Iterable[tuple[int, int, int, int, int]]
+        :return: string slots iterator
+        """
+        slots = iter(self.slots)
+        return zip(*((slots, ) * SLOT_SIZE))
+
+    def iter_strings(self, buffer):
+        """
+        :param bytes | mmap.mmap buffer: document data
+        :rtype: collections.Iterable[tuple[int, int, bytes]]
+        :return: (record index, member index, string) iterator
+        """
+        for index, member_index, _, start, end in self.iter_slots():
+            yield index, member_index, buffer[start:end]
+
+    def get_splice_writer(self, buffer):
+        """
+        :param bytes | mmap.mmap buffer: document data
+        :rtype: udlg.structure.splice.SpliceWriter
+        :return: splice writer with string spans set up
+        """
+        return SpliceWriter(buffer, offset=self.offset,
+                            slots=list(self.iter_slots()),
+                            end=self.offsets[-1])
+
+    def to_bin(self):
+        """
+        :rtype: bytes
+        :return: binary data
+        """
+        object_ids = array('i', self.definitions.keys())
+        definitions = array('Q', self.definitions.values())
+        return b''.join((
+            SNAPSHOT_HEADER_STRUCT.pack(
+                SNAPSHOT_MAGIC, FORMAT_VERSION, self.offset,
+                len(self.types), len(object_ids),
+                len(self.slots) // SLOT_SIZE
+            ),
+            _to_bytes(self.offsets),
+            bytes(self.types),
+            _to_bytes(object_ids),
+            _to_bytes(definitions),
+            _to_bytes(self.slots)
+        ))
+
+    @classmethod
+    def from_bin(cls, data):
+        """
+        :param bytes data: binary data
+        :rtype: Snapshot
+        :return: snapshot
+        :raises ValueError:
+            - if data is not a snapshot, it has other format version or it's
+              truncated
+        """
+        header_size = SNAPSHOT_HEADER_STRUCT.size
+        if len(data) < header_size:
+            raise ValueError("Snapshot is truncated")
+        (magic, version, offset, records_count, definitions_count,
+         slots_count) = SNAPSHOT_HEADER_STRUCT.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Wrong snapshot format")
+        sizes = (
+            (records_count + 1) * 8, records_count, definitions_count * 4,
+            definitions_count * 8, slots_count * SLOT_SIZE * 8
+        )
+        if len(data) != header_size + sum(sizes):
+            raise ValueError("Snapshot is truncated")
+        view = memoryview(data)
+        sections = []
+        position = header_size
+        for size in sizes:
+            sections.append(view[position:position + size])
+            position += size
+        offsets, types, object_ids, definitions, slots = sections
+        return cls(
+            offset,
+            _from_bytes('Q', offsets),
+            bytearray(types),
+            dict(zip(_from_bytes('i', object_ids),
+                     _from_bytes('Q', definitions))),
+            _from_bytes('Q', slots)
+        )
+
+
+class ParseCache(object):
+    """
+    On disk snapshots cache. Snapshot is keyed by document data hash and
+    library version, so changed files and library upgrades never hit
+    stale entries. Snapshots are written to temporary file and renamed, so
+    concurrent processes could share cache directory: readers see either
+    complete snapshot or none. Cache size is kept (approximately) under
+    ``max_size``, least recently used snapshots are evicted first.
+    """
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param str directory: cache directory, ``$XDG_CACHE_HOME/udlg`` by
+            default
+        :param int max_size: cache size limit in bytes
+        """
+        self.directory = directory or DEFAULT_DIRECTORY
+        self.max_size = max_size
+        self.version = get_library_version()
+        #: cache size estimate, counted on first store
+        self._size = None
+
+    def __repr__(self):
+        return '<%s at 0x%08x, directory: %s>' % (
+            self.__class__.__name__, id(self), self.directory
+        )
+
+    def get_key(self, data):
+        """
+        :param bytes | mmap.mmap data: document data
+        :rtype: str
+        :return: cache key
+        """
+        return '%s-%s' % (get_digest(data), self.version)
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key + SNAPSHOT_SUFFIX)
+
+    def load(self, data, offset=0):
+        """
+        load snapshot for document data
+
+        :param bytes | mmap.mmap data: document data
+        :param int offset: serialization header offset
+        :rtype: Snapshot | None
+        :return: snapshot or None if there's no (valid) one
+        """
+        path = self.get_path(self.get_key(data))
+        try:
+            with open(path, 'rb') as stream:
+                raw = stream.read()
+        except OSError:
+            return None
+        try:
+            snapshot = Snapshot.from_bin(raw)
+        except ValueError:
+            self._remove(path)
+            return None
+        if snapshot.offset != offset:
+            return None
+        try:
+            #: modification time is used as last access one
+            os.utime(path)
+        except OSError:
+            pass
+        return snapshot
+
+    def store(self, data, snapshot):
+        """
+        store snapshot for document data
+
+        :param bytes | mmap.mmap data: document data
+        :param Snapshot snapshot: snapshot
+        :rtype: None
+        :return: None
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        raw = snapshot.to_bin()
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, prefix='.', suffix='.tmp'
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as stream:
+                stream.write(raw)
+            os.replace(temporary_path, self.get_path(self.get_key(data)))
+        except BaseException:
+            self._remove(temporary_path)
+            raise
+        if self._size is None:
+            self._size = self.get_size()
+        else:
+            self._size += len(raw)
+        if self._size > self.max_size:
+            self.evict()
+
+    def _iter_entries(self):
+        """
+        :rtype: collections.Iterable[tuple[float, int, str]]
+        :return: (modification time, size, path) iterator
+        """
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in entries:
+            if not entry.name.endswith(SNAPSHOT_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                #: evicted by another process
+                continue
+            yield stat.st_mtime, stat.st_size, entry.path
+
+    def get_size(self):
+        """
+        :rtype: int
+        :return: cache size in bytes
+        """
+        return sum(size for _, size, _ in self._iter_entries())
+
+    def evict(self, max_size=None):
+        """
+        remove least recently used snapshots until cache fits size limit
+
+        :param int max_size: size limit, cache one by default
+        :rtype: None
+        :return: None
+        """
+        max_size = self.max_size if max_size is None else max_size
+        entries = sorted(self._iter_entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= max_size:
+                break
+            self._remove(path)
+            size -= entry_size
+        self._size = size
+
+    def clear(self):
+        """
+        remove all snapshots
+
+        :rtype: None
+        :return: None
+        """
+        self.evict(max_size=0)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.export
+    :synopsis: Streaming JSON export, records are encoded and written one
+        at a time
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import json
+
+from .structure.lazy import LazyRecordList
+
+FORMAT_JSON = 'json'
+#: newline delimited JSON, headers line and one line per record
+FORMAT_NDJSON = 'ndjson'
+FORMATS = (FORMAT_JSON, FORMAT_NDJSON)
+
+
+def _default(value):
+    """
+    convert values JSON could not encode, bytes (strings are utf-8 encoded,
+    invalid sequences are kept as ``surrogateescape`` code points)
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', 'surrogateescape')
+    raise TypeError("Object of type `%s` is not JSON serializable" %
+                    type(value).__name__)
+
+
+#: default separators, output is the same as ``json.dumps`` gives
+ENCODER = json.JSONEncoder(default=_default)
+
+
+def iter_records(document):
+    """
+    iterate over document records, records of lazy document are decoded
+    but not cached
+
+    :param document: document, UDLG or binary formatter one, any backend
+    :rtype: collections.Iterable
+    :return: records iterator
+    """
+    structure = getattr(document, 'data', document)
+    records = structure.records
+    if isinstance(records, LazyRecordList):
+        return records.iter_transient()
+    return iter(records)
+
+
+def get_headers(document):
+    """
+    :param document: document, UDLG or binary formatter one, any backend
+    :rtype: dict
+    :return: document headers, the same structure ``to_dict`` gives but
+        records
+    """
+    structure = getattr(document, 'data', document)
+    headers = {'header': structure.header.to_dict()}
+    if structure is not document:
+        headers = {'header': document.header.to_dict(), 'data': headers}
+    return headers
+
+
+def write_json(document, stream, format=FORMAT_JSON):
+    """
+    write document as JSON right into stream, every record is converted
+    with per class field plan and written before the next one is
+    converted, so the whole document tree is never built. ``json`` output
+    is the same ``json.dumps(document.to_dict())`` gives, ``ndjson`` one
+    is headers line followed by one line per record.
+
+    :param document: document, UDLG or binary formatter one, any backend
+    :param stream: text file like object
+    :param str format: output format, ``json`` or ``ndjson``
+    :rtype: int
+    :return: records written
+    :raises ValueError:
+        - if format is not supported
+    """
+    if format not in FORMATS:
+        raise ValueError("Wrong export format: `%s`" % format)
+    encode = ENCODER.encode
+    write = stream.write
+    headers = get_headers(document)
+    count = 0
+    if format == FORMAT_NDJSON:
+        write(encode(headers))
+        write('\n')
+        for record in iter_records(document):
+            write(encode(record.to_dict()))
+            write('\n')
+            count += 1
+        return count
+
+    #: headers are written up to records list opening
+    data = headers.get('data', headers)
+    data['records'] = []
+    prefix = encode(headers)
+    write(prefix[:prefix.rindex('[]') + 1])
+    for record in iter_records(document):
+        if count:
+            write(', ')
+        write(encode(record.to_dict()))
+        count += 1
+    write('], "count": %i}' % count)
+    if data is not headers:
+        write('}')
+    return count
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.profile
+    :synopsis: Decoding profile, records count, bytes and time per record
+        type
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+from . import enums
+
+
+class Counter(object):
+    """
+    Decoded items amount, bytes consumed and time spent (seconds)
+    """
+    __slots__ = ('count', 'size', 'time')
+
+    def __init__(self, count=0, size=0, time=0.0):
+        self.count = count
+        self.size = size
+        self.time = time
+
+    def __repr__(self):
+        return '<%s at 0x%08x, count: %i, size: %i, time: %.6f>' % (
+            self.__class__.__name__, id(self), self.count, self.size,
+            self.time
+        )
+
+    def add(self, size, time):
+        self.count += 1
+        self.size += size
+        self.time += time
+
+    def update(self, other):
+        self.count += other.count
+        self.size += other.size
+        self.time += other.time
+
+    def to_dict(self):
+        return {'count': self.count, 'size': self.size, 'time': self.time}
+
+
+class Profile(object):
+    """
+    Decoding profile, it's collected while document is built with
+    ``profile`` option (decoders find it as reader ``profile`` attribute).
+    Lazy documents collect it on records access.
+
+    Top level records time and size include their members, member records
+    (the ones decoded as class records members) are counted separately.
+    """
+    def __init__(self):
+        #: record type: counter, top level records
+        self.records = {}
+        #: record type: counter, class members records
+        self.members = {}
+        #: LengthPrefixedString values
+        self.strings = Counter()
+        #: MemberTypeInfo structures
+        self.member_type_info = Counter()
+
+    def __repr__(self):
+        return '<%s at 0x%08x, records: %i>' % (
+            self.__class__.__name__, id(self),
+            sum(counter.count for counter in self.records.values())
+        )
+
+    @staticmethod
+    def _add(counters, record_type, size, time):
+        counter = counters.get(record_type)
+        if counter is None:
+            counter = counters[record_type] = Counter()
+        counter.add(size, time)
+
+    def add_record(self, record_type, size, time):
+        """
+        :param int record_type: record type
+        :param int size: bytes consumed
+        :param float time: time spent, seconds
+        :rtype: None
+        :return: None
+        """
+        self._add(self.records, record_type, size, time)
+
+    def add_member(self, record_type, size, time):
+        self._add(self.members, record_type, size, time)
+
+    def update(self, other):
+        """
+        merge other profile counters into this one (for several documents
+        stats)
+
+        :param Profile other: profile
+        :rtype: None
+        :return: None
+        """
+        for counters, other_counters in ((self.records, other.records),
+                                         (self.members, other.members)):
+            for record_type, counter in other_counters.items():
+                counters.setdefault(record_type, Counter()).update(counter)
+        self.strings.update(other.strings)
+        self.member_type_info.update(other.member_type_info)
+
+    def to_dict(self):
+        def get_counters(counters):
+            return dict(
+                (enums.RecordTypeEnum(record_type).name, counter.to_dict())
+                for record_type, counter in counters.items()
+            )
+
+        return {
+            'records': get_counters(self.records),
+            'members': get_counters(self.members),
+            'strings': self.strings.to_dict(),
+            'member_type_info': self.member_type_info.to_dict()
+        }
+
+    def format(self):
+        """
+        :rtype: str
+        :return: report table, the slowest record types go first
+        """
+        lines = ['%-34s %10s %12s %10s %8s' % (
+            'entry', 'count', 'bytes', 'time, ms', 'time, %'
+        )]
+        total = sum(counter.time for counter in self.records.values())
+
+        def add(name, counter):
+            lines.append('%-34s %10i %12i %10.3f %8.1f' % (
+                name, counter.count, counter.size, counter.time * 1000.0,
+                counter.time * 100.0 / total if total else 0.0
+            ))
+
+        for title, counters in (('', self.records),
+                                ('member ', self.members)):
+            items = sorted(counters.items(),
+                           key=lambda item: item[1].time, reverse=True)
+            for record_type, counter in items:
+                add(title + enums.RecordTypeEnum(record_type).name, counter)
+        add('LengthPrefixedString', self.strings)
+        add('MemberTypeInfo', self.member_type_info)
+        return '\n'.join(lines)
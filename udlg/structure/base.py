@@ -6,9 +6,13 @@
 .. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 .. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 """
-from struct import unpack, pack, calcsize
-from ctypes import Structure, cast, pointer, c_void_p, _SimpleCData, _Pointer
-from .constants import PrimitiveTypeConversionSet
+from operator import attrgetter
+from struct import pack, Struct
+from ctypes import (
+    Array, Structure, cast, pointer, c_void_p, py_object, _SimpleCData,
+    _Pointer
+)
+from ..utils.writer import get_writer
 
 
 class SimpleSerializerMixin(object):
@@ -16,19 +20,50 @@ class SimpleSerializerMixin(object):
     Very basic and dumb serializer :), please do not count on it too much.
     """
     def to_dict(self):
-        document = {}
-        for field_name, field_type in self._fields_:
-            entry = getattr(self, field_name.replace('_ptr', ''))
-            if isinstance(entry, list):
-                value = [
-                    x.to_dict() if hasattr(x, 'to_dict') else x for x in entry
-                ]
+        return dict((key, get(self)) for key, get in self.get_dict_plan())
+
+    @classmethod
+    def get_dict_plan(cls):
+        """
+        get (compile once and cache on class) ``to_dict`` plan, every field
+        gets precompiled value getter, pointer fields are resolved by
+        properties without ``_ptr`` suffix
+
+        :rtype: tuple
+        :return: dict plan, sequence of ``(key, get(instance))`` pairs
+        :raises TypeError:
+            - if field type could not be converted
+        """
+        plan = cls.__dict__.get('_dict_plan_')
+        if plan is not None:
+            return plan
+
+        plan = []
+        for field_name, field_type in cls._fields_:
+            if field_type is py_object:
+                #: python objects are kept for internal use only
+                continue
+            if field_name.endswith('_ptr'):
+                key = field_name[:-4]
+                plan.append((key, _get_value_getter(key)))
+            elif issubclass(field_type, _SimpleCData):
+                plan.append((field_name, attrgetter(field_name)))
+            elif issubclass(field_type, Array):
+                #: fixed size byte arrays (signatures)
+                plan.append((field_name, _get_array_getter(field_name)))
+            elif hasattr(field_type, 'to_dict'):
+                plan.append((field_name, _get_nested_getter(field_name)))
+            elif issubclass(field_type, _Pointer):
+                plan.append((field_name,
+                             _get_pointer_getter(field_name, field_type)))
+            elif issubclass(field_type, Structure):
+                #: plain structures are given as is
+                plan.append((field_name, attrgetter(field_name)))
             else:
-                value = entry.to_dict() if hasattr(entry, 'to_dict') else entry
-            document.update({
-                field_name.replace('_ptr', ''): value
-            })
-        return document
+                raise TypeError("Wrong field type: `%r`" % field_type)
+        plan = tuple(plan)
+        cls._dict_plan_ = plan
+        return plan
 
     def to_bin(self):
         """
@@ -38,49 +73,195 @@ class SimpleSerializerMixin(object):
         :return: binary data
         """
         document = bytearray()
-        extend = document.extend
-
-        #: super extra hack
-        member_type_info = None
-        if hasattr(self, 'member_type_info'):
-            member_type_info = self.member_type_info
-        elif hasattr(self, 'class_reference'):
-            member_type_info = self.class_reference.member_type_info
-        else:
-            pass
+        self._write_bin(document.extend)
+        return document
+
+    def write_to(self, sink):
+        """
+        write binary data right into sink, nested structures write into
+        the same sink, so no intermediate buffers are created
+
+        :param sink: ``bytearray`` (data is appended), file like object,
+            ``mmap.mmap`` or :class:`udlg.utils.writer.BufferWriter` (data
+            is written at current position)
+        :rtype: None
+        :return: None
+        """
+        self._write_bin(get_writer(sink))
+
+    @classmethod
+    def get_encode_plan(cls):
+        """
+        get (compile once and cache on class) encode plan, consecutive
+        scalar fields are fused into one precompiled structure, nested
+        structures write themselves directly, excluded fields are skipped
+
+        :rtype: tuple
+        :return: encode plan, sequence of ``step(instance, write)``
+            callables
+        :raises TypeError:
+            - if field type could not be encoded
+        """
+        plan = cls.__dict__.get('_encode_plan_')
+        if plan is not None:
+            return plan
+
+        plan = []
+        formats, names = [], []
+        exclude = getattr(cls, '_exclude_', ())
+
+        def flush():
+            if names:
+                plan.append(_get_scalars_step(formats, names))
+                del formats[:], names[:]
 
-        for field_name, field_type in self._fields_:
+        for field_name, field_type in cls._fields_:
             #: some data should not be serialized
-            if field_name in getattr(self, '_exclude_', []):
+            if field_name in exclude:
                 continue
-
-            entry = getattr(self, field_name.replace('_ptr', ''))
-            if hasattr(entry, 'to_bin'):
-                extend(entry.to_bin())
-            elif isinstance(entry, list):
-                for idx, item in enumerate(entry):
-                    if hasattr(item, 'to_bin'):
-                        extend(item.to_bin())
-                    else:
-                        primitive_type = member_type_info.additional_info[
-                            idx
-                        ].value
-                        ctype_primitive = PrimitiveTypeConversionSet[
-                            primitive_type
-                        ]
-                        extend(pack(ctype_primitive, item))
-            else:
-                if issubclass(field_type, _Pointer):
-                    count = getattr(self, 'count')
-                    if issubclass(field_type._type_, Structure):
-                        for item in entry[:count]:
-                            extend(item.to_bin())
-                    else:
-                        extend(pack('%i%s' % (count, field_type._type_._type_),
-                                    *entry[:count]))
+            if field_name.endswith('_ptr'):
+                flush()
+                if (field_name == 'members_ptr' and
+                        hasattr(cls, '_write_members')):
+                    plan.append(_write_members_step)
                 else:
-                    extend(pack(field_type._type_, entry))
-        return document
+                    plan.append(_get_value_step(field_name[:-4]))
+            elif issubclass(field_type, _SimpleCData):
+                formats.append(field_type._type_)
+                names.append(field_name)
+            elif hasattr(field_type, '_write_bin'):
+                flush()
+                plan.append(_get_nested_step(field_name))
+            elif issubclass(field_type, _Pointer):
+                flush()
+                plan.append(_get_pointer_step(field_name, field_type))
+            else:
+                raise TypeError("Wrong field type: `%r`" % field_type)
+        flush()
+        plan = tuple(plan)
+        cls._encode_plan_ = plan
+        return plan
+
+    def _write_bin(self, write):
+        """
+        write binary data
+
+        :param callable write: write function, takes bytes like object
+        :rtype: None
+        :return: None
+        """
+        for step in self.get_encode_plan():
+            step(self, write)
+
+
+def _get_scalars_step(formats, names):
+    pack = Struct('<' + ''.join(formats)).pack
+    get = attrgetter(*names)
+    if len(names) == 1:
+        def write_scalar(instance, write):
+            write(pack(get(instance)))
+        return write_scalar
+
+    def write_scalars(instance, write):
+        write(pack(*get(instance)))
+    return write_scalars
+
+
+def _get_nested_step(field_name):
+    get = attrgetter(field_name)
+
+    def write_nested(instance, write):
+        get(instance)._write_bin(write)
+    return write_nested
+
+
+def _get_pointer_step(field_name, field_type):
+    """
+    get step for pointer to array of ``instance.count`` elements
+    """
+    get = attrgetter(field_name)
+    if issubclass(field_type._type_, Structure):
+        def write_structures(instance, write):
+            for item in get(instance)[:instance.count]:
+                item._write_bin(write)
+        return write_structures
+
+    fmt = field_type._type_._type_
+
+    def write_scalars(instance, write):
+        count = instance.count
+        write(pack('<%i%s' % (count, fmt), *get(instance)[:count]))
+    return write_scalars
+
+
+def _get_value_step(name):
+    """
+    get step for value pointer field is resolved to (by property without
+    ``_ptr`` suffix), value is a structure or list of structures
+    """
+    get = attrgetter(name)
+
+    def write_value(instance, write):
+        entry = get(instance)
+        if isinstance(entry, list):
+            for item in entry:
+                item._write_bin(write)
+        else:
+            entry._write_bin(write)
+    return write_value
+
+
+def _write_members_step(instance, write):
+    instance._write_members(write)
+
+
+def _get_value_getter(name):
+    """
+    get getter of value pointer field is resolved to, structure or list of
+    structures (or plain values)
+    """
+    get = attrgetter(name)
+
+    def get_value(instance):
+        entry = get(instance)
+        if isinstance(entry, list):
+            return [
+                item.to_dict() if hasattr(item, 'to_dict') else item
+                for item in entry
+            ]
+        return entry.to_dict() if hasattr(entry, 'to_dict') else entry
+    return get_value
+
+
+def _get_array_getter(field_name):
+    get = attrgetter(field_name)
+
+    def get_array(instance):
+        return bytes(get(instance))
+    return get_array
+
+
+def _get_nested_getter(field_name):
+    get = attrgetter(field_name)
+
+    def get_nested(instance):
+        return get(instance).to_dict()
+    return get_nested
+
+
+def _get_pointer_getter(field_name, field_type):
+    """
+    get getter of pointer to array of ``instance.count`` elements
+    """
+    get = attrgetter(field_name)
+    if issubclass(field_type._type_, Structure):
+        def get_structures(instance):
+            return [item.to_dict() for item in get(instance)[:instance.count]]
+        return get_structures
+
+    def get_scalars(instance):
+        return get(instance)[:instance.count]
+    return get_scalars
 
 
 class BinaryRecordStructure(SimpleSerializerMixin, Structure):
@@ -91,6 +272,50 @@ class BinaryRecordStructure(SimpleSerializerMixin, Structure):
     def get_void_ptr(self):
         return cast(pointer(self), c_void_p)
 
+    @classmethod
+    def get_decode_plan(cls):
+        """
+        get (compile once and cache on class) decode plan, consecutive
+        scalar fields are fused into one precompiled structure, nested
+        structures are initiated directly
+
+        :rtype: tuple
+        :return: decode plan, sequence of ``(struct.Struct, field names)``
+            steps for scalar fields and ``(None, (field name, field type))``
+            steps for nested structures
+        :raises TypeError:
+            - if field type could not be decoded
+        """
+        plan = cls.__dict__.get('_decode_plan_')
+        if plan is not None:
+            return plan
+
+        plan = []
+        formats, names = [], []
+
+        def flush():
+            if names:
+                plan.append((Struct('<' + ''.join(formats)), tuple(names)))
+                del formats[:], names[:]
+
+        for field_name, field_type in cls._fields_:
+            if issubclass(field_type, cls) or hasattr(field_type,
+                                                      '_initiate'):
+                flush()
+                plan.append((None, (field_name, field_type)))
+            elif issubclass(field_type, _SimpleCData):
+                formats.append(field_type._type_)
+                names.append(field_name)
+            elif issubclass(field_type, _Pointer):
+                #: nothing to do, should be initialized in subclass
+                pass
+            else:
+                raise TypeError("Wrong field type: `%r`" % type(field_type))
+        flush()
+        plan = tuple(plan)
+        cls._decode_plan_ = plan
+        return plan
+
     def _initiate(self, stream):
         """
         initiate instance fields (construct) from stream
@@ -100,23 +325,16 @@ class BinaryRecordStructure(SimpleSerializerMixin, Structure):
             Stream offset should be set up right on block that identifies
             as Serialization Header
 
-        :param stream: stream object, file stream for example
+        :param udlg.utils.reader.BinaryReader stream: reader
         :rtype: None
         :return: None
         """
-        for field_name, field_type in self._fields_:
-            if issubclass(field_type, self.__class__) or hasattr(field_type,
-                                                                 '_initiate'):
+        for structure, names in self.get_decode_plan():
+            if structure is None:
+                field_name, field_type = names
                 instance = field_type()
                 instance._initiate(stream)
                 setattr(self, field_name, instance)
-            elif issubclass(field_type, _SimpleCData):
-                field_format = field_type._type_
-                field_size = calcsize(field_format)
-                data_block, = unpack(field_format, stream.read(field_size))
-                setattr(self, field_name, data_block)
-            elif issubclass(field_type, _Pointer):
-                #: nothing to do, should be initialized in subclass
-                pass
             else:
-                raise TypeError("Wrong field type: `%r`" % type(field_type))
+                for field_name, value in zip(names, stream.unpack(structure)):
+                    setattr(self, field_name, value)
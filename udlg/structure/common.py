@@ -12,32 +12,42 @@ import ctypes
 from ctypes import (
     c_int32, c_uint32, c_void_p, c_ubyte, cast, pointer, POINTER
 )
-from struct import unpack, pack
+from struct import pack
+from time import perf_counter
 
 from .base import BinaryRecordStructure
 from .constants import (
     BinaryTypeEnum, PrimitiveTypeEnum, RecordTypeEnum,
     PrimitiveTypeCTypesConversionSet,
     AdditionalInfoTypeEnum,
-    UINT32_SIZE, BYTE_SIZE, INT32_SIZE
+    INT32_STRUCT, UINT32_STRUCT
 )
 from . import modules
-from .. utils import read_7bit_encoded_int_from_stream, write_7bit_int
+from .. utils import encode_7bit_int
 from .. import enums
 
 
 class LengthPrefixedString(BinaryRecordStructure):
     _fields_ = [
         ('size', ctypes.c_uint32),
+        #: amount of value changes (``set`` calls), takes padding space
+        #: before value
+        ('changes', ctypes.c_uint32),
         ('value', ctypes.c_char_p)
     ]
+    _exclude_ = ('changes', )
 
-    def to_bin(self):
+    def to_dict(self):
+        return {
+            'size': self.size,
+            'value': self.value
+        }
+
+    def _write_bin(self, write):
         document = bytearray()
-        size_string = write_7bit_int(self.size)
-        document.extend(pack('%is' % len(size_string), size_string))
+        encode_7bit_int(self.size, document)
         document.extend(pack('%is' % self.size, self.value))
-        return document
+        write(document)
 
     def set(self, value):
         if isinstance(value, str):
@@ -46,6 +56,15 @@ class LengthPrefixedString(BinaryRecordStructure):
         if self.value != value:
             self.value = ctypes.c_char_p(value)
             self.size = len(value)
+            self.changes += 1
+
+    @property
+    def dirty(self):
+        """
+        :rtype: bool
+        :return: True if value has been changed since string was decoded
+        """
+        return self.changes != 0
 
     def __repr__(self):
         if self.value:
@@ -87,13 +106,19 @@ class LengthPrefixedString(BinaryRecordStructure):
             Stream offset should be set up right on block that identifies
             as Serialization Header
 
-        :param stream: stream object, file stream for example
+        :param udlg.utils.reader.BinaryReader stream: reader
         :rtype: None
         :return: None
         """
-        size = read_7bit_encoded_int_from_stream(stream=stream)
+        profile = stream.profile
+        if profile is not None:
+            start, offset = perf_counter(), stream.offset
+        size = stream.read_7bit_int()
         self.size = size
         self.value = stream.read(size)
+        if profile is not None:
+            profile.strings.add(stream.offset - offset,
+                                perf_counter() - start)
 
 
 class PrimitiveValue(ctypes.Structure):
@@ -160,10 +185,10 @@ class ClassInfo(BinaryRecordStructure):
         return self._members_names
 
     def _initiate(self, stream):
-        self.object_id, = unpack('i', stream.read(INT32_SIZE))
+        self.object_id, = stream.unpack(INT32_STRUCT)
         self.name = LengthPrefixedString()
         self.name._initiate(stream)
-        self.members_count, = unpack('I', stream.read(UINT32_SIZE))
+        self.members_count, = stream.unpack(UINT32_STRUCT)
         member_names = []
         append = member_names.append
         for i in range(self.members_count):
@@ -194,17 +219,15 @@ class AdditionalInfo(BinaryRecordStructure):
     ]
     _exclude_ = ('type', )
 
-    def to_bin(self):
-        document = bytearray()
+    def _write_bin(self, write):
         if self.type == enums.AdditionalInfoTypeEnum.Null:
-            return document
-        # document.extend(pack('B', self.type))
+            return
+        # write(pack('B', self.type))
         if self.type in (enums.AdditionalInfoTypeEnum.PrimitiveTypeEnum,
                          enums.AdditionalInfoTypeEnum.PrimitiveArrayTypeEnum):
-            document.extend(pack('b', self.value))
+            write(pack('b', self.value))
         else:
-            document.extend(self.value.to_bin())
-        return document
+            self.value._write_bin(write)
 
     def to_dict(self):
         value = (
@@ -301,16 +324,20 @@ class MemberTypeInfo(BinaryRecordStructure):
         """
         initiate member type info information
 
-        :param stream: stream like object, file stream for example
+        :param udlg.utils.reader.BinaryReader stream: reader
         :param amount: amount of members should read from stream (this
             amount could be taken from ClassInfo instance)
         :rtype: None
         :return: None
         """
+        profile = stream.profile
+        if profile is not None:
+            start, offset = perf_counter(), stream.offset
         # types and additional info are
         self.count = amount
-        types = unpack('%ib' % amount, stream.read(amount))
-        self.types = (BinaryTypeEnum * amount)(*types)
+        self.types = (BinaryTypeEnum * amount).from_buffer_copy(
+            stream.read(amount)
+        )
         additional_infoes = []
         append = additional_infoes.append
 
@@ -318,12 +345,12 @@ class MemberTypeInfo(BinaryRecordStructure):
             bin_type = self.types[idx]
             entry = None
             if bin_type == enums.BinaryTypeEnum.Primitive:
-                entry, = unpack('b', stream.read(BYTE_SIZE))
+                entry = stream.read_byte()
                 additional_info = AdditionalInfo(
                     type=enums.AdditionalInfoTypeEnum.PrimitiveTypeEnum
                 )
             elif bin_type == enums.BinaryTypeEnum.PrimitiveArray:
-                entry, = unpack('b', stream.read(BYTE_SIZE))
+                entry = stream.read_byte()
                 additional_info = AdditionalInfo(
                     type=enums.AdditionalInfoTypeEnum.PrimitiveArrayTypeEnum
                 )
@@ -348,6 +375,9 @@ class MemberTypeInfo(BinaryRecordStructure):
         self.additional_info = (
             AdditionalInfo * len(additional_infoes)
         )(*additional_infoes)
+        if profile is not None:
+            profile.member_type_info.add(stream.offset - offset,
+                                         perf_counter() - start)
 
 
 class ObjectNull(BinaryRecordStructure):
@@ -384,10 +414,9 @@ class MemberEntry(ctypes.Structure):
                     self.member_ptr, POINTER(member_type * 1)
                 ).contents[0]
             elif record_type:
-                record_class = getattr(
-                    modules.RECORDS_MODULE,
-                    enums.RecordTypeEnum(record_type).name
-                )
+                record_class = modules.RECORDS_MODULE.RecordTypeSet[
+                    record_type
+                ]
                 self._member = cast(
                     self.member_ptr, POINTER(record_class)
                 ).contents
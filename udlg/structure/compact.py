@@ -0,0 +1,982 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.structure.compact
+    :synopsis: Compact record model, plain python ``__slots__`` classes
+        holding direct references instead of ctypes structures linked
+        with void pointers
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+from struct import pack, Struct
+from time import perf_counter
+
+import logging
+
+from .constants import (
+    INT32_STRUCT, UINT32_STRUCT, PrimitiveTypeConversionSet
+)
+from .layout import get_pack_segments
+from .records import CLASS_WITH_ID_STRUCT, BINARY_ARRAY_STRUCT
+from .registry import RecordRegistry
+from .strings import StringTable
+from .structure import HEADER_STRUCT, SIGNATURE_SIZE
+from .. import enums
+from ..utils import encode_7bit_int
+from ..utils.i18n import format_i18n_items, iter_i18n_items, write_i18n_items
+from ..utils.writer import get_writer
+
+logger = logging.getLogger('udlg')
+
+#: record_type
+BYTE_STRUCT = Struct('<B')
+#: record_type, object_id
+RECORD_ID_STRUCT = Struct('<Bi')
+#: record_type, object_id, length
+ARRAY_INFO_STRUCT = Struct('<BiI')
+
+
+def _to_dict(value):
+    if isinstance(value, list):
+        return [_to_dict(item) for item in value]
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    return value
+
+
+class CompactStructure(object):
+    """
+    Base class for compact structures, field values are stored as is
+    """
+    __slots__ = ()
+    #: field names, ``to_dict`` order
+    _fields_ = ()
+
+    def __repr__(self):
+        return '<%s at 0x%08x>' % (self.__class__.__name__, id(self))
+
+    def to_dict(self):
+        return dict(
+            (field_name, _to_dict(getattr(self, field_name)))
+            for field_name in self._fields_
+        )
+
+    def to_bin(self):
+        """
+        convert python to byte
+
+        :rtype: bytearray
+        :return: binary data
+        """
+        document = bytearray()
+        self._write_bin(document.extend)
+        return document
+
+    def write_to(self, sink):
+        """
+        write binary data right into sink
+
+        :param sink: ``bytearray`` (data is appended), file like object,
+            ``mmap.mmap`` or :class:`udlg.utils.writer.BufferWriter`
+        :rtype: None
+        :return: None
+        """
+        self._write_bin(get_writer(sink))
+
+    def _write_bin(self, write):
+        raise NotImplementedError("Yet not implemented")
+
+
+class LengthPrefixedString(CompactStructure):
+    __slots__ = ('size', 'value')
+    _fields_ = ('size', 'value')
+
+    def __init__(self, value=b''):
+        self.size = len(value)
+        self.value = value
+
+    def __repr__(self):
+        return "'%s'" % self.value
+
+    def __str__(self):
+        return self.value
+
+    def __eq__(self, other):
+        return self.value == other
+
+    def __ne__(self, other):
+        return self.value != other
+
+    def __len__(self):
+        return len(self.value)
+
+    def set(self, value):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        self.value = value
+        self.size = len(value)
+
+    def _initiate(self, stream):
+        profile = stream.profile
+        if profile is not None:
+            start, offset = perf_counter(), stream.offset
+        size = stream.read_7bit_int()
+        self.size = size
+        self.value = stream.read(size)
+        if profile is not None:
+            profile.strings.add(stream.offset - offset,
+                                perf_counter() - start)
+
+    def _write_bin(self, write):
+        document = bytearray()
+        encode_7bit_int(self.size, document)
+        document += self.value
+        write(document)
+
+
+class TableString(object):
+    """
+    Length prefixed string kept in document string table, it's created on
+    access and acts like :class:`LengthPrefixedString`
+    """
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        """
+        :param udlg.structure.strings.StringTable table: string table
+        :param int index: string index
+        """
+        self.table = table
+        self.index = index
+
+    @property
+    def size(self):
+        return self.table.get_size(self.index)
+
+    @property
+    def value(self):
+        return self.table[self.index]
+
+    def __repr__(self):
+        return "'%s'" % self.value
+
+    def __str__(self):
+        return self.value
+
+    def __eq__(self, other):
+        return self.value == other
+
+    def __ne__(self, other):
+        return self.value != other
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def dirty(self):
+        """
+        :rtype: bool
+        :return: True if string has been changed with ``set``
+        """
+        return self.index in self.table.changed
+
+    def set(self, value):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        self.table.set(self.index, value)
+
+    def to_dict(self):
+        return {'size': self.size, 'value': self.value}
+
+    def to_bin(self):
+        return self.table.to_bin(self.index)
+
+    def _write_bin(self, write):
+        write(self.table.to_bin(self.index))
+
+
+def read_string(stream):
+    """
+    read length prefixed string
+
+    :param udlg.utils.reader.BinaryReader stream: reader
+    :rtype: LengthPrefixedString
+    :return: string
+    """
+    string = LengthPrefixedString()
+    string._initiate(stream)
+    return string
+
+
+class ClassInfo(CompactStructure):
+    __slots__ = ('object_id', 'name', 'members_count', 'members_names')
+    _fields_ = __slots__
+
+    def _initiate(self, stream):
+        self.object_id, = stream.unpack(INT32_STRUCT)
+        self.name = read_string(stream)
+        self.members_count, = stream.unpack(UINT32_STRUCT)
+        self.members_names = [
+            read_string(stream) for _ in range(self.members_count)
+        ]
+
+    def _write_bin(self, write):
+        write(INT32_STRUCT.pack(self.object_id))
+        self.name._write_bin(write)
+        write(UINT32_STRUCT.pack(self.members_count))
+        for name in self.members_names:
+            name._write_bin(write)
+
+
+class ClassTypeInfo(CompactStructure):
+    __slots__ = ('type_name', 'library_id')
+    _fields_ = __slots__
+
+    def _initiate(self, stream):
+        self.type_name = read_string(stream)
+        self.library_id, = stream.unpack(UINT32_STRUCT)
+
+    def _write_bin(self, write):
+        self.type_name._write_bin(write)
+        write(UINT32_STRUCT.pack(self.library_id))
+
+
+class AdditionalInfo(CompactStructure):
+    """
+    Member additional info, ``type`` is
+    :class:`udlg.enums.AdditionalInfoTypeEnum` value
+    """
+    __slots__ = ('type', 'value')
+    _fields_ = __slots__
+
+    def __init__(self, type, value=None):
+        self.type = type
+        self.value = value
+
+    def _write_bin(self, write):
+        value = self.value
+        if value is None:
+            return
+        if isinstance(value, int):
+            write(BYTE_STRUCT.pack(value))
+        else:
+            value._write_bin(write)
+
+
+class MemberTypeInfo(CompactStructure):
+    __slots__ = ('types', 'additional_info')
+    _fields_ = __slots__
+
+    def to_dict(self):
+        return {
+            'types': list(self.types),
+            'additional_info': _to_dict(self.additional_info)
+        }
+
+    def _initiate(self, stream, amount=0):
+        """
+        :param udlg.utils.reader.BinaryReader stream: reader
+        :param int amount: amount of members
+        :rtype: None
+        :return: None
+        """
+        profile = stream.profile
+        if profile is not None:
+            start, offset = perf_counter(), stream.offset
+        BinaryType = enums.BinaryTypeEnum
+        AdditionalInfoType = enums.AdditionalInfoTypeEnum
+        self.types = types = stream.read(amount)
+        additional_info = []
+        append = additional_info.append
+        for binary_type in types:
+            if binary_type == BinaryType.Primitive:
+                append(AdditionalInfo(AdditionalInfoType.PrimitiveTypeEnum,
+                                      stream.read_byte()))
+            elif binary_type == BinaryType.PrimitiveArray:
+                append(AdditionalInfo(
+                    AdditionalInfoType.PrimitiveArrayTypeEnum,
+                    stream.read_byte()
+                ))
+            elif binary_type == BinaryType.Class:
+                class_type_info = ClassTypeInfo()
+                class_type_info._initiate(stream)
+                append(AdditionalInfo(AdditionalInfoType.ClassTypeInfo,
+                                      class_type_info))
+            elif binary_type == BinaryType.SystemClass:
+                append(AdditionalInfo(AdditionalInfoType.LengthPrefixedString,
+                                      read_string(stream)))
+            else:
+                append(AdditionalInfo(AdditionalInfoType.Null))
+        self.additional_info = additional_info
+        if profile is not None:
+            profile.member_type_info.add(stream.offset - offset,
+                                         perf_counter() - start)
+
+    def get_pack_segments(self):
+        """
+        get (shared) members pack segments
+
+        :rtype: tuple
+        :return: pack segments,
+            see :func:`udlg.structure.layout.get_pack_segments`
+        """
+        primitive = enums.BinaryTypeEnum.Primitive
+        primitive_types = bytes(
+            info.value if binary_type == primitive else 0
+            for binary_type, info in zip(self.types, self.additional_info)
+        )
+        return get_pack_segments(bytes(self.types), primitive_types)
+
+    def _write_bin(self, write):
+        write(self.types)
+        for additional_info in self.additional_info:
+            additional_info._write_bin(write)
+
+
+class SerializationHeader(CompactStructure):
+    __slots__ = ('record_type', 'root_id', 'header_id', 'major_version',
+                 'minor_version')
+    _fields_ = __slots__
+
+    def _initiate(self, stream):
+        (self.record_type, self.root_id, self.header_id, self.major_version,
+         self.minor_version) = stream.unpack(HEADER_STRUCT)
+
+    def _write_bin(self, write):
+        write(HEADER_STRUCT.pack(
+            self.record_type, self.root_id, self.header_id,
+            self.major_version, self.minor_version
+        ))
+
+
+class RecordStructure(CompactStructure):
+    """
+    Base class for record entries, records are initiated with object id
+    map (object_id: class record) for class references lookups
+    """
+    __slots__ = ()
+
+    def _initiate(self, stream, object_id_map):
+        """
+        initiate instance fields (construct) from stream
+
+        :param udlg.utils.reader.BinaryReader stream: reader set up right on
+            record type
+        :param ObjectIdMap object_id_map: object id map
+        :rtype: None
+        :return: None
+        """
+        raise NotImplementedError("Yet not implemented")
+
+
+class SingleByteRecord(RecordStructure):
+    __slots__ = ('record_type', )
+    _fields_ = __slots__
+
+    def _initiate(self, stream, object_id_map):
+        self.record_type = stream.read_byte()
+
+    def _write_bin(self, write):
+        write(BYTE_STRUCT.pack(self.record_type))
+
+
+class MessageEnd(SingleByteRecord):
+    __slots__ = ()
+
+
+class ObjectNull(SingleByteRecord):
+    __slots__ = ()
+
+
+class MemberReference(RecordStructure):
+    __slots__ = ('record_type', 'id_ref')
+    _fields_ = __slots__
+    STRUCT = Struct('<BI')
+
+    def _initiate(self, stream, object_id_map):
+        self.record_type, self.id_ref = stream.unpack(self.STRUCT)
+
+    def _write_bin(self, write):
+        write(self.STRUCT.pack(self.record_type, self.id_ref))
+
+
+class ObjectNullMultiple256(RecordStructure):
+    __slots__ = ('record_type', 'count')
+    _fields_ = __slots__
+    STRUCT = Struct('<BB')
+
+    def _initiate(self, stream, object_id_map):
+        self.record_type, self.count = stream.unpack(self.STRUCT)
+
+    def _write_bin(self, write):
+        write(self.STRUCT.pack(self.record_type, self.count))
+
+
+class ObjectNullMultiple(ObjectNullMultiple256):
+    __slots__ = ()
+    STRUCT = Struct('<Bi')
+
+
+class BinaryLibrary(RecordStructure):
+    __slots__ = ('record_type', 'library_id', 'library_name')
+    _fields_ = __slots__
+    STRUCT = Struct('<BI')
+
+    def _initiate(self, stream, object_id_map):
+        self.record_type, self.library_id = stream.unpack(self.STRUCT)
+        self.library_name = read_string(stream)
+
+    def _write_bin(self, write):
+        write(self.STRUCT.pack(self.record_type, self.library_id))
+        self.library_name._write_bin(write)
+
+
+class BinaryObjectString(RecordStructure):
+    """
+    String record, value is stored in document string table
+    """
+    __slots__ = ('record_type', 'object_id', 'strings', 'index')
+    _fields_ = ('record_type', 'object_id', 'value')
+
+    @property
+    def value(self):
+        """
+        :rtype: TableString
+        :return: string value
+        """
+        return TableString(self.strings, self.index)
+
+    def set(self, value):
+        """
+        set string value
+
+        :param str | bytes value: value to store
+        :rtype: None
+        :return: None
+        """
+        self.value.set(value)
+
+    def __str__(self):
+        return "'%s'" % (self.value.value or '')
+
+    def __repr__(self):
+        return str(self.__str__())
+
+    def __eq__(self, other):
+        return self.value.value == other
+
+    def __ne__(self, other):
+        return self.value.value != other
+
+    def __len__(self):
+        return len(self.value.value)
+
+    def _initiate(self, stream, object_id_map):
+        self.record_type, self.object_id = stream.unpack(RECORD_ID_STRUCT)
+        self.strings = object_id_map.strings
+        profile = stream.profile
+        if profile is not None:
+            start, offset = perf_counter(), stream.offset
+        self.index = self.strings.read(stream)
+        if profile is not None:
+            profile.strings.add(stream.offset - offset,
+                                perf_counter() - start)
+
+    def _write_bin(self, write):
+        write(RECORD_ID_STRUCT.pack(self.record_type, self.object_id))
+        write(self.strings.to_bin(self.index))
+
+
+class ArrayInfo(CompactStructure):
+    __slots__ = ('object_id', 'length')
+    _fields_ = __slots__
+
+    def __init__(self, object_id=0, length=0):
+        self.object_id = object_id
+        self.length = length
+
+
+class ArraySingleString(RecordStructure):
+    __slots__ = ('record_type', 'array_info')
+    _fields_ = __slots__
+
+    def _initiate(self, stream, object_id_map):
+        record_type, object_id, length = stream.unpack(ARRAY_INFO_STRUCT)
+        self.record_type = record_type
+        self.array_info = ArrayInfo(object_id, length)
+
+    def _write_bin(self, write):
+        array_info = self.array_info
+        write(ARRAY_INFO_STRUCT.pack(self.record_type, array_info.object_id,
+                                     array_info.length))
+
+
+class ArraySinglePrimitive(RecordStructure):
+    __slots__ = ('record_type', 'array_info', 'primitive_type', 'members')
+    _fields_ = __slots__
+
+    def _get_struct(self):
+        return Struct('<%i%s' % (
+            self.array_info.length,
+            PrimitiveTypeConversionSet[self.primitive_type]
+        ))
+
+    def get_member_list(self):
+        return self.members
+
+    def _initiate(self, stream, object_id_map):
+        record_type, object_id, length = stream.unpack(ARRAY_INFO_STRUCT)
+        self.record_type = record_type
+        self.array_info = ArrayInfo(object_id, length)
+        self.primitive_type = stream.read_byte()
+        if self.primitive_type == enums.PrimitiveTypeEnum.Char:
+            #: char elements are given as bytes, as ctypes model does
+            self.members = bytes(stream.read(length))
+        else:
+            self.members = list(stream.unpack(self._get_struct()))
+
+    def _write_bin(self, write):
+        array_info = self.array_info
+        write(ARRAY_INFO_STRUCT.pack(self.record_type, array_info.object_id,
+                                     array_info.length))
+        write(BYTE_STRUCT.pack(self.primitive_type))
+        if isinstance(self.members, bytes):
+            write(self.members)
+        else:
+            write(self._get_struct().pack(*self.members))
+
+
+class BinaryArray(RecordStructure):
+    """
+    Binary array, ``additional_type_info`` is primitive type, type name
+    (:class:`LengthPrefixedString`) or :class:`ClassTypeInfo` depending on
+    ``type``
+    """
+    __slots__ = ('record_type', 'object_id', 'binary_type', 'rank',
+                 'lengths', 'lower_bounds', 'type', 'additional_type_info')
+    _fields_ = __slots__
+
+    def _initiate(self, stream, object_id_map):
+        BinaryType = enums.BinaryTypeEnum
+        self.record_type = stream.read_byte()
+        self.object_id, self.binary_type, self.rank = stream.unpack(
+            BINARY_ARRAY_STRUCT
+        )
+        self.lengths = list(stream.unpack_format('<%iI' % self.rank))
+        self.lower_bounds = None
+        if self.binary_type in enums.BinaryArrayTypeEnum.get_lower_bounds():
+            self.lower_bounds = list(
+                stream.unpack_format('<%ii' % self.rank)
+            )
+        self.type = stream.read_byte()
+        if self.type in (BinaryType.Primitive, BinaryType.PrimitiveArray):
+            self.additional_type_info = stream.read_byte()
+        elif self.type == BinaryType.SystemClass:
+            self.additional_type_info = read_string(stream)
+        elif self.type == BinaryType.Class:
+            self.additional_type_info = ClassTypeInfo()
+            self.additional_type_info._initiate(stream)
+        else:
+            raise TypeError("Wrong binary array type: %i" % self.type)
+
+    def _write_bin(self, write):
+        write(BYTE_STRUCT.pack(self.record_type))
+        write(BINARY_ARRAY_STRUCT.pack(self.object_id, self.binary_type,
+                                       self.rank))
+        write(pack('<%iI' % self.rank, *self.lengths))
+        if self.lower_bounds is not None:
+            write(pack('<%ii' % self.rank, *self.lower_bounds))
+        write(BYTE_STRUCT.pack(self.type))
+        additional_type_info = self.additional_type_info
+        if isinstance(additional_type_info, int):
+            write(BYTE_STRUCT.pack(additional_type_info))
+        else:
+            additional_type_info._write_bin(write)
+
+
+class ClassWithMembersMixin(object):
+    """
+    Members are python list, primitive members are python values, the
+    rest are record entries
+    """
+    __slots__ = ()
+
+    def _initiate_members(self, stream, object_id_map, pack_segments):
+        """
+        :param udlg.utils.reader.BinaryReader stream: reader
+        :param ObjectIdMap object_id_map: object id map
+        :param tuple pack_segments: members pack segments
+        :rtype: None
+        :return: None
+        """
+        members = []
+        append, extend = members.append, members.extend
+        unpack = stream.unpack
+        profile = stream.profile
+        for structure, start, _ in pack_segments:
+            if structure is not None:
+                extend(unpack(structure))
+            elif profile is None:
+                append(read_entry(stream, object_id_map))
+            else:
+                started, offset = perf_counter(), stream.offset
+                entry = read_entry(stream, object_id_map)
+                append(entry)
+                profile.add_member(entry.record_type, stream.offset - offset,
+                                   perf_counter() - started)
+        self.members = members
+
+    def _write_members(self, write, pack_segments):
+        members = self.members
+        for structure, start, end in pack_segments:
+            if structure is None:
+                members[start]._write_bin(write)
+            else:
+                write(structure.pack(*members[start:end]))
+
+    def get_member_list(self):
+        return self.members
+
+    @property
+    def member_list(self):
+        return self.members
+
+
+class SystemClassWithMembersAndTypes(ClassWithMembersMixin,
+                                     RecordStructure):
+    __slots__ = ('record_type', 'class_info', 'member_type_info', 'members',
+                 'pack_segments')
+    _fields_ = ('record_type', 'class_info', 'member_type_info', 'members')
+
+    def __getstate__(self):
+        #: pack segments are shared and not picklable, they're taken again
+        #: on unpickling
+        return dict(
+            (name, getattr(self, name)) for name in self._fields_
+            if hasattr(self, name)
+        )
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.pack_segments = self.member_type_info.get_pack_segments()
+
+    def _initiate_class(self, stream):
+        self.record_type = stream.read_byte()
+        self.class_info = ClassInfo()
+        self.class_info._initiate(stream)
+        self.member_type_info = MemberTypeInfo()
+        self.member_type_info._initiate(
+            stream, amount=self.class_info.members_count
+        )
+
+    def _initiate(self, stream, object_id_map):
+        self._initiate_class(stream)
+        self.pack_segments = self.member_type_info.get_pack_segments()
+        object_id_map[self.class_info.object_id] = self
+        self._initiate_members(stream, object_id_map, self.pack_segments)
+
+    def _write_class(self, write):
+        write(BYTE_STRUCT.pack(self.record_type))
+        self.class_info._write_bin(write)
+        self.member_type_info._write_bin(write)
+
+    def _write_bin(self, write):
+        self._write_class(write)
+        self._write_members(write, self.pack_segments)
+
+
+class ClassWithMembersAndTypes(SystemClassWithMembersAndTypes):
+    __slots__ = ('library_id', )
+    _fields_ = ('record_type', 'class_info', 'member_type_info',
+                'library_id', 'members')
+
+    def _initiate(self, stream, object_id_map):
+        self._initiate_class(stream)
+        self.library_id, = stream.unpack(UINT32_STRUCT)
+        self.pack_segments = self.member_type_info.get_pack_segments()
+        object_id_map[self.class_info.object_id] = self
+        self._initiate_members(stream, object_id_map, self.pack_segments)
+
+    def _write_bin(self, write):
+        self._write_class(write)
+        write(UINT32_STRUCT.pack(self.library_id))
+        self._write_members(write, self.pack_segments)
+
+
+class ClassWithId(ClassWithMembersMixin, RecordStructure):
+    __slots__ = ('record_type', 'object_id', 'metadata_id', 'members',
+                 'class_reference')
+    _fields_ = ('record_type', 'object_id', 'metadata_id', 'members',
+                'class_reference_type', 'class_reference')
+
+    @property
+    def class_reference_type(self):
+        return self.class_reference.record_type
+
+    def get_class_reference(self):
+        return self.class_reference
+
+    def _initiate(self, stream, object_id_map):
+        self.record_type = stream.read_byte()
+        self.object_id, self.metadata_id = stream.unpack(
+            CLASS_WITH_ID_STRUCT
+        )
+        self.class_reference = object_id_map[self.metadata_id]
+        self._initiate_members(stream, object_id_map,
+                               self.class_reference.pack_segments)
+
+    def _write_bin(self, write):
+        write(BYTE_STRUCT.pack(self.record_type))
+        write(CLASS_WITH_ID_STRUCT.pack(self.object_id, self.metadata_id))
+        self._write_members(write, self.class_reference.pack_segments)
+
+
+class ObjectIdMap(dict):
+    """
+    Object id map, object_id: class record, it also keeps string table
+    document strings are read into
+    """
+    def __init__(self, strings=None):
+        """
+        :param udlg.structure.strings.StringTable strings: string table
+        """
+        super(ObjectIdMap, self).__init__()
+        self.strings = strings if strings is not None else StringTable()
+
+
+#: record type: record entry class
+RecordTypeSet = RecordRegistry({
+    enums.RecordTypeEnum.ClassWithId: ClassWithId,
+    enums.RecordTypeEnum.SystemClassWithMembersAndTypes: (
+        SystemClassWithMembersAndTypes
+    ),
+    enums.RecordTypeEnum.ClassWithMembersAndTypes: ClassWithMembersAndTypes,
+    enums.RecordTypeEnum.BinaryObjectString: BinaryObjectString,
+    enums.RecordTypeEnum.BinaryArray: BinaryArray,
+    enums.RecordTypeEnum.MemberReference: MemberReference,
+    enums.RecordTypeEnum.ObjectNull: ObjectNull,
+    enums.RecordTypeEnum.MessageEnd: MessageEnd,
+    enums.RecordTypeEnum.BinaryLibrary: BinaryLibrary,
+    enums.RecordTypeEnum.ObjectNullMultiple256: ObjectNullMultiple256,
+    enums.RecordTypeEnum.ObjectNullMultiple: ObjectNullMultiple,
+    enums.RecordTypeEnum.ArraySinglePrimitive: ArraySinglePrimitive,
+    enums.RecordTypeEnum.ArraySingleString: ArraySingleString,
+})
+
+
+def read_entry(stream, object_id_map):
+    """
+    read record entry at reader offset
+
+    :param udlg.utils.reader.BinaryReader stream: reader
+    :param ObjectIdMap object_id_map: object id map
+    :rtype: RecordStructure
+    :return: record entry
+    :raises NotImplementedError:
+        - if record type is not supported
+    """
+    entry = RecordTypeSet[stream.peek_byte()]()
+    entry._initiate(stream, object_id_map)
+    return entry
+
+
+class Record(CompactStructure):
+    __slots__ = ('record_type', 'entry')
+    _fields_ = __slots__
+
+    def __init__(self, record_type=0, entry=None):
+        self.record_type = record_type
+        self.entry = entry
+
+    def __repr__(self):
+        if self.entry is not None:
+            return repr(self.entry)
+        return '<Record: at 0x%16x>' % id(self)
+
+    @property
+    def members(self):
+        return getattr(self.entry, 'members', [])
+
+    def _initiate(self, stream, object_id_map):
+        """
+        :param udlg.utils.reader.BinaryReader stream: reader
+        :param ObjectIdMap object_id_map: object id map
+        :rtype: None
+        :return: None
+        """
+        profile = stream.profile
+        if profile is not None:
+            start, offset = perf_counter(), stream.offset
+        self.record_type = stream.peek_byte()
+        self.entry = read_entry(stream, object_id_map)
+        if profile is not None:
+            profile.add_record(self.record_type, stream.offset - offset,
+                               perf_counter() - start)
+
+    def _write_bin(self, write):
+        self.entry._write_bin(write)
+
+
+class BinaryDataStructureFile(CompactStructure):
+    """
+    Compact counterpart of
+    :class:`udlg.structure.structure.BinaryDataStructureFile`
+    """
+    __slots__ = ('header', 'records', 'strings', 'splice_writer', 'profile')
+    _fields_ = ('header', 'records', 'count')
+
+    #: records are always decoded
+    lazy = False
+
+    def __init__(self):
+        self.header = SerializationHeader()
+        self.records = []
+        #: values of all BinaryObjectString records
+        self.strings = StringTable()
+        #: :class:`udlg.structure.splice.SpliceWriter` if source data is
+        #: kept
+        self.splice_writer = None
+        #: :class:`udlg.profile.Profile` if document is built with
+        #: ``profile`` option
+        self.profile = None
+
+    @property
+    def count(self):
+        return len(self.records)
+
+    def get_record_list(self):
+        return self.records
+
+    def to_bin(self, splice=False):
+        """
+        convert document to bytes
+
+        :param bool splice: splice mode, see
+            :meth:`udlg.structure.structure.BinaryDataStructureFile.to_bin`
+        :rtype: bytearray
+        :return: binary data
+        :raises ValueError:
+            - if splice mode is used, but document has no source data
+        """
+        document = bytearray()
+        self._write_bin(document.extend, splice=splice)
+        return document
+
+    def write_to(self, sink, splice=False):
+        self._write_bin(get_writer(sink), splice=splice)
+
+    def _write_bin(self, write, splice=False):
+        if splice:
+            writer = self.splice_writer
+            if writer is None:
+                raise ValueError(
+                    "Document has no source data, build it with "
+                    "`keep_source` option to use splice mode"
+                )
+            writer.write_changes(writer.iter_changes(self.records), write)
+            return
+        self.header._write_bin(write)
+        for record in self.records:
+            record.entry._write_bin(write)
+
+
+class UDLGHeader(CompactStructure):
+    __slots__ = ('signature', )
+    _fields_ = __slots__
+
+    def _write_bin(self, write):
+        write(self.signature)
+
+
+class UDLGFile(CompactStructure):
+    """
+    Compact counterpart of :class:`udlg.structure.structure.UDLGFile`
+    """
+    __slots__ = ('header', 'data')
+    _fields_ = __slots__
+
+    def __init__(self):
+        self.header = UDLGHeader()
+        self.data = None
+
+    @property
+    def records(self):
+        return self.data.records
+
+    @property
+    def strings(self):
+        """
+        :rtype: udlg.structure.strings.StringTable
+        :return: document string table
+        """
+        return self.data.strings
+
+    @property
+    def profile(self):
+        return self.data.profile
+
+    def _initiate(self, stream):
+        self.header.signature = stream.read(SIGNATURE_SIZE)
+
+    def to_bin(self, splice=False):
+        document = bytearray()
+        self._write_bin(document.extend, splice=splice)
+        return document
+
+    def write_to(self, sink, splice=False):
+        self._write_bin(get_writer(sink), splice=splice)
+
+    def _write_bin(self, write, splice=False):
+        self.header._write_bin(write)
+        self.data._write_bin(write, splice=splice)
+
+    def unpack_i18n(self, sink=None):
+        """
+        unpacks i18n strings, if sink is given they're written into it in
+        escaped format chunk by chunk (see
+        :class:`udlg.utils.i18n.I18nWriter`), legacy i18n block is returned
+        otherwise
+
+        :param sink: ``bytearray`` (data is appended) or file like object,
+            optional
+        :rtype: bytes | int
+        :return: i18n strings with \n sign separated, entries written if
+            sink is given
+        """
+        if sink is not None:
+            return write_i18n_items(self.iter_strings(), sink)
+        return format_i18n_items(self.iter_strings())
+
+    def iter_strings(self):
+        """
+        iterate over string members of records
+
+        :rtype: collections.Iterable[tuple[int, int, bytes]]
+        :return: (record index, member index, string) iterator
+        """
+        for idx, record in enumerate(self.data.records):
+            for jdx, member in enumerate(record.members):
+                if isinstance(member, BinaryObjectString):
+                    yield idx, jdx, member.value.value
+
+    def load_i18n(self, block, cache=False):
+        """
+        load i18n block, entries are applied as they're read
+
+        :param block: block to process (bytes) or binary file like object
+        :param bool cache: not used, compact records are not cached
+        :rtype: None
+        :return: None
+        """
+        records = self.data.records
+        for record_id, member_id, locale in iter_i18n_items(block):
+            entry = records[record_id].members[member_id]
+            if not isinstance(entry, BinaryObjectString):
+                logger.warning(
+                    "Entry with id: (%i, %i) skipped, as original "
+                    "file has no proper content type with it",
+                    record_id, member_id
+                )
+                continue
+            entry.set(locale)
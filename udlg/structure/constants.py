@@ -7,6 +7,7 @@
 .. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 """
 
+from struct import Struct
 from ctypes import (
     c_byte, c_ubyte, c_float, c_double, c_int16, c_int32, c_int64,
     c_uint16, c_uint32, c_uint64, c_bool, c_char
@@ -31,6 +32,11 @@ INT32_SIZE = 4
 UINT32_SIZE = 4
 UINT64_SIZE = 8
 
+#: precompiled (little endian) formats
+BYTE_STRUCT = Struct('<b')
+INT32_STRUCT = Struct('<i')
+UINT32_STRUCT = Struct('<I')
+
 #: conversions
 #: key -> function handling primitive type
 PrimitiveTypeConversionSet = {
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.structure.layout
+    :synopsis: Class member layouts, precomputed member decoders shared by
+        all records of the same class
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+from ctypes import Structure, POINTER, cast, sizeof
+from struct import Struct
+
+from .common import MemberEntry
+from .constants import (
+    PrimitiveTypeCTypesConversionSet, PrimitiveTypeConversionSet
+)
+from .. import enums
+
+#: member entry pointer (native, MemberEntry is native structure)
+MEMBER_POINTER_STRUCT = Struct('P')
+#: member entry pointer offset
+MEMBER_POINTER_OFFSET = MemberEntry.member_ptr.offset
+#: member entry types offsets
+MEMBER_BINARY_TYPE_OFFSET = MemberEntry.binary_type.offset
+MEMBER_PRIMITIVE_TYPE_OFFSET = MemberEntry.primitive_type.offset
+#: member entry size
+MEMBER_ENTRY_SIZE = sizeof(MemberEntry)
+
+#: tuple of primitive types: packed structure type
+_primitive_run_types = {}
+#: (binary types, primitive types) bytes: pack segments
+_pack_segments = {}
+#: (binary types, primitive types) bytes: class layout, classes of
+#: different documents (and different classes) with the same members share
+#: layout
+_class_layouts = {}
+
+
+def get_primitive_run_type(primitive_types):
+    """
+    get packed structure type for run of primitive members stored one
+    right after another, types are cached as they are immutable
+
+    :param tuple[int] primitive_types: primitive types
+    :rtype: type
+    :return: packed ctypes structure type with ``m<index>`` fields
+    """
+    run_type = _primitive_run_types.get(primitive_types)
+    if run_type is None:
+        fields = [
+            ('m%i' % index, PrimitiveTypeCTypesConversionSet[primitive_type])
+            for index, primitive_type in enumerate(primitive_types)
+        ]
+        run_type = type('PrimitiveRun', (Structure, ), {
+            '_pack_': 1, '_fields_': fields
+        })
+        _primitive_run_types[primitive_types] = run_type
+    return run_type
+
+
+def get_pack_segments(binary_types, primitive_types):
+    """
+    get members pack segments, consecutive primitive members are packed
+    (and unpacked) with one precompiled structure. Segments are plain
+    :class:`struct.Struct` ones, so no ctypes types are built for them.
+
+    :param bytes binary_types: members binary types
+    :param bytes primitive_types: members primitive types, zero for non
+        primitive members
+    :rtype: tuple
+    :return: (struct, first member index, end member index) for primitive
+        runs or (None, member index, None) for the rest
+    """
+    key = (binary_types, primitive_types)
+    pack_segments = _pack_segments.get(key)
+    if pack_segments is not None:
+        return pack_segments
+
+    primitive = enums.BinaryTypeEnum.Primitive
+    pack_segments = []
+    run = []
+
+    def close_run():
+        if run:
+            pack_segments.append((
+                Struct('<' + ''.join(
+                    PrimitiveTypeConversionSet[primitive_types[index]]
+                    for index in run
+                )),
+                run[0], run[-1] + 1
+            ))
+            del run[:]
+
+    for index, binary_type in enumerate(binary_types):
+        if binary_type == primitive:
+            run.append(index)
+        else:
+            close_run()
+            pack_segments.append((None, index, None))
+    close_run()
+    pack_segments = tuple(pack_segments)
+    _pack_segments[key] = pack_segments
+    return pack_segments
+
+
+class ClassLayout(object):
+    """
+    Members decoder (and encoder) compiled once per class definition.
+    Consecutive primitive members are read with one packed structure,
+    member entries array is copied from prebuilt template, so only pointers
+    are left to be filled up per record. Consecutive primitive members are
+    written with one precompiled structure.
+    """
+    __slots__ = ('members_count', 'array_type', 'template', 'segments',
+                 'pack_segments')
+
+    def __init__(self, binary_types, primitive_types):
+        """
+        :param list[int] binary_types: members binary types
+        :param list[int] primitive_types: members primitive types, only
+            ones of primitive members are significant
+        """
+        primitive = enums.BinaryTypeEnum.Primitive
+        members_count = len(binary_types)
+        self.members_count = members_count
+        self.array_type = MemberEntry * members_count
+        template = self.array_type()
+        #: (run type, run size, ((entry pointer offset, field offset), ...))
+        #: for primitive runs or (None, member index, None) for records
+        segments = []
+        run = []
+
+        def close_run():
+            if not run:
+                return
+            run_primitive_types = tuple(
+                primitive_types[index] for index in run
+            )
+            run_type = get_primitive_run_type(run_primitive_types)
+            slots = tuple(
+                (index * MEMBER_ENTRY_SIZE + MEMBER_POINTER_OFFSET,
+                 getattr(run_type, 'm%i' % position).offset)
+                for position, index in enumerate(run)
+            )
+            segments.append((run_type, sizeof(run_type), slots))
+            del run[:]
+
+        for index in range(members_count):
+            if binary_types[index] == primitive:
+                template[index].primitive_type = primitive_types[index]
+                run.append(index)
+            else:
+                close_run()
+                template[index].binary_type = binary_types[index]
+                segments.append((None, index, None))
+        close_run()
+        self.template = bytes(bytearray(template))
+        self.segments = tuple(segments)
+        #: (struct, first member index, end member index) for primitive
+        #: runs or (None, member index, None) for records
+        self.pack_segments = get_pack_segments(
+            bytes(binary_types),
+            bytes(template[index].primitive_type
+                  for index in range(members_count))
+        )
+
+    @classmethod
+    def get_layout(cls, binary_types, primitive_types):
+        """
+        get layout for members types, layouts are shared
+
+        :param bytes binary_types: members binary types
+        :param bytes primitive_types: members primitive types, zero for non
+            primitive members
+        :rtype: ClassLayout
+        :return: layout
+        """
+        key = (binary_types, primitive_types)
+        layout = _class_layouts.get(key)
+        if layout is None:
+            layout = cls(binary_types, primitive_types)
+            _class_layouts[key] = layout
+        return layout
+
+    @classmethod
+    def from_class(cls, class_record):
+        """
+        build layout for class definition record
+
+        :param udlg.structure.records.ClassWithMembersAndTypes class_record:
+            class definition record
+        :rtype: ClassLayout
+        :return: layout
+        """
+        members_count = class_record.class_info.members_count
+        member_type_info = class_record.member_type_info
+        binary_types = bytes(member_type_info.types[:members_count])
+        additional_info = member_type_info.additional_info
+        primitive = enums.BinaryTypeEnum.Primitive
+        primitive_types = bytes(
+            additional_info[index].value if binary_type == primitive else 0
+            for index, binary_type in enumerate(binary_types)
+        )
+        return cls.get_layout(binary_types, primitive_types)
+
+    @classmethod
+    def from_entries(cls, entries, members_count):
+        """
+        get layout for member entries, types are taken from entries
+        themselves, so no class definition is needed
+
+        :param entries: member entries array or pointer to it
+        :param int members_count: members count
+        :rtype: ClassLayout
+        :return: layout
+        """
+        array = cast(entries, POINTER(MemberEntry * members_count)).contents
+        view = memoryview(array).cast('B')
+        try:
+            return cls.get_layout(
+                bytes(view[MEMBER_BINARY_TYPE_OFFSET::MEMBER_ENTRY_SIZE]),
+                bytes(view[MEMBER_PRIMITIVE_TYPE_OFFSET::MEMBER_ENTRY_SIZE])
+            )
+        finally:
+            view.release()
+
+
+class ClassDefinition(object):
+    """
+    Class definition resolved once per class record: record itself, its
+    pointer, members layout (decode plan with primitive runs and record
+    members split) and members names. Records with class id take it with
+    single object id map lookup.
+    """
+    __slots__ = ('record_type', 'record', 'pointer', 'layout', '_names')
+
+    def __init__(self, record, layout):
+        """
+        :param record: class definition record, for example
+            :class:`udlg.structure.records.ClassWithMembersAndTypes`
+        :param ClassLayout layout: members layout
+        """
+        self.record_type = record.record_type
+        self.record = record
+        #: void pointer keeps record alive
+        self.pointer = record.get_void_ptr()
+        self.layout = layout
+        self._names = None
+
+    def __repr__(self):
+        return '<%s at 0x%08x, members: %i>' % (
+            self.__class__.__name__, id(self), self.layout.members_count
+        )
+
+    @property
+    def names(self):
+        """
+        :rtype: tuple[bytes]
+        :return: members names, they're taken once on first access
+        """
+        if self._names is None:
+            self._names = tuple(
+                name.value for name in self.record.class_info.members_names
+            )
+        return self._names
+
+
+class ObjectIdMap(dict):
+    """
+    Object id map, object_id: (record type, record pointer), it also keeps
+    class layouts and definitions of class records found in document
+    """
+    def __init__(self, *args, **kwargs):
+        super(ObjectIdMap, self).__init__(*args, **kwargs)
+        #: class object_id: layout
+        self.layouts = {}
+        #: class object_id: class definition
+        self.classes = {}
+
+    def add_class(self, record):
+        """
+        register class definition record, it should be initiated up to
+        members (class info and member type info are read)
+
+        :param record: class definition record
+        :rtype: ClassDefinition
+        :return: class definition
+        """
+        object_id = record.class_info.object_id
+        layout = self.layouts.get(object_id)
+        if layout is None:
+            layout = ClassLayout.from_class(record)
+            self.layouts[object_id] = layout
+        definition = ClassDefinition(record, layout)
+        self.classes[object_id] = definition
+        self[object_id] = (definition.record_type, definition.pointer)
+        return definition
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.structure.lazy
+    :synopsis: Lazy (on demand) record materialization backed by offset
+        index
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+from . import records
+from .layout import ObjectIdMap
+from .structure import Record
+
+
+class LazyClassMap(dict):
+    """
+    Class object_id: class definition map, definitions are decoded on first
+    lookup
+    """
+    def __init__(self, object_id_map):
+        """
+        :param LazyObjectIdMap object_id_map: object id map definitions
+            are decoded by
+        """
+        super(LazyClassMap, self).__init__()
+        self.object_id_map = object_id_map
+
+    def __missing__(self, object_id):
+        #: class record registers its definition while it's decoded
+        self.object_id_map.decode(object_id)
+        return self[object_id]
+
+
+class LazyObjectIdMap(ObjectIdMap):
+    """
+    Object id map which decodes class definitions on first lookup
+    """
+    def __init__(self, reader, definitions):
+        """
+        :param udlg.utils.reader.BinaryReader reader: reader
+        :param dict definitions: object_id: class definition record offset
+        """
+        super(LazyObjectIdMap, self).__init__()
+        self.reader = reader
+        self.definitions = definitions
+        self.classes = LazyClassMap(self)
+
+    def __missing__(self, object_id):
+        self.decode(object_id)
+        return self[object_id]
+
+    def decode(self, object_id):
+        """
+        decode class definition record
+
+        :param int object_id: class object id
+        :rtype: None
+        :return: None
+        :raises KeyError:
+            - if there's no class definition with given id
+        """
+        reader = self.reader
+        offset = reader.offset
+        reader.seek(self.definitions[object_id])
+        try:
+            entry = records.RecordTypeSet[reader.peek_byte()]()
+            entry._object_id_map = self
+            entry._initiate(reader)
+        finally:
+            reader.seek(offset)
+        if object_id not in self:
+            self[object_id] = (entry.record_type, entry.get_void_ptr())
+
+
+class LazyRecordList(object):
+    """
+    Sequence of top level records, each record is decoded on first access
+    and cached
+    """
+    def __init__(self, reader, offsets, types, object_id_map):
+        """
+        :param udlg.utils.reader.BinaryReader reader: reader (it should own
+            data it reads)
+        :param array.array offsets: records offsets, with extra one pointing
+            right after the last record
+        :param bytearray types: records types
+        :param LazyObjectIdMap object_id_map: object id map
+        """
+        self.reader = reader
+        self.offsets = offsets
+        self.types = types
+        self.object_id_map = object_id_map
+        self._records = [None] * len(types)
+
+    def __repr__(self):
+        return '<%s at 0x%08x, records: %i, decoded: %i>' % (
+            self.__class__.__name__, id(self), len(self),
+            len(self._records) - self._records.count(None)
+        )
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        for index in range(len(self._records)):
+            yield self[index]
+
+    def iter_transient(self):
+        """
+        iterate over records, the ones have not been decoded yet are decoded
+        but not cached, so records visited once (export) do not pile up in
+        memory
+
+        :rtype: collections.Iterable[udlg.structure.structure.Record]
+        :return: records iterator
+        """
+        records = self._records
+        for index in range(len(records)):
+            record = records[index]
+            yield record if record is not None else self._decode(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        record = self._records[index]
+        if record is None:
+            if index < 0:
+                index += len(self._records)
+            record = self._decode(index)
+            self._records[index] = record
+        return record
+
+    def _decode(self, index):
+        reader = self.reader
+        reader.seek(self.offsets[index])
+        record = Record()
+        record._object_id_map = self.object_id_map
+        record._initiate(stream=reader, object_id_map=self.object_id_map)
+        return record
+
+    def get_record_type(self, index):
+        """
+        get record type without record decoding
+
+        :param int index: record index
+        :rtype: int
+        :return: record type
+        """
+        return self.types[index]
+
+    def is_decoded(self, index):
+        """
+        :param int index: record index
+        :rtype: bool
+        :return: True if record has been already decoded
+        """
+        return self._records[index] is not None
+
+    def to_bin(self, bin_cache=None):
+        """
+        convert records to bytes, records have not been decoded are copied
+        from source data as is
+
+        :param udlg.structure.structure.RecordBinCache bin_cache: serialized
+            records cache for decoded records, optional
+        :rtype: bytearray
+        :return: binary data
+        """
+        document = bytearray()
+        self._write_bin(document.extend, bin_cache=bin_cache)
+        return document
+
+    def _write_bin(self, write, bin_cache=None):
+        buffer = self.reader.buffer
+        offsets = self.offsets
+        for index, record in enumerate(self._records):
+            if record is None:
+                write(buffer[offsets[index]:offsets[index + 1]])
+            elif bin_cache is not None:
+                write(bin_cache.get_bin(index, record))
+            else:
+                record._write_bin(write)
+
+    def to_dict(self):
+        return [record.to_dict() for record in self]
+
+    def close(self):
+        """
+        release source data
+
+        :rtype: None
+        :return: None
+        """
+        self.reader.close()
@@ -28,28 +28,36 @@
 
 from __future__ import unicode_literals
 
-from struct import unpack, pack, calcsize
+from struct import pack, Struct
+from time import perf_counter
 from ctypes import (
-    c_int32, c_ubyte, c_uint32, c_void_p, cast, pointer,
-    POINTER
+    c_int32, c_ubyte, c_uint32, c_void_p, addressof, cast, pointer,
+    py_object, string_at, POINTER
 )
 
 from .base import BinaryRecordStructure
 from .constants import (
     RecordTypeEnum, PrimitiveTypeEnum, BinaryTypeEnum, BinaryArrayTypeEnum,
-    BYTE_SIZE, UINT32_SIZE, INT32_SIZE,
+    UINT32_STRUCT,
     PrimitiveTypeCTypesConversionSet, PrimitiveTypeConversionSet,
 )
 from .common import (
     LengthPrefixedString, ClassInfo, MemberTypeInfo, MemberEntry, ArrayInfo,
     AdditionalTypeInfo, ClassTypeInfo
 )
+from .layout import ClassLayout, MEMBER_POINTER_STRUCT
+from .registry import RecordRegistry
 from .utils import (
     read_record_type,
     read_primitive_type_from_stream,
-    make_primitive_type_elements_array_pointer)
+    read_primitive_type_array_from_stream)
 from .. import enums
 
+#: object_id, metadata_id
+CLASS_WITH_ID_STRUCT = Struct('<2i')
+#: object_id, binary_type, rank
+BINARY_ARRAY_STRUCT = Struct('<iBI')
+
 
 class MessageEnd(BinaryRecordStructure):
     _fields_ = [
@@ -119,19 +127,20 @@ class SystemClassWithMembersAndTypes(BinaryRecordStructure):
     ]
 
     def _initiate(self, stream):
-        self.record_type, = unpack('b', stream.read(BYTE_SIZE))
+        self.record_type = stream.read_byte()
         self.class_info = ClassInfo()
         self.class_info._initiate(stream)
         members_count = self.class_info.members_count
         self.member_type_info = MemberTypeInfo()
         self.member_type_info._initiate(stream, amount=members_count)
+        self._object_id_map.add_class(self)
         self._initiate_members_data(stream)
 
     def _initiate_members_data(self, stream):
         """
         initiate member data that should follow right after header
 
-        :param stream: stream like object, file stream for example
+        :param udlg.utils.reader.BinaryReader stream: reader
         :rtype: None
         :return: None
         """
@@ -212,6 +221,9 @@ class SystemClassWithMembersAndTypes(BinaryRecordStructure):
     def members(self):
         return self.get_member_list()
 
+    def _write_members(self, write):
+        ClassWithMembersMixin._write_members(self, write)
+
 
 class ArraySingleString(BinaryRecordStructure):
     _fields_ = [
@@ -229,21 +241,15 @@ class ArraySinglePrimitive(BinaryRecordStructure):
     ]
 
     def _initiate(self, stream):
-        self.record_type, = unpack('b', stream.read(BYTE_SIZE))
+        self.record_type = stream.read_byte()
         self.array_info = ArrayInfo()
         self.array_info._initiate(stream)
-        self.primitive_type, = unpack('b', stream.read(BYTE_SIZE))
-        elements = []
-        append = elements.append
-        for i in range(self.array_info.length):
-            value = read_primitive_type_from_stream(
-                stream, self.primitive_type
-            )
-            append(value)
-        members_array_pointer = make_primitive_type_elements_array_pointer(
-            self.primitive_type, elements
+        self.primitive_type = stream.read_byte()
+        elements = read_primitive_type_array_from_stream(
+            stream, self.primitive_type, self.array_info.length
         )
-        self.members_ptr = members_array_pointer
+        self._ctype_elements = elements
+        self.members_ptr = cast(elements, c_void_p)
 
     def get_ctype_member_elements(self):
         """
@@ -259,17 +265,43 @@ class ArraySinglePrimitive(BinaryRecordStructure):
             ).contents
         return self._ctype_elements
 
+    def get_member_view(self):
+        """
+        get zero-copy view on member elements
+
+        :rtype: memoryview
+        :return: member elements view, for example with format ``d`` for
+            double elements
+        """
+        elements = self.get_ctype_member_elements()
+        return memoryview(elements).cast('B').cast(
+            PrimitiveTypeConversionSet[self.primitive_type]
+        )
+
     def get_member_list(self):
         """
-        get member list in python format
+        get member list in python format, it's a copy of member elements
+        made on every call, see :meth:`get_member_view` for zero-copy
+        access
 
-        :rtype: list
-        :return: member list
+        :rtype: list | bytes
+        :return: member list, bytes for char elements
         """
-        if not hasattr(self, '_members'):
-            elements = self.get_ctype_member_elements()
-            self._members = elements[:]
-        return self._members
+        view = self.get_member_view()
+        if self.primitive_type == enums.PrimitiveTypeEnum.Char:
+            return view.tobytes()
+        return view.tolist()
+
+    @property
+    def members(self):
+        return self.get_member_list()
+
+    def _write_bin(self, write):
+        write(pack('<B', self.record_type))
+        self.array_info._write_bin(write)
+        write(pack('<B', self.primitive_type))
+        #: elements are stored in little endian already
+        write(self.get_member_view().cast('B'))
 
 
 class ArraySingleObject(BinaryRecordStructure):
@@ -314,63 +346,119 @@ class ClassWithMembersMixin(object):
     def member_list(self):
         return self.get_member_list()
 
-    def _initiate_members(self, stream, class_reference=None):
+    def get_layout(self):
+        """
+        get members layout record is read with
+
+        :rtype: udlg.structure.layout.ClassLayout | None
+        :return: members layout, None if members are not read with it
+        """
+        try:
+            return self.layout_ptr
+        except (AttributeError, ValueError):
+            #: no layout field or PyObject is NULL
+            return None
+
+    @property
+    def layout(self):
+        return ClassWithMembersMixin.get_layout(self)
+
+    def _write_members(self, write):
+        """
+        write members, consecutive primitive members are written at once
+
+        :param callable write: write function, takes bytes like object
+        :rtype: None
+        :return: None
+        """
+        entries = self.members_ptr
+        layout = ClassWithMembersMixin.get_layout(self)
+        if layout is None:
+            #: members are not read with layout, pack their values
+            members = self.get_member_list()
+            layout = ClassLayout.from_entries(entries, len(members))
+            for structure, start, end in layout.pack_segments:
+                if structure is None:
+                    members[start]._write_bin(write)
+                else:
+                    write(structure.pack(*members[start:end]))
+            return
+
+        for structure, start, end in layout.pack_segments:
+            if structure is None:
+                entries[start].member._write_bin(write)
+            else:
+                #: primitive run is kept as read (little endian packed),
+                #: its first member points to the run beginning
+                write(string_at(entries[start].member_ptr, structure.size))
+
+    def get_class_layout(self, class_reference=None):
+        """
+        get members layout of class, layout is compiled once per class
+        definition and stored in object id map
+
+        :param ClassWithMembersAndTypes class_reference: class reference
+        :rtype: udlg.structure.layout.ClassLayout
+        :return: class layout
+        """
+        class_reference = class_reference or self
+        layouts = getattr(self._object_id_map, 'layouts', None)
+        if layouts is None:
+            return ClassLayout.from_class(class_reference)
+        object_id = class_reference.class_info.object_id
+        layout = layouts.get(object_id)
+        if layout is None:
+            layout = ClassLayout.from_class(class_reference)
+            layouts[object_id] = layout
+        return layout
+
+    def _initiate_members(self, stream, class_reference=None, layout=None):
         """
         initiate members
 
         :param ClassWithMembersAndTypes class_reference: class reference
-        :param stream: stream like object, file stream for example
+        :param udlg.utils.reader.BinaryReader stream: reader
+        :param udlg.structure.layout.ClassLayout layout: members layout,
+            it's taken for class reference if not given
         :return: None
         """
-        class_reference = class_reference or self
-        class_info = class_reference.class_info
-        member_type_info = class_reference.member_type_info
-        members_count = class_info.members_count
-        members = []
-        append = members.append
-        binary_types = member_type_info.types
-        additional_infoes = member_type_info.additional_info
-
-        for i in range(class_reference.class_info.members_count):
-            binary_type = binary_types[i]
-            additional_info = additional_infoes[i]
-
-            if binary_type == enums.BinaryTypeEnum.Primitive:
-                member_entry = MemberEntry(
-                    type=binary_type, primitive_type=additional_info.value
-                )
-                entry_ctype = PrimitiveTypeCTypesConversionSet[
-                    additional_info.value
-                ]
-                primitive_type_format = PrimitiveTypeConversionSet[
-                    enums.PrimitiveTypeEnum(additional_info.value)
-                ]
-                primitive_type_size = calcsize(primitive_type_format)
-                value, = unpack(primitive_type_format,
-                                stream.read(primitive_type_size))
-                array_size = 1
-                value_array = (entry_ctype * array_size)(*(value, ))
-                member_entry.member_ptr = cast(pointer(value_array), c_void_p)
-            else:
-                record_type = read_record_type(stream)
-                member_record_class = globals()[
-                    enums.RecordTypeEnum(record_type).name
-                ]
-                member_record = member_record_class()
-                self._update_object_id_map(member_record)
-                #: store reference link to reference map
-                if isinstance(member_record, MemberReference):
-                    self._update_object_id_map(member_record)
-                member_record._object_id_map = self._object_id_map
-                member_record._initiate(stream)
-                member_entry = MemberEntry(
-                    binary_type=binary_type, primitive_type=0,
-                    record_type=record_type,
-                    member_ptr=member_record.get_void_ptr()
-                )
-            append(member_entry)
-        members_array = (MemberEntry * members_count)(*members)
-        self.members_ptr = members_array
+        if layout is None:
+            layout = self.get_class_layout(class_reference)
+        members = layout.array_type.from_buffer_copy(layout.template)
+        members_view = memoryview(members).cast('B')
+        pack_pointer = MEMBER_POINTER_STRUCT.pack_into
+        read = stream.read
+        profile = stream.profile
+        #: primitive runs are referenced by raw pointers only
+        primitive_runs = []
+
+        for run_type, size, slots in layout.segments:
+            if run_type is not None:
+                run = run_type.from_buffer_copy(read(size))
+                primitive_runs.append(run)
+                base = addressof(run)
+                for pointer_offset, field_offset in slots:
+                    pack_pointer(members_view, pointer_offset,
+                                 base + field_offset)
+                continue
+
+            if profile is not None:
+                start, offset = perf_counter(), stream.offset
+            record_type = read_record_type(stream)
+            member_record = RecordTypeSet[record_type]()
+            self._update_object_id_map(member_record)
+            member_record._object_id_map = self._object_id_map
+            member_record._initiate(stream)
+            member_entry = members[size]
+            member_entry.record_type = record_type
+            member_entry.member_ptr = member_record.get_void_ptr()
+            if profile is not None:
+                profile.add_member(record_type, stream.offset - offset,
+                                   perf_counter() - start)
+        members_view.release()
+        self._primitive_runs = primitive_runs
+        self.members_ptr = members
+        self.layout_ptr = layout
 
     def _update_object_id_map(self, entry):
         """
@@ -407,21 +495,24 @@ class ClassWithMembersAndTypes(ClassWithMembersMixin,
         ('member_type_info', MemberTypeInfo),
         ('library_id', c_uint32),
         ('members_ptr', POINTER(MemberEntry)),
+        ('layout_ptr', py_object)
     ]
+    _exclude_ = ('layout_ptr', )
 
     def _initiate(self, stream):
-        self.record_type, = unpack('b', stream.read(BYTE_SIZE))
+        self.record_type = stream.read_byte()
         self.class_info = ClassInfo()
         self.class_info._initiate(stream)
         self.member_type_info = MemberTypeInfo()
         self.member_type_info._initiate(
             stream, amount=self.class_info.members_count
         )
-        self.library_id, = unpack('I', stream.read(UINT32_SIZE))
+        self.library_id, = stream.unpack(UINT32_STRUCT)
 
-        #: update references
-        self._update_object_id_map(entry=self)
-        self._initiate_members(stream)
+        #: update references, class definition is registered before
+        #: members are read
+        definition = self._object_id_map.add_class(self)
+        self._initiate_members(stream, layout=definition.layout)
 
 
 class SystemClassWithMembers(ClassWithMembersMixin,
@@ -467,30 +558,26 @@ class BinaryArray(BinaryRecordStructure):
         ('binary_type', BinaryArrayTypeEnum),
         ('rank', c_uint32),
         ('lengths', POINTER(c_uint32)),
-        ('lower_bounds', POINTER(c_uint32)),
+        ('lower_bounds', POINTER(c_int32)),
         ('type', BinaryTypeEnum),
         ('additional_type_info', AdditionalTypeInfo)
     ]
 
     def _initiate(self, stream):
-        self.record_type, = unpack('b', stream.read(BYTE_SIZE))
-        self.object_id, = unpack('i', stream.read(INT32_SIZE))
-        self.binary_type, = unpack('b', stream.read(BYTE_SIZE))
-        self.rank, = unpack('I', stream.read(UINT32_SIZE))
-        lengths = unpack(
-            '%iI' % self.rank, stream.read(UINT32_SIZE * self.rank)
+        self.record_type = stream.read_byte()
+        self.object_id, self.binary_type, self.rank = stream.unpack(
+            BINARY_ARRAY_STRUCT
         )
+        lengths = stream.unpack_format('<%iI' % self.rank)
         self.lengths = (c_uint32 * len(lengths))(*lengths)
         if self.binary_type in (enums.BinaryArrayTypeEnum.get_lower_bounds()):
-            lower_bounds = unpack(
-                '%iI' % self.rank, stream.read(UINT32_SIZE * self.rank)
-            )
-            self.lower_bounds = (c_uint32 * len(lower_bounds))(*lower_bounds)
-        self.type, = unpack('b', stream.read(BYTE_SIZE))
+            lower_bounds = stream.unpack_format('<%ii' % self.rank)
+            self.lower_bounds = (c_int32 * len(lower_bounds))(*lower_bounds)
+        self.type = stream.read_byte()
         additional_type_info = AdditionalTypeInfo(binary_type=self.type)
         if self.type in (enums.BinaryTypeEnum.Primitive,
                          enums.BinaryTypeEnum.PrimitiveArray):
-            primitive_type, = unpack('b', stream.read(BYTE_SIZE))
+            primitive_type = stream.read_byte()
             value = (c_uint32 * 1)(*(primitive_type, ))
             value_ptr = cast(pointer(value), c_void_p)
             additional_type_info.value_ptr = value_ptr
@@ -506,32 +593,46 @@ class BinaryArray(BinaryRecordStructure):
             raise TypeError("Wrong binary array type: %i" % self.type)
         self.additional_type_info = additional_type_info
 
-    def to_bin(self):
+    def to_dict(self):
+        rank = self.rank
+        info = self.additional_type_info.value
+        return {
+            'record_type': self.record_type,
+            'object_id': self.object_id,
+            'binary_type': self.binary_type,
+            'rank': rank,
+            'lengths': self.lengths[:rank],
+            'lower_bounds': (
+                self.lower_bounds[:rank] if self.lower_bounds else None
+            ),
+            'type': self.type,
+            'additional_type_info': (
+                info.to_dict() if hasattr(info, 'to_dict') else info
+            )
+        }
+
+    def _write_bin(self, write):
         #: todo: my god that's ugly the all method
-        contents = bytearray()
-        extend = contents.extend
-        extend(pack('b', self.record_type))
-        extend(pack('i', self.object_id))
-        extend(pack('b', self.binary_type))
-        extend(pack('i', self.rank))
+        write(pack('b', self.record_type))
+        write(pack('i', self.object_id))
+        write(pack('b', self.binary_type))
+        write(pack('i', self.rank))
 
         lengths = pack(
             '%i%s' % (self.rank, self.lengths._type_._type_),
             *self.lengths[:self.rank]
         )
-        extend(lengths)
-        lower_bounds = b''
+        write(lengths)
         if self.binary_type in (enums.BinaryArrayTypeEnum.SingleOffset,
                                 enums.BinaryArrayTypeEnum.JaggedOffset,
                                 enums.BinaryArrayTypeEnum.RectangularOffset):
             lower_bounds = pack(
                 '%i%s' % (self.rank, self.lower_bounds._type_._type_),
-                *self.lengths[:self.rank]
+                *self.lower_bounds[:self.rank]
             )
-        extend(lower_bounds)
-        extend(pack('b', self.type))
-        extend(self.additional_type_info.value.to_bin())
-        return contents
+            write(lower_bounds)
+        write(pack('b', self.type))
+        self.additional_type_info.value._write_bin(write)
 
 
 class MemberPrimitiveTyped(BinaryRecordStructure):
@@ -564,16 +665,15 @@ class ClassWithId(ClassWithMembersMixin,
         #: skip it on read
         ('members_ptr', POINTER(MemberEntry)),
         ('class_reference_type', RecordTypeEnum),
-        ('class_reference_ptr', c_void_p)
+        ('class_reference_ptr', c_void_p),
+        ('layout_ptr', py_object)
     ]
-    _exclude_ = ('class_reference_type', 'class_reference_ptr')
+    _exclude_ = ('class_reference_type', 'class_reference_ptr',
+                 'layout_ptr')
 
     def get_class_reference(self):
         if not hasattr(self, '_class_reference'):
-            class_record_type = enums.RecordTypeEnum(
-                self.class_reference_type
-            ).name
-            class_type = globals()[class_record_type]
+            class_type = RecordTypeSet[self.class_reference_type]
             self._class_reference = cast(self.class_reference_ptr,
                                          POINTER(class_type)).contents
         return self._class_reference
@@ -589,19 +689,14 @@ class ClassWithId(ClassWithMembersMixin,
         return super(ClassWithId, self).get_member_list(class_info=class_info)
 
     def _initiate(self, stream):
-        self.record_type, = unpack('b', stream.read(BYTE_SIZE))
-        object_id, metadata_id = unpack('2i', stream.read(INT32_SIZE * 2))
+        self.record_type = stream.read_byte()
+        object_id, metadata_id = stream.unpack(CLASS_WITH_ID_STRUCT)
         self.object_id, self.metadata_id = object_id, metadata_id
-        class_record_type, class_ptr = self._object_id_map[self.metadata_id]
-        class_entry = globals()[
-            enums.RecordTypeEnum(class_record_type).name
-        ]
-        class_reference = cast(class_ptr, POINTER(class_entry)).contents
-        self._initiate_members(
-            stream, class_reference=class_reference
-        )
-        self.class_reference_type = class_record_type
-        self.class_reference_ptr = class_reference.get_void_ptr()
+        definition = self._object_id_map.classes[metadata_id]
+        self._initiate_members(stream, layout=definition.layout)
+        self.class_reference_type = definition.record_type
+        self.class_reference_ptr = definition.pointer
+        self._class_reference = definition.record
 
 
 class ObjectNullMultiple256(BinaryRecordStructure):
@@ -616,3 +711,29 @@ class ObjectNullMultiple(BinaryRecordStructure):
         ('record_type', RecordTypeEnum),
         ('count', c_int32)
     ]
+
+
+#: record type: record entry class
+RecordTypeSet = RecordRegistry({
+    enums.RecordTypeEnum.ClassWithId: ClassWithId,
+    enums.RecordTypeEnum.SystemClassWithMembers: SystemClassWithMembers,
+    enums.RecordTypeEnum.ClassWithMembers: ClassWithMembers,
+    enums.RecordTypeEnum.SystemClassWithMembersAndTypes: (
+        SystemClassWithMembersAndTypes
+    ),
+    enums.RecordTypeEnum.ClassWithMembersAndTypes: (
+        ClassWithMembersAndTypes
+    ),
+    enums.RecordTypeEnum.BinaryObjectString: BinaryObjectString,
+    enums.RecordTypeEnum.BinaryArray: BinaryArray,
+    enums.RecordTypeEnum.MemberPrimitiveTyped: MemberPrimitiveTyped,
+    enums.RecordTypeEnum.MemberReference: MemberReference,
+    enums.RecordTypeEnum.ObjectNull: ObjectNull,
+    enums.RecordTypeEnum.MessageEnd: MessageEnd,
+    enums.RecordTypeEnum.BinaryLibrary: BinaryLibrary,
+    enums.RecordTypeEnum.ObjectNullMultiple256: ObjectNullMultiple256,
+    enums.RecordTypeEnum.ObjectNullMultiple: ObjectNullMultiple,
+    enums.RecordTypeEnum.ArraySinglePrimitive: ArraySinglePrimitive,
+    enums.RecordTypeEnum.ArraySingleObject: ArraySingleObject,
+    enums.RecordTypeEnum.ArraySingleString: ArraySingleString,
+})
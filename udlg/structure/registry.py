@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.structure.registry
+    :synopsis: Record type registry, record entry classes indexed by record
+        type byte
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+#: record type is single byte
+TABLE_SIZE = 256
+
+
+class RecordRegistry(object):
+    """
+    Record type registry, flat table of record entry classes indexed by
+    record type byte, so record is dispatched with single list lookup.
+
+    Every backend has its own registry
+    (:data:`udlg.structure.records.RecordTypeSet` and
+    :data:`udlg.structure.compact.RecordTypeSet`), decoders for records
+    not supported yet (``MethodCall``, ``MethodReturn``) could be
+    registered and built-in ones could be overridden::
+
+        @RecordTypeSet.register(RecordTypeEnum.MethodCall)
+        class MethodCall(RecordStructure):
+            ...
+
+    .. note::
+
+        Registered decoders are used by document builds, lazy documents
+        index (walk through) built-in record types only
+    """
+    __slots__ = ('table', )
+
+    def __init__(self, record_classes=None):
+        """
+        :param dict record_classes: record type: record entry class,
+            optional
+        """
+        self.table = [None] * TABLE_SIZE
+        for record_type, record_class in (record_classes or {}).items():
+            self.register(record_type, record_class)
+
+    def __repr__(self):
+        return '<%s at 0x%08x, records: %i>' % (
+            self.__class__.__name__, id(self),
+            TABLE_SIZE - self.table.count(None)
+        )
+
+    def __getitem__(self, record_type):
+        record_class = self.table[record_type]
+        if record_class is None:
+            raise NotImplementedError(
+                "Record type `%i` is not supported yet" % record_type
+            )
+        return record_class
+
+    def __contains__(self, record_type):
+        return self.table[record_type] is not None
+
+    def get(self, record_type, default=None):
+        """
+        :param int record_type: record type
+        :param default: value returned if record type is not registered
+        :rtype: type
+        :return: record entry class
+        """
+        record_class = self.table[record_type]
+        return record_class if record_class is not None else default
+
+    def register(self, record_type, record_class=None):
+        """
+        register record entry class (decoder), the one registered before
+        for the same record type is replaced. Used as class decorator if
+        record class is not given.
+
+        :param int record_type: record type
+        :param type record_class: record entry class
+        :rtype: type | callable
+        :return: record entry class or decorator
+        :raises ValueError:
+            - if record type is not a byte
+        """
+        if not 0 <= record_type < TABLE_SIZE:
+            raise ValueError("Wrong record type: `%r`" % record_type)
+        if record_class is None:
+            def decorator(record_class):
+                return self.register(record_type, record_class)
+            return decorator
+        self.table[record_type] = record_class
+        return record_class
+
+    def unregister(self, record_type):
+        """
+        :param int record_type: record type
+        :rtype: type | None
+        :return: record entry class was registered, None if there was not
+        """
+        record_class = self.table[record_type]
+        self.table[record_type] = None
+        return record_class
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.structure.scanner
+    :synopsis: Record stream scanner, walks records without materializing
+        them into structures
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+from array import array
+from struct import calcsize
+
+from .constants import (
+    INT32_STRUCT, UINT32_STRUCT, PrimitiveTypeConversionSet
+)
+from .. import enums
+
+#: primitive type: size in bytes
+PrimitiveTypeSizeSet = dict(
+    (primitive_type, calcsize('<' + call_format))
+    for primitive_type, call_format in PrimitiveTypeConversionSet.items()
+    if call_format is not None
+)
+
+
+class RecordScanner(object):
+    """
+    Walks record stream and keeps track of offsets and class layouts only.
+    Member layout is a tuple with primitive member sizes and ``None`` for
+    members stored as records.
+    """
+    def __init__(self, reader):
+        """
+        :param udlg.utils.reader.BinaryReader reader: reader set up right
+            on the first record (after serialization header)
+        """
+        self.reader = reader
+        #: object_id: member layout
+        self.layouts = {}
+        #: object_id: offset of class definition record
+        self.definitions = {}
+        RecordType = enums.RecordTypeEnum
+        self._skippers = {
+            RecordType.ClassWithId: self._skip_class_with_id,
+            RecordType.SystemClassWithMembersAndTypes: (
+                self._skip_system_class_with_members_and_types
+            ),
+            RecordType.ClassWithMembersAndTypes: (
+                self._skip_class_with_members_and_types
+            ),
+            RecordType.BinaryObjectString: self._skip_binary_object_string,
+            RecordType.BinaryArray: self._skip_binary_array,
+            RecordType.MemberReference: self._skip_fixed(5),
+            RecordType.ObjectNull: self._skip_fixed(1),
+            RecordType.MessageEnd: self._skip_fixed(1),
+            RecordType.BinaryLibrary: self._skip_binary_library,
+            RecordType.ObjectNullMultiple256: self._skip_fixed(2),
+            RecordType.ObjectNullMultiple: self._skip_fixed(5),
+            RecordType.ArraySinglePrimitive: self._skip_array_single_primitive,
+            RecordType.ArraySingleString: self._skip_fixed(9),
+        }
+
+    def scan(self, string_slots=None):
+        """
+        walk top level records up to (including) MessageEnd one
+
+        :param array.array string_slots: array string slots
+            (see :meth:`iter_string_slots`) are appended to (flat, five
+            items per slot), optional
+        :rtype: tuple[array.array, bytearray]
+        :return: records offsets (with extra one pointing right after the
+            last record) and records types
+        """
+        offsets = array('Q')
+        types = bytearray()
+        slots = self._walk(offsets=offsets, types=types)
+        if string_slots is None:
+            for _ in slots:
+                pass
+        else:
+            extend = string_slots.extend
+            for slot in slots:
+                extend(slot)
+        return offsets, types
+
+    def iter_strings(self):
+        """
+        walk top level records up to (including) MessageEnd one and get
+        string members (BinaryObjectString records) of class records,
+        everything else is skipped. Numbering is the same as record index
+        and member index in ``document.records[i].members[j]``
+
+        :rtype: collections.Iterable[tuple[int, int, bytes]]
+        :return: (record index, member index, string) iterator
+        """
+        buffer = self.reader.buffer
+        for index, member_index, _, start, end in self.iter_string_slots():
+            yield index, member_index, buffer[start:end]
+
+    def iter_string_slots(self):
+        """
+        walk top level records up to (including) MessageEnd one and get
+        spans of string members (BinaryObjectString records) of class
+        records, the same members :meth:`iter_strings` gives
+
+        :rtype: collections.Iterable[tuple[int, int, int, int, int]]
+        :return: (record index, member index, string offset, string value
+            offset, string end offset) iterator, string offset points to
+            length prefix
+        """
+        return self._walk()
+
+    def _walk(self, offsets=None, types=None):
+        """
+        walk top level records, string slots of class records are yielded
+
+        :param array.array offsets: array records offsets are appended to
+            (with extra one pointing right after the last record), optional
+        :param bytearray types: records types are appended to, optional
+        :rtype: collections.Iterable[tuple[int, int, int, int, int]]
+        :return: string slots iterator, see :meth:`iter_string_slots`
+        """
+        reader = self.reader
+        skip = reader.skip
+        skip_record = self.skip_record
+        RecordType = enums.RecordTypeEnum
+        message_end = RecordType.MessageEnd
+        string = RecordType.BinaryObjectString
+        class_readers = {
+            RecordType.ClassWithId: self._read_class_with_id,
+            RecordType.SystemClassWithMembersAndTypes: (
+                self._read_system_class_with_members_and_types
+            ),
+            RecordType.ClassWithMembersAndTypes: (
+                self._read_class_with_members_and_types
+            ),
+        }
+        index = 0
+        while True:
+            if offsets is not None:
+                offsets.append(reader.offset)
+            record_type = reader.peek_byte()
+            read_class = class_readers.get(record_type)
+            if read_class is None:
+                skip_record()
+            else:
+                for member_index, size in enumerate(read_class()):
+                    if size is not None:
+                        skip(size)
+                    elif reader.peek_byte() == string:
+                        skip(5)
+                        offset = reader.offset
+                        size = reader.read_7bit_int()
+                        start = reader.offset
+                        skip(size)
+                        yield (index, member_index, offset, start,
+                               reader.offset)
+                    else:
+                        skip_record()
+            if types is not None:
+                types.append(record_type)
+            if record_type == message_end:
+                break
+            index += 1
+        if offsets is not None:
+            offsets.append(reader.offset)
+
+    def skip_record(self):
+        """
+        skip record at reader offset
+
+        :rtype: int
+        :return: skipped record type
+        :raises NotImplementedError:
+            - if record type is not supported
+        """
+        record_type = self.reader.peek_byte()
+        try:
+            skip = self._skippers[record_type]
+        except KeyError:
+            raise NotImplementedError(
+                "Record type `%i` is not supported yet" % record_type
+            )
+        skip()
+        return record_type
+
+    def _skip_fixed(self, size):
+        skip = self.reader.skip
+
+        def skip_fixed():
+            skip(size)
+        return skip_fixed
+
+    def _skip_string(self):
+        reader = self.reader
+        reader.skip(reader.read_7bit_int())
+
+    def _skip_binary_object_string(self):
+        self.reader.skip(5)
+        self._skip_string()
+
+    def _skip_binary_library(self):
+        self.reader.skip(5)
+        self._skip_string()
+
+    def _skip_array_single_primitive(self):
+        reader = self.reader
+        reader.skip(5)
+        length, = reader.unpack(UINT32_STRUCT)
+        primitive_type = reader.read_byte()
+        reader.skip(length * PrimitiveTypeSizeSet[primitive_type])
+
+    def _skip_binary_array(self):
+        reader = self.reader
+        reader.skip(5)
+        binary_type = reader.read_byte()
+        rank, = reader.unpack(UINT32_STRUCT)
+        reader.skip(4 * rank)
+        if binary_type in enums.BinaryArrayTypeEnum.get_lower_bounds():
+            reader.skip(4 * rank)
+        self._skip_additional_info(reader.read_byte())
+
+    def _skip_additional_info(self, binary_type):
+        """
+        skip additional info for given binary type
+
+        :param int binary_type: binary type
+        :rtype: int | None
+        :return: primitive type for primitive types
+        """
+        BinaryType = enums.BinaryTypeEnum
+        if binary_type in (BinaryType.Primitive, BinaryType.PrimitiveArray):
+            return self.reader.read_byte()
+        elif binary_type == BinaryType.SystemClass:
+            self._skip_string()
+        elif binary_type == BinaryType.Class:
+            self._skip_string()
+            self.reader.skip(4)
+        return None
+
+    def _read_class_header(self):
+        """
+        skip record type and class info
+
+        :rtype: tuple[int, int]
+        :return: object id, members count
+        """
+        reader = self.reader
+        reader.skip(1)
+        object_id, = reader.unpack(INT32_STRUCT)
+        self._skip_string()
+        members_count, = reader.unpack(UINT32_STRUCT)
+        for _ in range(members_count):
+            self._skip_string()
+        return object_id, members_count
+
+    def _read_member_type_info(self, members_count):
+        """
+        read member type info into member layout
+
+        :param int members_count: members count
+        :rtype: tuple
+        :return: member layout
+        """
+        primitive = enums.BinaryTypeEnum.Primitive
+        binary_types = self.reader.read(members_count)
+        layout = []
+        append = layout.append
+        for binary_type in binary_types:
+            primitive_type = self._skip_additional_info(binary_type)
+            if binary_type == primitive:
+                append(PrimitiveTypeSizeSet[primitive_type])
+            else:
+                append(None)
+        return tuple(layout)
+
+    def _read_class_with_members_and_types(self):
+        offset = self.reader.offset
+        object_id, members_count = self._read_class_header()
+        layout = self._read_member_type_info(members_count)
+        #: library id
+        self.reader.skip(4)
+        self.layouts[object_id] = layout
+        self.definitions[object_id] = offset
+        return layout
+
+    def _read_system_class_with_members_and_types(self):
+        offset = self.reader.offset
+        object_id, members_count = self._read_class_header()
+        layout = self._read_member_type_info(members_count)
+        self.layouts[object_id] = layout
+        self.definitions[object_id] = offset
+        return layout
+
+    def _read_class_with_id(self):
+        reader = self.reader
+        reader.skip(5)
+        metadata_id, = reader.unpack(INT32_STRUCT)
+        return self.layouts[metadata_id]
+
+    def _skip_class_with_members_and_types(self):
+        self._skip_members(self._read_class_with_members_and_types())
+
+    def _skip_system_class_with_members_and_types(self):
+        self._skip_members(self._read_system_class_with_members_and_types())
+
+    def _skip_class_with_id(self):
+        self._skip_members(self._read_class_with_id())
+
+    def _skip_members(self, layout):
+        skip = self.reader.skip
+        skip_record = self.skip_record
+        for size in layout:
+            if size is None:
+                skip_record()
+            else:
+                skip(size)
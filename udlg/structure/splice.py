@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.structure.splice
+    :synopsis: Span splicing writer, patches original data with changed
+        strings instead of encoding records again
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import logging
+
+from .scanner import RecordScanner
+from .structure import SerializationHeader
+from ..utils import encode_7bit_int
+from ..utils.reader import BinaryReader
+
+logger = logging.getLogger('udlg')
+
+
+class SpliceWriter(object):
+    """
+    Keeps original document data and spans of string members of class
+    records (the ones i18n is loaded into). Document is written as
+    original data ranges with changed strings (new length prefix and
+    value) in between, so only string changes are written, anything else
+    changed in document is not.
+    """
+    def __init__(self, buffer, offset=0, slots=None, end=None):
+        """
+        :param bytes | mmap.mmap buffer: original data
+        :param int offset: offset of serialization header in buffer
+        :param list slots: string member spans (see :attr:`slots`), if
+            they are known already, optional
+        :param int end: offset right after the last record, should be
+            given with slots
+        """
+        self.buffer = buffer
+        self.offset = offset
+        self._slots = slots
+        self._end = end
+        #: slots grouped by record, see :meth:`_get_record_slots`
+        self._record_slots = None
+        #: record index: (string offset, string value offset, string end
+        #: offset, string) list
+        self._strings = {}
+
+    def __repr__(self):
+        return '<%s at 0x%08x, offset: %i>' % (
+            self.__class__.__name__, id(self), self.offset
+        )
+
+    @property
+    def slots(self):
+        """
+        string member spans, scanned on first access
+
+        :rtype: list[tuple[int, int, int, int, int]]
+        :return: (record index, member index, string offset, string value
+            offset, string end offset) list
+        """
+        if self._slots is None:
+            reader = BinaryReader(self.buffer, offset=self.offset)
+            SerializationHeader()._initiate(reader)
+            self._slots = list(RecordScanner(reader).iter_string_slots())
+            self._end = reader.offset
+        return self._slots
+
+    def _get_record_slots(self):
+        """
+        :rtype: list[tuple[int, list[tuple[int, int, int, int]]]]
+        :return: (record index, (member index, string offset, string value
+            offset, string end offset) list) list
+        """
+        if self._record_slots is None:
+            record_slots = self._record_slots = []
+            record_index = None
+            for index, member_index, offset, start, end in self.slots:
+                if index != record_index:
+                    record_index, slots = index, []
+                    record_slots.append((index, slots))
+                slots.append((member_index, offset, start, end))
+        return self._record_slots
+
+    def iter_changes(self, records):
+        """
+        iterate over strings differ from original ones. Strings are taken
+        from record members once (the first time record is decoded) and
+        kept, so records are not walked again, only strings changed with
+        ``set`` (``dirty`` ones) are compared with original data.
+
+        :param list | udlg.structure.lazy.LazyRecordList records: document
+            records, the same ones every time
+        :rtype: collections.Iterable[tuple[int, int, bytes]]
+        :return: (string offset, string end offset, string value) iterator
+        """
+        buffer = self.buffer
+        strings = self._strings
+        is_decoded = getattr(records, 'is_decoded', None)
+        for index, slots in self._get_record_slots():
+            record_strings = strings.get(index)
+            if record_strings is None:
+                if is_decoded is not None and not is_decoded(index):
+                    #: never decoded, so never changed
+                    continue
+                members = records[index].members
+                record_strings = strings[index] = [
+                    (offset, start, end, members[member_index].value)
+                    for member_index, offset, start, end in slots
+                ]
+            for offset, start, end, string in record_strings:
+                if not string.dirty:
+                    continue
+                if (string.size != end - start or
+                        string.value != buffer[start:end]):
+                    yield offset, end, string.to_bin()
+
+    def iter_i18n_changes(self, items):
+        """
+        iterate over strings differ from i18n ones, nothing is decoded, so
+        i18n strings could be applied right to original data
+
+        :param collections.Iterable items: i18n items,
+            ``(record index, member index, string)``, see
+            :func:`udlg.utils.i18n.iter_i18n_items`, the last one wins if
+            string is given twice
+        :rtype: collections.Iterable[tuple[int, int, bytes]]
+        :return: (string offset, string end offset, string value) iterator
+        """
+        buffer = self.buffer
+        slots = dict(
+            ((index, member_index), (offset, start, end))
+            for index, member_index, offset, start, end in self.slots
+        )
+        changes = {}
+        for record_id, member_id, value in items:
+            slot = slots.get((record_id, member_id))
+            if slot is None:
+                logger.warning(
+                    "Entry with id: (%i, %i) skipped, as original "
+                    "file has no proper content type with it",
+                    record_id, member_id
+                )
+                continue
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            offset, start, end = slot
+            if value != buffer[start:end]:
+                data = bytearray()
+                encode_7bit_int(len(value), data)
+                data += value
+                changes[offset] = (offset, end, data)
+            else:
+                changes.pop(offset, None)
+        return iter(sorted(changes.values(), key=lambda change: change[0]))
+
+    def write_changes(self, changes, write):
+        """
+        write original data with changes spliced in
+
+        :param collections.Iterable[tuple[int, int, bytes]] changes: changed
+            spans (ordered by offset), span data is written as is
+        :param callable write: write function, takes bytes like object
+        :rtype: None
+        :return: None
+        """
+        buffer = self.buffer
+        position = self.offset
+        #: end offset is known once slots are scanned
+        self.slots
+        for offset, end, data in changes:
+            write(buffer[position:offset])
+            write(data)
+            position = end
+        write(buffer[position:self._end])
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.structure.strings
+    :synopsis: Columnar string table, string payloads of a document stored
+        in one contiguous buffer
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+from array import array
+from bisect import bisect_right
+
+from ..utils import encode_7bit_int
+
+
+class StringTable(object):
+    """
+    String payloads stored one after another in one buffer, string is
+    addressed by its index (start offset and size arrays). Bulk operations
+    (search, dedupe, export) walk the buffer instead of string objects.
+
+    Changed strings which do not fit their old place are moved to the end
+    of buffer, space left behind is reclaimed with :meth:`pack`.
+    """
+    __slots__ = ('buffer', 'starts', 'sizes', 'waste', 'packed', 'changed')
+
+    def __init__(self, values=()):
+        """
+        :param collections.Iterable[bytes] values: initial strings
+        """
+        self.buffer = bytearray()
+        self.starts = array('Q')
+        self.sizes = array('I')
+        #: amount of bytes no string refers to
+        self.waste = 0
+        #: strings are stored in index order with no gaps
+        self.packed = True
+        #: indexes of strings changed with :meth:`set`
+        self.changed = set()
+        for value in values:
+            self.append(value)
+
+    def __repr__(self):
+        return '<%s at 0x%08x, strings: %i, size: %i>' % (
+            self.__class__.__name__, id(self), len(self), len(self.buffer)
+        )
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def __getitem__(self, index):
+        start = self.starts[index]
+        return bytes(self.buffer[start:start + self.sizes[index]])
+
+    def __iter__(self):
+        buffer = self.buffer
+        for start, size in zip(self.starts, self.sizes):
+            yield bytes(buffer[start:start + size])
+
+    def get_size(self, index):
+        return self.sizes[index]
+
+    def get_view(self, index):
+        """
+        get zero-copy view of string
+
+        .. warning::
+
+            Buffer can not grow while view is alive, release it before
+            strings are changed or appended
+
+        :param int index: string index
+        :rtype: memoryview
+        :return: string view
+        """
+        start = self.starts[index]
+        return memoryview(self.buffer)[start:start + self.sizes[index]]
+
+    def append(self, value):
+        """
+        append string
+
+        :param bytes value: string
+        :rtype: int
+        :return: string index
+        """
+        self.starts.append(len(self.buffer))
+        self.sizes.append(len(value))
+        self.buffer += value
+        return len(self.sizes) - 1
+
+    def read(self, stream):
+        """
+        read length prefixed string from stream into table
+
+        :param udlg.utils.reader.BinaryReader stream: reader
+        :rtype: int
+        :return: string index
+        """
+        return self.append(stream.read(stream.read_7bit_int()))
+
+    def set(self, index, value):
+        """
+        change string
+
+        :param int index: string index
+        :param bytes value: new value
+        :rtype: None
+        :return: None
+        """
+        size = len(value)
+        old_size = self.sizes[index]
+        if size <= old_size:
+            start = self.starts[index]
+            self.buffer[start:start + size] = value
+            self.waste += old_size - size
+        else:
+            self.starts[index] = len(self.buffer)
+            self.buffer += value
+            self.waste += old_size
+        self.sizes[index] = size
+        self.packed = False
+        self.changed.add(index)
+
+    def pack(self):
+        """
+        rewrite buffer with strings ordered by index, so no space is
+        wasted
+
+        :rtype: None
+        :return: None
+        """
+        buffer = self.buffer
+        packed = bytearray()
+        starts = array('Q')
+        for start, size in zip(self.starts, self.sizes):
+            starts.append(len(packed))
+            packed += buffer[start:start + size]
+        self.buffer, self.starts = packed, starts
+        self.waste, self.packed = 0, True
+
+    def find(self, sequence):
+        """
+        find strings containing sequence, the whole buffer is searched at
+        once, table is packed first if needed
+
+        :param bytes sequence: binary sequence
+        :rtype: collections.Iterable[int]
+        :return: indexes iterator (ascending, every string is given once)
+        :raises ValueError:
+            - if sequence is empty
+        """
+        if not sequence:
+            raise ValueError("Empty sequence given")
+        if not self.packed:
+            self.pack()
+        buffer, starts, sizes = self.buffer, self.starts, self.sizes
+        find = buffer.find
+        length = len(sequence)
+        offset = find(sequence)
+        while offset != -1:
+            #: empty strings share start offset with the next one, so the
+            #: last string starting at offset is taken
+            index = bisect_right(starts, offset) - 1
+            end = starts[index] + sizes[index]
+            if offset + length <= end:
+                yield index
+                #: every string is given once
+                offset = find(sequence, end)
+            else:
+                #: entry crosses strings bound
+                offset = find(sequence, offset + 1)
+
+    def dedupe(self):
+        """
+        get table of unique strings
+
+        :rtype: tuple[StringTable, array.array]
+        :return: unique strings table and index of unique string for every
+            string of this table
+        """
+        unique = self.__class__()
+        seen = {}
+        mapping = array('I')
+        for value in self:
+            index = seen.get(value)
+            if index is None:
+                index = seen[value] = unique.append(value)
+            mapping.append(index)
+        return unique, mapping
+
+    def to_bin(self, index):
+        """
+        get string with length prefix
+
+        :param int index: string index
+        :rtype: bytearray
+        :return: binary data
+        """
+        document = bytearray()
+        encode_7bit_int(self.sizes[index], document)
+        start = self.starts[index]
+        document += self.buffer[start:start + self.sizes[index]]
+        return document
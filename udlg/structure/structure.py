@@ -9,19 +9,18 @@
 from __future__ import unicode_literals
 import ctypes
 
-from struct import unpack, pack
+from struct import pack, Struct
+from time import perf_counter
 from ctypes import (
     c_uint32, c_uint64, c_int32, c_byte, c_ubyte,
-    POINTER, sizeof, cast,
-)
-from .constants import (
-    BYTE_SIZE, INT_SIZE, RecordTypeEnum
+    POINTER, sizeof, cast, py_object
 )
+from .constants import RecordTypeEnum
 from .base import SimpleSerializerMixin
 from . import records, mixins
 from . utils import read_record_type
-from .. import enums
-from .. utils.i18n import get_i18n_items
+from .. utils.i18n import format_i18n_items, iter_i18n_items, write_i18n_items
+from .. utils.writer import get_writer
 
 import logging
 logger = logging.getLogger('udlg')
@@ -30,6 +29,8 @@ SAFE_SIZES = [
     c_uint64, c_byte, c_uint32
 ]
 SIGNATURE_SIZE = 24
+#: record_type, root_id, header_id, major_version, minor_version
+HEADER_STRUCT = Struct('<b4i')
 
 
 def safe_size_of(c_type):
@@ -57,16 +58,16 @@ class SerializationHeader(SimpleSerializerMixin,
             Stream offset should be set up right on block that identifies
             as Serialization Header
 
-        :param stream: stream object, file stream for example
+        :param stream: reader (or stream object, file stream for example)
         :rtype: None
         :return: None
         """
         if seek is not None:
             stream.seek(seek)
 
-        record_type, = unpack('b', stream.read(BYTE_SIZE))
-        root_id, header_id, major_version, minor_version = unpack(
-            '4i', stream.read(INT_SIZE * 4)
+        (record_type, root_id, header_id, major_version,
+         minor_version) = HEADER_STRUCT.unpack(
+            stream.read(HEADER_STRUCT.size)
         )
         self.record_type = record_type
         self.root_id = root_id
@@ -85,8 +86,8 @@ class Record(SimpleSerializerMixin, ctypes.Structure):
         self._entry = None
         super(Record, self).__init__(*args, **kwargs)
 
-    def to_bin(self):
-        return self.entry.to_bin()
+    def _write_bin(self, write):
+        self.entry._write_bin(write)
 
     def __str__(self):
         return '<Record: at 0x%16x>' % id(self)
@@ -112,10 +113,8 @@ class Record(SimpleSerializerMixin, ctypes.Structure):
         :return: one of valid .net binary data structure instances
         """
         if not hasattr(self, '_entry'):
-            record_type = self.record_type
-            RecordType = enums.RecordTypeEnum
-            class_name = RecordType(record_type).name
-            record_class = getattr(records, class_name, self.__class__)
+            record_class = records.RecordTypeSet.get(self.record_type,
+                                                     self.__class__)
             pointer_type = POINTER(record_class)
             self._entry = cast(self.entry_ptr, pointer_type).contents
         return self._entry
@@ -129,22 +128,28 @@ class Record(SimpleSerializerMixin, ctypes.Structure):
             Stream offset should be set up right on block that identifies
             as Serialization Header
 
-        :param stream: stream object, file stream for example
+        :param udlg.utils.reader.BinaryReader stream: reader
         :rtype: None
         :return: None
         """
+        profile = stream.profile
+        if profile is not None:
+            start, offset = perf_counter(), stream.offset
         self.record_type = read_record_type(stream)
-        record_class_name = enums.RecordTypeEnum(self.record_type).name
-        record_entry_class = getattr(records, record_class_name)
-        record_entry = record_entry_class()
+        record_entry = records.RecordTypeSet[self.record_type]()
         record_entry._object_id_map = object_id_map
         record_entry._initiate(stream)
 
         #: todo make it fixed
         self._update_object_id_map(record_entry, object_id_map)
 
+        self._entry = record_entry
+
         entry_void_ptr = record_entry.get_void_ptr()
         self.entry_ptr = entry_void_ptr
+        if profile is not None:
+            profile.add_record(self.record_type, stream.offset - offset,
+                               perf_counter() - start)
 
     def _update_object_id_map(self, entry, object_id_map):
         """
@@ -175,28 +180,276 @@ class UDLGHeader(SimpleSerializerMixin, ctypes.Structure):
         ('signature', (c_byte * SIGNATURE_SIZE))
     ]
 
-    def to_bin(self):
-        document = bytearray()
-        data = pack('%ib' % SIGNATURE_SIZE, *self.signature[:SIGNATURE_SIZE])
-        document.extend(data)
-        return document
+    def _write_bin(self, write):
+        write(pack('%ib' % SIGNATURE_SIZE, *self.signature[:SIGNATURE_SIZE]))
+
+
+def iter_record_strings(entry):
+    """
+    iterate over strings of record entry, string record value itself or
+    string members of class record (nested class records included)
+
+    :param ctypes.Structure entry: record entry
+    :rtype: collections.Iterable[udlg.structure.common.LengthPrefixedString]
+    :return: strings iterator
+    """
+    if isinstance(entry, records.BinaryObjectString):
+        yield entry.value
+        return
+    for member in getattr(entry, 'members', ()):
+        if isinstance(member, ctypes.Structure):
+            for string in iter_record_strings(member):
+                yield string
+
+
+class RecordBinCache(object):
+    """
+    Serialized records cache. Record is encoded once and its data is
+    reused until one of record strings is changed (see
+    :attr:`udlg.structure.common.LengthPrefixedString.changes`, counted
+    by ``set`` method) or record is marked as dirty explicitly.
+
+    .. warning::
+
+        Only string changes are tracked, anything else changed (member
+        views, primitive values) should be marked with
+        :meth:`BinaryDataStructureFile.mark_dirty`, otherwise stale data
+        is written
+    """
+    def __init__(self):
+        #: record index: (binary data, record strings, strings changes)
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_bin(self, index, record):
+        """
+        get record binary data, record is encoded only if it's dirty
+
+        :param int index: record index
+        :param Record record: record
+        :rtype: bytearray
+        :return: binary data
+        """
+        entry = self._entries.get(index)
+        if entry is not None:
+            data, strings, changes = entry
+            for string, count in zip(strings, changes):
+                if string.changes != count:
+                    break
+            else:
+                return data
+        data = record.to_bin()
+        strings = tuple(iter_record_strings(record.entry))
+        self._entries[index] = (
+            data, strings, tuple(string.changes for string in strings)
+        )
+        return data
+
+    def mark_dirty(self, index=None):
+        """
+        mark record as dirty (drop its cached data)
+
+        :param int | None index: record index, all records if it's None
+        :rtype: None
+        :return: None
+        """
+        if index is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(index, None)
+
+
+class DocumentState(object):
+    """
+    Python side document state, it's stored in ``py_object`` field so it
+    survives structure copies (``UDLGFile.data`` assignment for example)
+    """
+    def __init__(self, records=None):
+        """
+        :param udlg.structure.lazy.LazyRecordList records: lazy records
+        """
+        self.records = records
+        #: :class:`RecordBinCache` if it's enabled (see
+        #: :meth:`BinaryDataStructureFile.enable_bin_cache`)
+        self.bin_cache = None
+        #: :class:`udlg.structure.splice.SpliceWriter` if source data is
+        #: kept
+        self.splice_writer = None
+        #: :class:`udlg.profile.Profile` if document is built with
+        #: ``profile`` option
+        self.profile = None
 
 
 class BinaryDataStructureFile(SimpleSerializerMixin, ctypes.Structure):
     _fields_ = [
         ('header', SerializationHeader),
         ('records_ptr', POINTER(Record)),
-        ('count', c_uint32)
+        ('count', c_uint32),
+        ('state_ptr', py_object)
     ]
 
     #: exclude from serialization
-    _exclude_ = ('count', )
+    _exclude_ = ('count', 'state_ptr')
+
+    def to_dict(self):
+        return {
+            'header': self.header.to_dict(),
+            'records': [record.to_dict() for record in self.records],
+            'count': self.count
+        }
+
+    @property
+    def state(self):
+        """
+        :rtype: DocumentState | None
+        :return: document state
+        """
+        try:
+            return self.state_ptr
+        except ValueError:
+            #: PyObject is NULL
+            return None
+
+    @state.setter
+    def state(self, value):
+        self.state_ptr = value
+
+    @property
+    def profile(self):
+        """
+        :rtype: udlg.profile.Profile | None
+        :return: decoding profile, if document is built with ``profile``
+            option
+        """
+        state = self.state
+        return state.profile if state is not None else None
+
+    def get_state(self):
+        """
+        get document state, it's created on demand
+
+        :rtype: DocumentState
+        :return: document state
+        """
+        state = self.state
+        if state is None:
+            state = self.state = DocumentState()
+        return state
+
+    def to_bin(self, splice=False):
+        """
+        convert document to bytes, if serialized records cache is enabled
+        records are taken from it (only dirty ones are encoded again)
+
+        :param bool splice: splice mode, document is written as original
+            data with changed strings spliced in, nothing is encoded but
+            strings, document should be built with ``keep_source`` option
+        :rtype: bytearray
+        :return: binary data
+        :raises ValueError:
+            - if splice mode is used, but document has no source data
+        """
+        document = bytearray()
+        self._write_bin(document.extend, splice=splice, cached=True)
+        return document
+
+    def write_to(self, sink, splice=False):
+        """
+        write document right into sink, records are written one by one
+        (serialized records cache is not used), nothing is buffered
+
+        :param sink: ``bytearray`` (data is appended), file like object,
+            ``mmap.mmap`` or :class:`udlg.utils.writer.BufferWriter`
+        :param bool splice: splice mode, see :meth:`to_bin`
+        :rtype: None
+        :return: None
+        """
+        self._write_bin(get_writer(sink), splice=splice)
+
+    def _write_bin(self, write, splice=False, cached=False):
+        if splice:
+            writer = self.get_state().splice_writer
+            if writer is None:
+                raise ValueError(
+                    "Document has no source data, build it with "
+                    "`keep_source` option to use splice mode"
+                )
+            writer.write_changes(writer.iter_changes(self.records), write)
+            return
+
+        self.header._write_bin(write)
+        bin_cache = self.get_state().bin_cache if cached else None
+        if self.lazy:
+            self.records._write_bin(write, bin_cache=bin_cache)
+        elif bin_cache is not None:
+            get_bin = bin_cache.get_bin
+            for index, record in enumerate(self.records):
+                write(get_bin(index, record))
+        else:
+            #: records are taken one by one, so record (and its decoded
+            #: members) is released once it's written
+            records_ptr = self.records_ptr
+            for index in range(self.count):
+                records_ptr[index]._write_bin(write)
+
+    def enable_bin_cache(self, enabled=True):
+        """
+        enable (or disable) serialized records cache, so records are
+        encoded once and only dirty ones are encoded again on next
+        :meth:`to_bin` calls. It's enabled by ``load_i18n``.
+
+        .. warning::
+
+            Only strings changed with ``set`` are tracked, changes of
+            anything else should be marked with :meth:`mark_dirty`
+
+        :param bool enabled: enable cache
+        :rtype: None
+        :return: None
+        """
+        state = self.get_state()
+        if not enabled:
+            state.bin_cache = None
+        elif state.bin_cache is None:
+            state.bin_cache = RecordBinCache()
+
+    def mark_dirty(self, index=None):
+        """
+        mark record as dirty so it would be encoded again on
+        :meth:`to_bin` call (if serialized records cache is enabled),
+        strings changed with ``set`` are tracked automatically, changes of
+        anything else should be marked
+
+        :param int | None index: record index, all records if it's None
+        :rtype: None
+        :return: None
+        """
+        bin_cache = self.get_state().bin_cache
+        if bin_cache is not None:
+            bin_cache.mark_dirty(index)
+
+    @property
+    def lazy(self):
+        state = self.state
+        return state is not None and state.records is not None
 
     @property
     def records(self):
         return self.get_record_list()
 
     def get_record_list(self):
+        """
+        get records, for lazy documents it's a sequence which decodes
+        records on first access
+
+        :rtype: list | udlg.structure.lazy.LazyRecordList
+        :return: records
+        """
+        state = self.state
+        if state is not None and state.records is not None:
+            return state.records
         return self.records_ptr[:self.count]
 
 
@@ -210,38 +463,88 @@ class UDLGFile(SimpleSerializerMixin, ctypes.Structure):
     def records(self):
         return self.data.records
 
+    @property
+    def profile(self):
+        return self.data.profile
+
+    def to_bin(self, splice=False):
+        """
+        convert document to bytes
+
+        :param bool splice: splice mode, see
+            :meth:`BinaryDataStructureFile.to_bin`
+        :rtype: bytearray
+        :return: binary data
+        """
+        document = bytearray()
+        self._write_bin(document.extend, splice=splice, cached=True)
+        return document
+
+    def write_to(self, sink, splice=False):
+        """
+        write document right into sink, see
+        :meth:`BinaryDataStructureFile.write_to`
+
+        :param sink: ``bytearray`` (data is appended), file like object,
+            ``mmap.mmap`` or :class:`udlg.utils.writer.BufferWriter`
+        :param bool splice: splice mode, see
+            :meth:`BinaryDataStructureFile.to_bin`
+        :rtype: None
+        :return: None
+        """
+        self._write_bin(get_writer(sink), splice=splice)
+
+    def _write_bin(self, write, splice=False, cached=False):
+        self.header._write_bin(write)
+        self.data._write_bin(write, splice=splice, cached=cached)
+
     def _initiate(self, stream):
         header = UDLGHeader()
-        data = unpack('%ib' % SIGNATURE_SIZE, stream.read(SIGNATURE_SIZE))
-        signature = (c_byte * SIGNATURE_SIZE)(*data)
-        header.signature = signature
+        header.signature = (c_byte * SIGNATURE_SIZE).from_buffer_copy(
+            stream.read(SIGNATURE_SIZE)
+        )
         self.header = header
 
-    def unpack_i18n(self):
+    def unpack_i18n(self, sink=None):
         """
-        unpacks i18n strings
+        unpacks i18n strings, if sink is given they're written into it in
+        escaped format chunk by chunk (see
+        :class:`udlg.utils.i18n.I18nWriter`), legacy i18n block is returned
+        otherwise
+
+        :param sink: ``bytearray`` (data is appended) or file like object,
+            optional
+        :rtype: bytes | int
+        :return: i18n strings with \n sign separated, entries written if
+            sink is given
+        """
+        if sink is not None:
+            return write_i18n_items(self.iter_strings(), sink)
+        return format_i18n_items(self.iter_strings())
+
+    def iter_strings(self):
+        """
+        iterate over string members of records
 
-        :rtype: str
-        :return: i18n strings with \n sign separated
+        :rtype: collections.Iterable[tuple[int, int, bytes]]
+        :return: (record index, member index, string) iterator
         """
-        i18n = []
-        append = i18n.append
         record_list = self.data.records
         for idx, record in enumerate(record_list):
             for jdx, member in enumerate(record.members):
                 if isinstance(member, records.BinaryObjectString):
-                    content = member.value.value
-                    append(
-                        b"%i,%i=>'%s'" % (idx, jdx, content)
-                    )
-        return b"\n".join(i18n)
+                    yield idx, jdx, member.value.value
 
-    def load_i18n(self, block):
+    def load_i18n(self, block, cache=False):
         """
         ``raw`` process
-        load i18n file
+        load i18n file, entries are applied as they're read
 
-        :param bytes block: block to process
+        :param block: block to process (bytes) or binary file like object
+        :param bool cache: enable serialized records cache (see
+            :meth:`BinaryDataStructureFile.enable_bin_cache`), so only
+            records with changed strings are encoded again. Records changed
+            other way should be marked dirty then
         :rtype: None
         :return: None
         """
@@ -250,16 +553,18 @@ class UDLGFile(SimpleSerializerMixin, ctypes.Structure):
         self._cache = []
         cache_append = self._cache.append
 
-        for record_id, record in get_i18n_items(block).items():
-            for member_id, locale in record.items():
-                entry = self.data.records[record_id].members[member_id]
-                if not isinstance(entry, records.BinaryObjectString):
-                    logger.warning(
-                        "Entry with id: (%i, %i) skipped, as original "
-                        "file has no proper content type with it",
-                        record_id, member_id
-                    )
-                    continue
-                entry.set(locale)
-                #: prevent LengthPrefixedString from freeing
-                cache_append(entry.value)
+        if cache:
+            self.data.enable_bin_cache()
+        record_list = self.data.records
+        for record_id, member_id, locale in iter_i18n_items(block):
+            entry = record_list[record_id].members[member_id]
+            if not isinstance(entry, records.BinaryObjectString):
+                logger.warning(
+                    "Entry with id: (%i, %i) skipped, as original "
+                    "file has no proper content type with it",
+                    record_id, member_id
+                )
+                continue
+            entry.set(locale)
+            #: prevent LengthPrefixedString from freeing
+            cache_append(entry.value)
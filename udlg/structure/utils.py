@@ -6,11 +6,9 @@
 .. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 .. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 """
-from struct import unpack, calcsize
 from ctypes import resize, sizeof, addressof, cast, c_void_p
 from . constants import (
-    BYTE_SIZE, PrimitiveTypeConversionSet, PrimitiveTypeCTypesConversionSet
-
+    PrimitiveTypeConversionSet, PrimitiveTypeCTypesConversionSet
 )
 
 
@@ -18,16 +16,15 @@ def read_record_type(stream, seek_back=True):
     """
     reads record type
 
-    :param stream: stream object, file for example
-    :param bool seek_back: seek backwards after read block, True by default
-        if False no any seek operation
+    :param udlg.utils.reader.BinaryReader stream: reader
+    :param bool seek_back: keep reader offset on record type block, True by
+        default, if False reader moves forward
     :rtype: udlg.structure.constants.RecordTypeEnum
     :return: record type
     """
-    record_type, = unpack('b', stream.read(BYTE_SIZE))
     if seek_back:
-        stream.seek(-1, 1)
-    return record_type
+        return stream.peek_byte()
+    return stream.read_byte()
 
 
 def resize_array(array, size):
@@ -47,17 +44,32 @@ def read_primitive_type_from_stream(stream, primitive_type):
     """
     read primitive type from stream
 
-    :param stream: stream object, for example file stream
+    :param udlg.utils.reader.BinaryReader stream: reader
     :param int primitive_type: type (PrimitiveTypeEnumeration based type)
     :rtype: int | float | bool | datetime | char | decimal.Decimal
     :return:
     """
-    call_format = PrimitiveTypeConversionSet[primitive_type]
-    call_size = calcsize(call_format)
-    value, = unpack(call_format, stream.read(call_size))
+    value, = stream.unpack_format(
+        '<' + PrimitiveTypeConversionSet[primitive_type]
+    )
     return value
 
 
+def read_primitive_type_array_from_stream(stream, primitive_type, length):
+    """
+    read primitive type elements from stream with one bulk read straight
+    into ctypes array
+
+    :param udlg.utils.reader.BinaryReader stream: reader
+    :param int primitive_type: type (PrimitiveTypeEnumeration based type)
+    :param int length: amount of elements
+    :rtype: ctypes.Array
+    :return: fixed size array of elements, for example c_double * length
+    """
+    array_type = PrimitiveTypeCTypesConversionSet[primitive_type] * length
+    return array_type.from_buffer_copy(stream.read(sizeof(array_type)))
+
+
 def make_primitive_type_elements_array_pointer(primitive_type, elements):
     """
     create void pointer on array elements
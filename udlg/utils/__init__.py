@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
 from .bin import (
-    search, search_all, read_7bit_encoded_int_from_stream,
+    search, search_all, iter_search, read_7bit_encoded_int_from_stream,
     read_7bit_encoded_int,
-    write_7bit_int
+    write_7bit_int,
+    decode_7bit_int, decode_7bit_ints, encode_7bit_int, encode_7bit_ints
 )
+from .reader import BinaryReader, open_reader
+from .writer import BufferWriter, get_writer
 
-__all__ = ['search', 'search_all', 'read_7bit_encoded_int_from_stream',
-           'read_7bit_encoded_int', 'write_7bit_int']
+__all__ = ['search', 'search_all', 'iter_search',
+           'read_7bit_encoded_int_from_stream',
+           'read_7bit_encoded_int', 'write_7bit_int',
+           'decode_7bit_int', 'decode_7bit_ints',
+           'encode_7bit_int', 'encode_7bit_ints',
+           'BinaryReader', 'open_reader', 'BufferWriter', 'get_writer']
@@ -6,18 +6,137 @@
 .. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 .. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 """
-from struct import unpack
-from collections import deque
+import io
+import mmap
 from functools import partial
 
 from ..structure.constants import BYTE_SIZE
 
+#: chunk size streams (can not be mapped) are read with while searching
+SEARCH_CHUNK_SIZE = 1 << 20
+
+
+def _get_sequence(sequence):
+    """
+    get binary sequence to search
+
+    :param bytes | str sequence: sequence
+    :rtype: bytes
+    :return: binary sequence
+    :raises TypeError:
+        - if sequence is not str or bytes instance
+    :raises ValueError:
+        - if sequence is empty
+    """
+    if isinstance(sequence, str):
+        sequence = sequence.encode('utf-8')
+    elif isinstance(sequence, (bytes, bytearray)):
+        sequence = bytes(sequence)
+    else:
+        raise TypeError("`sequence` should be str, bytes instance")
+    if not sequence:
+        raise ValueError("`sequence` should not be empty")
+    return sequence
+
+
+def _find_all(sequence, buffer, offset):
+    """
+    find all (non overlapping) sequence entries inside buffer
+
+    :param bytes sequence: binary sequence
+    :param bytes | mmap.mmap buffer: buffer
+    :param int offset: offset search starts from
+    :rtype: collections.Iterable[int]
+    :return: offsets iterator
+    """
+    find = buffer.find
+    sequence_length = len(sequence)
+    index = find(sequence, offset)
+    while index != -1:
+        yield index
+        index = find(sequence, index + sequence_length)
+
+
+def _find_all_in_stream(sequence, stream, offset, chunk_size):
+    """
+    find all (non overlapping) sequence entries reading stream chunk by
+    chunk, tail of each chunk is kept so entries crossing chunk bounds
+    are found as well
+
+    :param bytes sequence: binary sequence
+    :param stream: stream object
+    :param int offset: offset search starts from
+    :param int chunk_size: chunk size
+    :rtype: collections.Iterable[int]
+    :return: offsets iterator
+    """
+    sequence_length = len(sequence)
+    stream.seek(offset)
+    window = b''
+    #: window start offset within stream
+    window_offset = offset
+    for chunk in iter(partial(stream.read, chunk_size), b''):
+        window += chunk
+        start = 0
+        for index in _find_all(sequence, window, 0):
+            yield window_offset + index
+            start = index + sequence_length
+        keep = max(start, len(window) - sequence_length + 1)
+        window = window[keep:]
+        window_offset += keep
+
+
+def iter_search(sequence, stream, stream_offset=0x0,
+                chunk_size=SEARCH_CHUNK_SIZE):
+    """
+    search all (non overlapping) sequence entries inside stream in one
+    pass. Binary data and file objects are searched as whole (files are
+    mapped into memory), other streams are read chunk by chunk. Stream
+    position is restored once iteration is over.
+
+    :param stream: stream object, file, binary data or
+        :class:`udlg.utils.reader.BinaryReader` instance
+    :param bytes | str sequence: binary sequence to find
+    :param int stream_offset: stream offset where process should start from,
+        0x0 by default
+    :param int chunk_size: chunk size for streams can not be mapped
+    :rtype: collections.Iterable[int]
+    :return: found sequence offsets iterator
+    """
+    sequence = _get_sequence(sequence)
+    buffer = getattr(stream, 'buffer', stream)
+    if isinstance(buffer, memoryview):
+        buffer = buffer.tobytes()
+    if isinstance(buffer, (bytes, bytearray, mmap.mmap)):
+        for index in _find_all(sequence, buffer, stream_offset):
+            yield index
+        return
+
+    position = stream.tell()
+    try:
+        try:
+            buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError,
+                io.UnsupportedOperation):
+            #: not mappable (in memory streams, pipes, empty files)
+            matches = _find_all_in_stream(sequence, stream, stream_offset,
+                                          chunk_size)
+            for index in matches:
+                yield index
+        else:
+            with buffer:
+                for index in _find_all(sequence, buffer, stream_offset):
+                    yield index
+    finally:
+        stream.seek(position)
+
 
 def search(sequence, stream, stream_offset=0x0):
     """
     process simple search sequence inside stream
 
-    :param stream: stream object, file
+    :param stream: stream object, file, binary data or
+        :class:`udlg.utils.reader.BinaryReader` instance
     :param bytes | str sequence: binary sequence to find
     :param int stream_offset: stream offset where process should start from,
         0x0 by default
@@ -26,77 +145,40 @@ def search(sequence, stream, stream_offset=0x0):
     :raise IndexError:
         - if nothing was found
     """
-    if isinstance(sequence, str):
-        sequence = bytes(sequence.encode('utf-8'))
-    elif isinstance(sequence, bytes):
-        pass
-    else:
-        raise TypeError("`sequence` should be str, bytes "
-                        "instance")
-
-    chunk_size = 1
-    pos = stream.tell()
-    offset = 0
-    stream.seek(stream_offset)
-    # byte = stream.read(1)
-    stream_by_byte = partial(stream.read, chunk_size)
-    to_int = partial(int.from_bytes, byteorder='little')
-    sequence_length = len(sequence)
-    found = -1
-    for sign in iter(stream_by_byte, b''):
-        byte = to_int(sign)
-        if offset == sequence_length:
-            found = stream.tell() - (len(sequence) + 1)
-            break
-        if offset < sequence_length and byte == sequence[offset]:
-            offset += 1
-        elif offset and byte != sequence[offset]:
-            offset = 0
-        else:
-            pass
-    else:
+    matches = iter_search(sequence, stream, stream_offset=stream_offset)
+    try:
+        return next(matches)
+    except StopIteration:
         raise IndexError("sequence `%r` not found" % sequence)
-    stream.seek(pos)
-    return found
+    finally:
+        matches.close()
 
 
-def search_all(sequence, stream):
+def search_all(sequence, stream, stream_offset=0x0):
     """
     search all sequence pattern inside stream
 
-    :param stream: stream object, file
+    :param stream: stream object, file, binary data or
+        :class:`udlg.utils.reader.BinaryReader` instance
     :param bytes | str sequence: sequence to found
+    :param int stream_offset: stream offset where process should start from,
+        0x0 by default
     :rtype: list
     :return: list of found position inside stream for given sequence
     """
-    if isinstance(sequence, str):
-        sequence = bytes(sequence.encode('utf-8'))
-    elif isinstance(sequence, bytes):
-        pass
-    else:
-        raise TypeError('sequences should be str or bytes instance')
-
-    last_offset = 0x0
-    indexes = []
-    sequence_length = len(sequence)
-    while 1:
-        try:
-            last_offset = search(
-                sequence, stream, stream_offset=last_offset + sequence_length
-            )
-            indexes.append(last_offset)
-        except IndexError:
-            break
-    return indexes
+    return list(iter_search(sequence, stream, stream_offset=stream_offset))
 
 
-def read_7bit_encoded_int_from_stream(stream):
+def decode_7bit_int(buffer, offset=0):
     """
-    read int with 7 bit encoded format from stream
+    decode int with 7 bit encoded format from buffer at offset
 
-    :param stream: stream object, file for example
-    :rtype: int
-    :return: int
+    :param bytes | bytearray | memoryview | mmap.mmap buffer: buffer
+    :param int offset: offset encoded int starts from
+    :rtype: tuple[int, int]
+    :return: value, offset right after encoded int
+    :raises IndexError:
+        - if buffer ends before encoded int does
 
     .. code-block:: c
         do {
@@ -110,15 +192,99 @@ def read_7bit_encoded_int_from_stream(stream):
             }
         } while( offset != 35);
     """
-    b, = unpack('B', stream.read(BYTE_SIZE))
-    entry, offset = 0, 0
-    while offset != 35:
-        entry |= (b & 127) << offset
-        offset += 7
-        if (b & 128) == 0:
+    b = buffer[offset]
+    offset += 1
+    if b < 128:
+        return b, offset
+    entry, shift = b & 127, 7
+    while shift != 35:
+        b = buffer[offset]
+        offset += 1
+        entry |= (b & 127) << shift
+        shift += 7
+        if b < 128:
             break
-        b, = unpack('B', stream.read(BYTE_SIZE))
-    return entry
+    return entry, offset
+
+
+def decode_7bit_ints(buffer, count, offset=0):
+    """
+    decode ``count`` ints with 7 bit encoded format stored one right after
+    another
+
+    :param bytes | bytearray | memoryview | mmap.mmap buffer: buffer
+    :param int count: amount of ints to decode
+    :param int offset: offset the first encoded int starts from
+    :rtype: tuple[list[int], int]
+    :return: values, offset right after the last encoded int
+    """
+    values = []
+    append = values.append
+    for _ in range(count):
+        value, offset = decode_7bit_int(buffer, offset)
+        append(value)
+    return values, offset
+
+
+def encode_7bit_int(value, out):
+    """
+    encode value with 7 bit encoded format appending it to ``out``
+
+    :param int value: value to encode (unsigned)
+    :param bytearray out: buffer to append encoded value to
+    :rtype: int
+    :return: amount of bytes written
+    :raises ValueError:
+        - if value is negative
+    """
+    if value < 0:
+        raise ValueError("Can not encode negative value: %r" % value)
+    if value < 128:
+        out.append(value)
+        return 1
+    size = len(out)
+    while value >= 128:
+        out.append((value & 127) | 128)
+        value >>= 7
+    out.append(value)
+    return len(out) - size
+
+
+def encode_7bit_ints(values, out):
+    """
+    encode values with 7 bit encoded format appending them to ``out``
+
+    :param collections.Iterable[int] values: values to encode
+    :param bytearray out: buffer to append encoded values to
+    :rtype: int
+    :return: amount of bytes written
+    """
+    size = len(out)
+    for value in values:
+        encode_7bit_int(value, out)
+    return len(out) - size
+
+
+def read_7bit_encoded_int_from_stream(stream):
+    """
+    read int with 7 bit encoded format from stream
+
+    :param stream: stream object, file for example, or
+        :class:`udlg.utils.reader.BinaryReader` instance
+    :rtype: int
+    :return: int
+    """
+    if hasattr(stream, 'read_7bit_int'):
+        return stream.read_7bit_int()
+    #: encoded int takes 5 bytes at most
+    encoded = bytearray()
+    for _ in range(5):
+        byte = stream.read(BYTE_SIZE)
+        encoded.extend(byte)
+        if not byte or byte[0] < 128:
+            break
+    value, _ = decode_7bit_int(encoded)
+    return value
 
 
 def read_7bit_encoded_int(source):
@@ -129,18 +295,10 @@ def read_7bit_encoded_int(source):
     :rtype: int
     :return: encoded value
     """
-    src = deque(source[::-1])
-    num2 = 0
-    num = 0
-    while num2 != 35:
-        byte = src.pop()
-        num |= (byte & 127) << num2
-        num2 += 7
-        if (byte & 128) == 0:
-            return num
+    value, _ = decode_7bit_int(source)
+    return value
 
 
-#: todo: improve
 def write_7bit_int(value):
     """
     encode value to 7bit encoded bytestring representing this value
@@ -149,11 +307,6 @@ def write_7bit_int(value):
     :rtype: bytes
     :return: byte
     """
-    temp = value
-    byte_storage = b''
-
-    while temp >= 128:
-        byte_storage += chr(0x000000FF & (temp | 0x80)).encode('latin1')
-        temp >>= 7
-    byte_storage += bytes(chr(temp).encode('latin1'))
-    return byte_storage
+    out = bytearray()
+    encode_7bit_int(value, out)
+    return bytes(out)
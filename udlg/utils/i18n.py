@@ -5,29 +5,255 @@
     :platform: Linux, Unix, Windows
 .. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
 .. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+
+i18n file is a sequence of ``record index,member index=>'content'``
+entries. Two formats are supported:
+
+- legacy one, content is written as is, so entry could span several lines,
+  entry lasts till the next line starting with ``index,index=>'``
+- escaped one, file starts with :data:`ESCAPED_HEADER` line, every entry
+  takes exactly one line, backslash, new line and carriage return signs of
+  content are escaped (``\\\\``, ``\\n``, ``\\r``)
+
+Both are read line by line chunk by chunk (:func:`iter_i18n_items`), the
+escaped one is written the same way (:class:`I18nWriter`).
 """
 from collections import defaultdict
+from itertools import chain
+import io
 import re
 
-FLAGS = re.S | re.M | re.I | re.U
-I18N_REG = re.compile(
-    r"(?P<record_id>\d+),(?P<member_id>\d+)=>(?P<content>(?:''|'.+?'))$",
-    FLAGS
-)
+from .writer import get_writer
+
+#: default read/write chunk size
+CHUNK_SIZE = 64 * 1024
+#: first line of escaped i18n file
+ESCAPED_HEADER = b"# udlg i18n: escaped"
+ENTRY_REG = re.compile(br"(\d+),(\d+)=>'")
+ESCAPE_REG = re.compile(br"[\\\n\r]")
+UNESCAPE_REG = re.compile(br"\\(.?)", re.S)
+ESCAPES = {b"\\": b"\\\\", b"\n": b"\\n", b"\r": b"\\r"}
+UNESCAPES = dict((value[1:], key) for key, value in ESCAPES.items())
+
+
+def escape_i18n(content):
+    """
+    escape content, so it takes single line
+
+    :param bytes content: content
+    :rtype: bytes
+    :return: escaped content
+    """
+    return ESCAPE_REG.sub(lambda match: ESCAPES[match.group()], content)
+
+
+def _unescape(match):
+    try:
+        return UNESCAPES[match.group(1)]
+    except KeyError:
+        raise ValueError("Wrong escape sequence: `%r`" % match.group())
+
+
+def unescape_i18n(content):
+    """
+    unescape content
+
+    :param bytes content: escaped content
+    :rtype: bytes
+    :return: content
+    :raises ValueError:
+        - if content has unknown escape sequence
+    """
+    if b"\\" not in content:
+        return content
+    return UNESCAPE_REG.sub(_unescape, content)
+
+
+def _iter_lines(stream, chunk_size):
+    """
+    iterate over stream lines reading it chunk by chunk
+
+    :param stream: binary file like object
+    :param int chunk_size: chunk size
+    :rtype: collections.Iterable[bytes]
+    :return: lines (without new line sign) iterator
+    """
+    read = stream.read
+    tail = b""
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line
+    if tail:
+        yield tail
+
+
+def _iter_escaped_items(lines):
+    for number, line in enumerate(lines, 2):
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        if not line or line.startswith(b"#"):
+            continue
+        match = ENTRY_REG.match(line)
+        if match is None or not line.endswith(b"'") or \
+                len(line) == match.end():
+            raise ValueError("Wrong i18n entry at line %i: `%r`" % (
+                number, line[:64]
+            ))
+        record_id, member_id = match.groups()
+        yield (int(record_id), int(member_id),
+               unescape_i18n(line[match.end():-1]))
+
+
+def _get_legacy_item(number, match, lines):
+    content = b"\n".join(lines)
+    end = content.rfind(b"'")
+    if end < 0:
+        raise ValueError("Unterminated i18n entry at line %i" % number)
+    record_id, member_id = match.groups()
+    return int(record_id), int(member_id), content[:end]
+
+
+def _iter_legacy_items(lines):
+    entry = None
+    for number, line in enumerate(lines, 1):
+        match = ENTRY_REG.match(line)
+        if match is not None:
+            if entry is not None:
+                yield _get_legacy_item(*entry)
+            entry = (number, match, [line[match.end():]])
+        elif entry is not None:
+            entry[2].append(line)
+    if entry is not None:
+        yield _get_legacy_item(*entry)
+
+
+def iter_i18n_items(source, chunk_size=CHUNK_SIZE):
+    """
+    iterate over i18n items, source is read chunk by chunk, so only one
+    entry is kept in memory at once. Format is detected by first line.
+
+    :param source: i18n block (bytes) or binary file like object
+    :param int chunk_size: read chunk size
+    :rtype: collections.Iterable[tuple[int, int, bytes]]
+    :return: (record index, member index, content) iterator
+    :raises ValueError:
+        - if escaped i18n file has malformed entry
+        - if legacy i18n file has unterminated entry
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    lines = _iter_lines(source, chunk_size)
+    first = next(lines, None)
+    if first is None:
+        return iter(())
+    if first.rstrip(b"\r") == ESCAPED_HEADER:
+        return _iter_escaped_items(lines)
+    return _iter_legacy_items(chain((first, ), lines))
 
 
 def get_i18n_items(block):
     """
     prepare i18n items from i18n file like object
 
-    :param bytes block: block to parse
+    :param bytes block: block to parse, or binary file like object
     :rtype: dict
     :return: i18n items
     """
     storage = defaultdict(dict)
-    items = re.findall(I18N_REG, block.decode('utf-8'))
-    for (record_idx, member_idx, message) in items:
-        storage[int(record_idx)][int(member_idx)] = (
-            message[1:-1]
-        )
+    for record_idx, member_idx, message in iter_i18n_items(block):
+        storage[record_idx][member_idx] = message.decode('utf-8')
     return storage
+
+
+def format_i18n_items(items):
+    """
+    format i18n items into (legacy) i18n file block
+
+    :param collections.Iterable items: (record index, member index,
+        content) items, content is bytes
+    :rtype: bytes
+    :return: i18n strings with \n sign separated
+    """
+    return b"\n".join(b"%i,%i=>'%s'" % item for item in items)
+
+
+class I18nWriter(object):
+    """
+    Escaped i18n file writer, entries are buffered and written into sink
+    chunk by chunk
+    """
+    def __init__(self, sink, chunk_size=CHUNK_SIZE):
+        """
+        :param sink: ``bytearray`` (data is appended) or file like object
+        :param int chunk_size: write chunk size
+        """
+        self.write_chunk = get_writer(sink)
+        self.chunk_size = chunk_size
+        self.buffer = bytearray(ESCAPED_HEADER + b"\n")
+
+    def write(self, record_index, member_index, content):
+        """
+        write i18n entry
+
+        :param int record_index: record index
+        :param int member_index: member index
+        :param bytes | str content: content
+        :rtype: None
+        :return: None
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        buffer = self.buffer
+        buffer += b"%i,%i=>'%s'\n" % (record_index, member_index,
+                                      escape_i18n(content))
+        if len(buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_items(self, items):
+        """
+        write i18n entries
+
+        :param collections.Iterable items: (record index, member index,
+            content) items
+        :rtype: int
+        :return: entries written
+        """
+        count = 0
+        write = self.write
+        for record_index, member_index, content in items:
+            write(record_index, member_index, content)
+            count += 1
+        return count
+
+    def flush(self):
+        """
+        write buffered entries into sink
+
+        :rtype: None
+        :return: None
+        """
+        if self.buffer:
+            self.write_chunk(self.buffer)
+            self.buffer = bytearray()
+
+
+def write_i18n_items(items, sink, chunk_size=CHUNK_SIZE):
+    """
+    write i18n items into sink in escaped format
+
+    :param collections.Iterable items: (record index, member index,
+        content) items
+    :param sink: ``bytearray`` (data is appended) or file like object
+    :param int chunk_size: write chunk size
+    :rtype: int
+    :return: entries written
+    """
+    writer = I18nWriter(sink, chunk_size=chunk_size)
+    count = writer.write_items(items)
+    writer.flush()
+    return count
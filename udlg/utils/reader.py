@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.utils.reader
+    :synopsis: Buffered cursor reader
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+import io
+import mmap
+from struct import unpack_from, calcsize
+from contextlib import contextmanager
+
+from .bin import decode_7bit_int
+
+
+class BinaryReader(object):
+    """
+    Cursor over in-memory binary data, ``bytes`` or read only ``mmap``.
+
+    Decoders read data with :meth:`unpack` at the current offset instead of
+    issuing ``stream.read`` per field. Reader is also file-like enough
+    (``read``, ``seek``, ``tell``) for code that still expects stream.
+    """
+    __slots__ = ('buffer', 'offset', 'size', 'profile', '_mmap', '_stream',
+                 '_base')
+
+    def __init__(self, buffer, offset=0):
+        """
+        :param bytes | mmap.mmap buffer: binary data
+        :param int offset: initial cursor offset
+        """
+        if isinstance(buffer, (bytearray, memoryview)):
+            buffer = bytes(buffer)
+        self.buffer = buffer
+        self.offset = offset
+        self.size = len(buffer)
+        #: :class:`udlg.profile.Profile` decoders report to, if any
+        self.profile = None
+        self._mmap = None
+        self._stream = None
+        self._base = 0
+
+    def __repr__(self):
+        return '<%s at 0x%08x, offset: %i, size: %i>' % (
+            self.__class__.__name__, id(self), self.offset, self.size
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @classmethod
+    def from_stream(cls, stream):
+        """
+        create reader for stream, file objects are mapped into memory, in
+        memory streams and non mappable ones are read up
+
+        :param stream: stream object, file for example, or binary data
+        :rtype: BinaryReader
+        :return: reader with offset set up to current stream position
+        """
+        if isinstance(stream, cls):
+            return stream
+        if isinstance(stream, (bytes, bytearray, memoryview)):
+            return cls(stream)
+        if isinstance(stream, io.BytesIO):
+            reader = cls(stream.getvalue(), offset=stream.tell())
+            reader._stream = stream
+            return reader
+
+        position = stream.tell()
+        try:
+            buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            #: not mappable (pipes, empty files, custom streams)
+            reader = cls(stream.read())
+            reader._base = position
+        else:
+            reader = cls(buffer, offset=position)
+            reader._mmap = buffer
+        reader._stream = stream
+        return reader
+
+    def close(self):
+        """
+        release mapped memory and move source stream (if any) to the
+        position reader stopped at
+
+        :rtype: None
+        :return: None
+        """
+        if self._stream is not None:
+            try:
+                self._stream.seek(self._base + self.offset)
+            except (OSError, ValueError, io.UnsupportedOperation):
+                pass
+            self._stream = None
+        if self._mmap is not None:
+            self.buffer = b''
+            self._mmap.close()
+            self._mmap = None
+
+    def fork(self):
+        """
+        create reader over the same data, new reader takes ownership of
+        mapped memory so data outlives this reader
+
+        :rtype: BinaryReader
+        :return: reader
+        """
+        reader = self.__class__(self.buffer, offset=self.offset)
+        reader.profile = self.profile
+        reader._mmap, self._mmap = self._mmap, None
+        return reader
+
+    def tell(self):
+        return self.offset
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self.offset = offset
+        elif whence == 1:
+            self.offset += offset
+        elif whence == 2:
+            self.offset = self.size + offset
+        else:
+            raise ValueError("Wrong whence value: %r" % whence)
+        return self.offset
+
+    def skip(self, size):
+        self.offset += size
+
+    def read(self, size=-1):
+        """
+        read ``size`` bytes moving cursor forward
+
+        :param int size: amount of bytes, -1 reads data up to the end
+        :rtype: bytes
+        :return: data
+        """
+        start = self.offset
+        end = self.size if size < 0 else min(start + size, self.size)
+        self.offset = end
+        return self.buffer[start:end]
+
+    def read_byte(self):
+        """
+        read one unsigned byte
+
+        :rtype: int
+        :return: byte value
+        """
+        value = self.buffer[self.offset]
+        self.offset += 1
+        return value
+
+    def peek_byte(self):
+        """
+        get unsigned byte at cursor without moving it
+
+        :rtype: int
+        :return: byte value
+        """
+        return self.buffer[self.offset]
+
+    def unpack(self, structure):
+        """
+        unpack precompiled structure at cursor
+
+        :param struct.Struct structure: precompiled structure
+        :rtype: tuple
+        :return: unpacked values
+        """
+        values = structure.unpack_from(self.buffer, self.offset)
+        self.offset += structure.size
+        return values
+
+    def unpack_format(self, fmt):
+        """
+        unpack format at cursor
+
+        :param str fmt: struct format
+        :rtype: tuple
+        :return: unpacked values
+        """
+        values = unpack_from(fmt, self.buffer, self.offset)
+        self.offset += calcsize(fmt)
+        return values
+
+    def read_7bit_int(self):
+        """
+        read int with 7 bit encoded format
+
+        :rtype: int
+        :return: int
+        """
+        value, self.offset = decode_7bit_int(self.buffer, self.offset)
+        return value
+
+
+@contextmanager
+def open_reader(stream):
+    """
+    get reader for stream, reader is closed on exit only if it was created
+    here (so nested builders share the same reader)
+
+    :param stream: stream object, file for example, or reader
+    :rtype: BinaryReader
+    :return: reader
+    """
+    reader = BinaryReader.from_stream(stream)
+    try:
+        yield reader
+    finally:
+        if reader is not stream:
+            reader.close()
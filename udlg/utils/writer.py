@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: udlg.utils.writer
+    :synopsis: Binary sinks for serialization
+    :platform: Linux, Unix, Windows
+.. moduleauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+.. sectionauthor:: Nickolas Fox <tarvitz@blacklibary.ru>
+"""
+
+
+class BufferWriter(object):
+    """
+    Cursor writer over preallocated writable buffer (``bytearray``,
+    writable ``memoryview`` or ``mmap``), data is written in place
+    """
+    __slots__ = ('buffer', 'offset')
+
+    def __init__(self, buffer, offset=0):
+        """
+        :param bytearray | memoryview | mmap.mmap buffer: writable buffer
+        :param int offset: initial cursor offset
+        """
+        self.buffer = memoryview(buffer).cast('B')
+        self.offset = offset
+
+    def __repr__(self):
+        return '<%s at 0x%08x, offset: %i, size: %i>' % (
+            self.__class__.__name__, id(self), self.offset, len(self.buffer)
+        )
+
+    def tell(self):
+        return self.offset
+
+    def write(self, data):
+        """
+        write data at cursor moving cursor forward
+
+        :param bytes | bytearray data: data
+        :rtype: int
+        :return: amount of bytes written
+        :raises ValueError:
+            - if data does not fit buffer
+        """
+        start = self.offset
+        end = start + len(data)
+        if end > len(self.buffer):
+            raise ValueError(
+                "Buffer overflow, %i bytes left, %i requested" % (
+                    len(self.buffer) - start, len(data)
+                )
+            )
+        self.buffer[start:end] = data
+        self.offset = end
+        return len(data)
+
+    def release(self):
+        """
+        release buffer view (so mapped memory could be closed)
+
+        :rtype: None
+        :return: None
+        """
+        self.buffer.release()
+
+
+def get_writer(sink):
+    """
+    get write function for sink
+
+    :param sink: ``bytearray`` (data is appended), file like object,
+        ``mmap.mmap`` or :class:`BufferWriter` (data is written at current
+        position)
+    :rtype: callable
+    :return: write function, takes bytes like object
+    """
+    if isinstance(sink, bytearray):
+        return sink.extend
+    return sink.write